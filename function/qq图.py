@@ -0,0 +1,160 @@
+import numpy as np
+import os
+import pandas as pd
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
+from .绘图规格 import scatter_panel, histogram_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import (CsvInput, dataset_name, load_csv, read_columns, map_partitions,
+                       partial_moments, combine_moments)
+from .假设检验 import normality_test, normality_tests_from_moments, qq_points
+from .进度 import current_reporter
+
+def generate_qq_plot_with_test(
+    csv_path: CsvInput,
+    y_column: str,
+    alpha: float = 0.05,
+    save_dir: str = "./charts",
+    sample_frac: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    从CSV文件中读取指定列数据，绘制正态QQ图并进行正态性检验
+
+    检验方法按样本量自动选择（见function.假设检验.normality_test），
+    样本量很大时QQ图只在固定数量的分位点上绘制
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        y_column: 需要检验的数值列名
+        alpha: 显著性水平，默认为0.05
+        save_dir: 图片保存目录，默认为'./charts'
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
+
+    返回:
+        包含图表路径和检验结果的字典
+    """
+    try:
+        # 读取CSV文件
+        df = load_csv(csv_path, usecols=[y_column], sample_frac=sample_frac)
+
+        # 检查列是否存在
+        if y_column not in df.columns:
+            return {"error": f"列 '{y_column}' 不存在于CSV文件中", "success": False}
+
+        # 确保保存目录存在
+        os.makedirs(save_dir, exist_ok=True)
+
+        # 获取文件名用于命名
+        file_name = dataset_name(csv_path)
+        save_path = os.path.join(save_dir, f'{file_name}_{y_column}_qq.png')
+
+        values = df[y_column].dropna().to_numpy(dtype=float)
+
+        # 正态性检验
+        test_result = normality_test(values, alpha=alpha)
+        current_reporter().partial("normality_test", test_result)
+
+        # QQ图：理论分位数 vs 样本分位数，参考线为 y = 均值 + 标准差 * x
+        qq = qq_points(values)
+        line_x = np.array([qq["theoretical"].min(), qq["theoretical"].max()])
+        panels = [
+            scatter_panel(
+                qq["theoretical"], qq["sample"], alpha=0.6,
+                line={"x": line_x, "y": qq["intercept"] + qq["slope"] * line_x},
+                title=f'{y_column} - 正态QQ图\n{test_result["test"]}: p={test_result["p_value"]:.4f}',
+                xlabel='理论分位数', ylabel='样本分位数'
+            ),
+            histogram_panel(values, bins=30, title=f'{y_column} - 直方图',
+                            xlabel=y_column, ylabel='频数'),
+        ]
+        get_render_pool().render(figure_spec(save_path, panels, layout=(1, 2), figsize=(14, 6)))
+
+        return {
+            "success": True,
+            "plot_path": save_path,
+            "test_method": test_result["test"],
+            "statistic": test_result["statistic"],
+            "p_value": test_result["p_value"],
+            "alpha": alpha,
+            "is_normal": test_result["is_normal"],
+            "supplementary_tests": test_result["supplementary_tests"],
+            "sample_size": test_result["sample_size"],
+            "qq_points_plotted": qq["num_points"]
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+def _moments_partition(df: pd.DataFrame, columns: List[str]) -> Tuple[set, Dict[str, Any]]:
+    """单个分区：记录其中的数值型列，并计算各列的矩部分聚合（非数值列按缺失处理）"""
+    numeric_df = df[columns].select_dtypes(include=[np.number])
+    return set(numeric_df.columns), partial_moments(numeric_df.reindex(columns=columns))
+
+
+def test_normality_columns(
+    csv_path: CsvInput,
+    columns: List[str],
+    alpha: float = 0.05,
+    sample_frac: Optional[float] = None,
+    chunksize: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    对多个数值列一次性进行向量化的D'Agostino K²正态性检验（不绘图）
+
+    检验只依赖各列的矩：每个分区（给出chunksize时每个数据块）计算部分聚合后合并，
+    不拼接原始数据
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        columns: 需要检验的数值列名列表
+        alpha: 显著性水平，默认为0.05
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
+        chunksize: 分块读取的行数（可选），内存预算不足时由服务端自动设置
+
+    返回:
+        包含每列检验结果的字典
+    """
+    try:
+        # 检查列是否存在（只读取表头）
+        header = read_columns(csv_path)
+        missing_columns = [col for col in columns if col not in header]
+        if missing_columns:
+            return {"error": f"列 {missing_columns} 不存在于CSV文件中", "success": False}
+
+        partials = map_partitions(csv_path, partial(_moments_partition, columns=columns), usecols=columns,
+                                  sample_frac=sample_frac, chunksize=chunksize)
+        # 仅保留在所有分区中均为数值型的列
+        numeric_columns = [col for col in columns if all(col in numeric for numeric, _ in partials)]
+        if not numeric_columns:
+            return {"error": "没有找到数值型列", "success": False}
+
+        moments = combine_moments([part for _, part in partials])
+        results = normality_tests_from_moments(moments, alpha=alpha).loc[numeric_columns]
+        return {
+            "success": True,
+            "test_method": "D'Agostino K²",
+            "alpha": alpha,
+            "results": {
+                col: {
+                    "sample_size": int(row["n"]),
+                    "skewness": float(row["skewness"]),
+                    "kurtosis": float(row["kurtosis"]),
+                    "statistic": float(row["statistic"]),
+                    "p_value": float(row["p_value"]),
+                    "is_normal": bool(row["is_normal"])
+                }
+                for col, row in results.iterrows()
+            },
+            "skipped_columns": [col for col in columns if col not in numeric_columns]
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2:
+        result = generate_qq_plot_with_test(sys.argv[1], sys.argv[2])
+        print(result)
+    else:
+        print("用法: python -m function.qq图 <csv文件路径> <列名>")
@@ -0,0 +1,213 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Dict, Any, List
+
+from .数据加载 import partial_moments
+
+# Shapiro-Wilk检验的p值仅在n<=5000时可靠
+SHAPIRO_MAX_N = 5000
+# 超过该样本量时使用KS检验代替Anderson-Darling作为补充检验
+ANDERSON_MAX_N = 1000000
+# QQ图最多绘制的点数，超过时改为在等间隔概率点上计算分位数
+QQ_MAX_POINTS = 2000
+# 超过该样本量时QQ图的样本分位数由抽样草图估计，不再对完整数据做选择
+QQ_SKETCH_MIN_N = 10000000
+# 分位数草图的抽样点数（固定种子的有放回抽样，秩误差约为 1/sqrt(该值)）
+QQ_SKETCH_SIZE = 1000000
+
+
+def _clean(values) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return values[~np.isnan(values)]
+
+
+def _anderson(values: np.ndarray, alpha: float) -> Dict[str, Any]:
+    with warnings.catch_warnings():
+        # 新版SciPy提示改用method参数计算p值，这里沿用临界值表
+        warnings.simplefilter('ignore', FutureWarning)
+        result = stats.anderson(values, dist='norm')
+    # 取与显著性水平最接近的临界值
+    levels = np.asarray(result.significance_level) / 100.0
+    idx = int(np.argmin(np.abs(levels - alpha)))
+    critical = float(result.critical_values[idx])
+    return {
+        "test": "Anderson-Darling",
+        "statistic": float(result.statistic),
+        "critical_value": critical,
+        "significance_level": float(levels[idx]),
+        "is_normal": bool(result.statistic < critical),
+    }
+
+
+def _ks_fitted(values: np.ndarray, alpha: float) -> Dict[str, Any]:
+    # 参数由样本估计，p值偏保守
+    statistic, p_value = stats.kstest(values, 'norm', args=(values.mean(), values.std(ddof=1)))
+    return {
+        "test": "Kolmogorov-Smirnov (拟合正态)",
+        "statistic": float(statistic),
+        "p_value": float(p_value),
+        "is_normal": bool(p_value > alpha),
+    }
+
+
+def normality_test(values, alpha: float = 0.05) -> Dict[str, Any]:
+    """
+    按样本量选择可扩展的正态性检验
+
+    - n <= 5000: Shapiro-Wilk
+    - n > 5000: D'Agostino K²（仅依赖矩，O(n)），并以Anderson-Darling
+      （n <= 1e6）或拟合正态的KS检验（n > 1e6）作为补充
+
+    参数:
+        values: 样本数据，缺失值会被忽略
+        alpha: 显著性水平
+
+    返回:
+        包含检验名称、统计量、p值、是否服从正态分布及补充检验的字典
+    """
+    values = _clean(values)
+    n = len(values)
+    if n < 3:
+        raise ValueError("样本量不足（至少需要3个非缺失值）")
+    if np.ptp(values) == 0:
+        raise ValueError("样本为常数，无法进行正态性检验")
+
+    supplementary: List[Dict[str, Any]] = []
+    if n <= SHAPIRO_MAX_N:
+        statistic, p_value = stats.shapiro(values)
+        test = "Shapiro-Wilk"
+    else:
+        statistic, p_value = stats.normaltest(values)
+        test = "D'Agostino K²"
+        if n <= ANDERSON_MAX_N:
+            supplementary.append(_anderson(values, alpha))
+        else:
+            supplementary.append(_ks_fitted(values, alpha))
+
+    return {
+        "test": test,
+        "statistic": float(statistic),
+        "p_value": float(p_value),
+        "alpha": alpha,
+        "is_normal": bool(p_value > alpha),
+        "sample_size": n,
+        "supplementary_tests": supplementary,
+    }
+
+
+def batch_normality_tests(df: pd.DataFrame, alpha: float = 0.05) -> pd.DataFrame:
+    """
+    对多列一次性进行向量化的D'Agostino K²检验
+
+    所有列的矩（偏度、峰度）在一次矩阵运算中计算，缺失值按列忽略，
+    样本量不足8的列结果为NaN。公式与scipy.stats.normaltest一致。
+
+    参数:
+        df: 仅包含数值列的DataFrame
+        alpha: 显著性水平
+
+    返回:
+        以列名为索引，包含n、skewness、kurtosis、statistic、p_value、is_normal的DataFrame
+    """
+    return normality_tests_from_moments(partial_moments(df), alpha=alpha)
+
+
+def normality_tests_from_moments(moments: Dict[str, Any], alpha: float = 0.05) -> pd.DataFrame:
+    """
+    由各列的矩（partial_moments/combine_moments的结果）计算D'Agostino K²检验，
+    多个分区或数据块合并矩之后检验，不需要拼接原始数据
+
+    参数:
+        moments: 包含n、m2、m3、m4（中心矩之和）和columns的字典
+        alpha: 显著性水平
+
+    返回:
+        与batch_normality_tests格式相同的DataFrame
+    """
+    n = moments["n"]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m2 = moments["m2"] / n
+        m3 = moments["m3"] / n
+        m4 = moments["m4"] / n
+        skew = m3 / m2 ** 1.5
+        kurt = m4 / m2 ** 2
+
+        # 偏度检验
+        y = skew * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)
+                 / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha_ = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha_ + np.sqrt((y / alpha_) ** 2 + 1))
+
+        # 峰度检验
+        expected = 3.0 * (n - 1) / (n + 1)
+        var_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (kurt - expected) / np.sqrt(var_b2)
+        sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                      * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3))))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / (sqrt_beta1 ** 2)))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * np.where(denom == 0.0, np.nan,
+                                          ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0))
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+        statistic = z_skew ** 2 + z_kurt ** 2
+    statistic = np.where(n >= 8, statistic, np.nan)
+    p_value = stats.chi2.sf(statistic, 2)
+    return pd.DataFrame({
+        "n": n.astype(int),
+        "skewness": skew,
+        "kurtosis": kurt - 3.0,
+        "statistic": statistic,
+        "p_value": p_value,
+        "is_normal": p_value > alpha,
+    }, index=moments["columns"])
+
+
+def qq_points(values, max_points: int = QQ_MAX_POINTS) -> Dict[str, Any]:
+    """
+    计算正态QQ图的理论分位数和样本分位数
+
+    样本量不超过max_points时使用全部排序后的样本；否则只在max_points个
+    等间隔的绘图位置上计算样本分位数（选择算法，无需完整排序），
+    绘图点数与样本量无关。样本量超过QQ_SKETCH_MIN_N时分位数由
+    QQ_SKETCH_SIZE个抽样点组成的草图估计，两端点仍取精确的最小值和最大值。
+
+    参数:
+        values: 样本数据，缺失值会被忽略
+        max_points: 最多绘制的点数
+
+    返回:
+        包含theoretical、sample及参考线斜率/截距的字典
+    """
+    values = _clean(values)
+    n = len(values)
+    if n <= max_points:
+        ranks = np.arange(1, n + 1)
+        sample = np.sort(values)
+    else:
+        ranks = np.linspace(1, n, max_points)
+        probs = (ranks - 1) / (n - 1)
+        if n > QQ_SKETCH_MIN_N:
+            rng = np.random.default_rng(0)
+            sample = np.quantile(values[rng.integers(0, n, QQ_SKETCH_SIZE)], probs)
+            sample[0], sample[-1] = values.min(), values.max()
+        else:
+            sample = np.quantile(values, probs)
+    # Blom绘图位置
+    probs = (ranks - 0.375) / (n + 0.25)
+    theoretical = stats.norm.ppf(probs)
+    return {
+        "theoretical": theoretical,
+        "sample": sample,
+        "slope": float(values.std(ddof=1)) if n > 1 else 0.0,
+        "intercept": float(values.mean()) if n else 0.0,
+        "num_points": len(sample),
+        "sample_size": n,
+    }
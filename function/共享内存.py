@@ -0,0 +1,132 @@
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _column_array(series: pd.Series) -> Dict[str, Any]:
+    """
+    将一列转换为可放入共享内存的定长数组
+
+    数值列直接使用其numpy表示；其它列编码为整数代码和类别列表，
+    类别列表随描述符一起传递（通常很小）
+    """
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        if series.isna().any() and not pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=float)
+        else:
+            values = series.to_numpy()
+        return {"values": np.ascontiguousarray(values), "categories": None}
+    codes, categories = pd.factorize(series)
+    return {"values": codes.astype(np.int32), "categories": list(categories)}
+
+
+class SharedFrame:
+    """
+    放置在multiprocessing.shared_memory中的DataFrame
+
+    每一列占用一块共享内存，子进程只接收轻量的描述符（共享内存名称、dtype、长度），
+    通过attach_frame零拷贝地重建DataFrame。共享内存按引用计数管理：
+    创建者持有一个引用，每个使用它的任务在提交时acquire、完成时release，
+    引用计数归零时释放并删除共享内存。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._refcount = 1
+        self._lock = threading.Lock()
+        columns = []
+        try:
+            for name in df.columns:
+                column = _column_array(df[name])
+                values = column["values"]
+                # 共享内存块大小不能为0
+                shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._blocks.append(shm)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+                columns.append({
+                    "name": name,
+                    "shm": shm.name,
+                    "dtype": values.dtype.str,
+                    "length": len(values),
+                    "categories": column["categories"],
+                })
+        except Exception:
+            self._unlink()
+            raise
+        self.descriptor: Dict[str, Any] = {"columns": columns, "num_rows": len(df)}
+
+    @property
+    def nbytes(self) -> int:
+        """共享内存占用的字节数"""
+        return sum(shm.size for shm in self._blocks)
+
+    def acquire(self) -> Dict[str, Any]:
+        """增加一个引用并返回描述符，供提交任务时使用"""
+        with self._lock:
+            if self._refcount <= 0:
+                raise RuntimeError("共享数据已被释放")
+            self._refcount += 1
+            return self.descriptor
+
+    def release(self, *_) -> None:
+        """减少一个引用，归零时释放共享内存（可直接用作任务完成回调）"""
+        with self._lock:
+            self._refcount -= 1
+            if self._refcount > 0:
+                return
+        self._unlink()
+
+    def _unlink(self) -> None:
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self) -> "SharedFrame":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+@contextmanager
+def attach_frame(descriptor: Dict[str, Any], columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    在子进程中根据描述符零拷贝地重建DataFrame
+
+    参数:
+        descriptor: SharedFrame.descriptor
+        columns: 只挂载指定的列（可选）
+
+    返回:
+        上下文管理器，产出的DataFrame仅在with块内有效
+    """
+    blocks = []
+    data = {}
+    try:
+        for column in descriptor["columns"]:
+            if columns is not None and column["name"] not in columns:
+                continue
+            # 渲染进程与创建者共用同一个resource_tracker，挂载不会改变共享内存的生命周期
+            shm = shared_memory.SharedMemory(name=column["shm"])
+            blocks.append(shm)
+            values = np.ndarray((column["length"],), dtype=np.dtype(column["dtype"]), buffer=shm.buf)
+            if column["categories"] is not None:
+                values = pd.Categorical.from_codes(values, categories=column["categories"])
+            data[column["name"]] = values
+        yield pd.DataFrame(data, copy=False)
+    finally:
+        data.clear()
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                # 仍有对象引用该内存时交由垃圾回收关闭
+                pass
@@ -0,0 +1,229 @@
+import os
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+import pandas as pd
+
+from .数据加载 import CsvInput, resolve_csv_paths, read_columns
+
+
+def _physical_memory_mb() -> float:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2 ** 20
+    except (ValueError, OSError, AttributeError):
+        return 8192.0
+
+
+# 所有并发请求可占用的内存预算（MB），默认为物理内存的一半
+MEMORY_BUDGET_MB = float(os.environ.get("CHART_MEMORY_BUDGET_MB", _physical_memory_mb() / 2))
+# 请求因预算暂时不足排队等待的最长时间（秒），超时后拒绝
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("CHART_ADMISSION_TIMEOUT", "300"))
+# 排队中的请求至少每隔该时间（秒）重新检查预算、取消和超时
+ADMISSION_POLL_INTERVAL = 0.5
+# 估算加载速度（MB/秒，按文件大小计）
+LOAD_THROUGHPUT_MB_S = float(os.environ.get("CHART_LOAD_THROUGHPUT_MB_S", "100"))
+# 估算行宽时读取的样本行数
+SAMPLE_ROWS = 1000
+# 加载后计算过程中的额外内存（副本、中间结果）相对于DataFrame大小的倍数
+WORKING_SET_FACTOR = 3.0
+# 抽样模式的最小抽样比例，更小时拒绝请求
+MIN_SAMPLE_FRAC = 0.001
+# 分块/抽样模式只使用预算的该比例，给并发请求留出余量
+DEGRADED_BUDGET_SHARE = 0.5
+
+
+class AdmissionRejected(Exception):
+    """请求超出内存预算且无法降级，或排队超时"""
+
+    def __init__(self, message: str, decision: Dict[str, Any]):
+        super().__init__(message)
+        self.decision = decision
+
+
+def _sample_text_row_bytes(path: str) -> float:
+    """读取文件开头若干行，估计磁盘上每行的平均字节数"""
+    with open(path, 'rb') as f:
+        f.readline()  # 表头
+        sizes = [len(line) for _, line in zip(range(SAMPLE_ROWS), f)]
+    return sum(sizes) / len(sizes) if sizes else 1.0
+
+
+def estimate_request(csv_path: CsvInput, usecols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    在加载前估算请求的内存占用和耗时
+
+    根据文件大小和抽样行的磁盘行宽估算总行数，再用抽样行加载后
+    （仅所需列）的内存占用估算DataFrame大小
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式或文件路径列表
+        usecols: 请求实际读取的列（可选），缺省为全部列
+
+    返回:
+        包含文件大小、估算行数、每行内存、估算内存（MB）和耗时（秒）的字典
+    """
+    paths = resolve_csv_paths(csv_path)
+    first = paths[0]
+    header = read_columns(first)
+    columns = [col for col in header if usecols is None or col in set(usecols)]
+    file_bytes = sum(os.path.getsize(path) for path in paths)
+
+    if first.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        rows = sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+        # 只解码第一批抽样行，准入决定之前不读取整个文件
+        batch = next(pq.ParquetFile(first).iter_batches(batch_size=SAMPLE_ROWS, columns=columns), None)
+        sample = batch.to_pandas() if batch is not None else pd.DataFrame(columns=columns)
+    else:
+        disk_row_bytes = _sample_text_row_bytes(first)
+        rows = int(file_bytes / disk_row_bytes)
+        sample = pd.read_csv(first, usecols=columns, nrows=SAMPLE_ROWS)
+    row_bytes = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+
+    memory_mb = rows * row_bytes * WORKING_SET_FACTOR / 2 ** 20
+    return {
+        "file_mb": round(file_bytes / 2 ** 20, 2),
+        "num_files": len(paths),
+        "total_columns": len(header),
+        "used_columns": len(columns),
+        "estimated_rows": rows,
+        "row_bytes": round(float(row_bytes), 1),
+        "estimated_memory_mb": round(float(memory_mb), 2),
+        "estimated_seconds": round(file_bytes / 2 ** 20 / LOAD_THROUGHPUT_MB_S, 2),
+    }
+
+
+class AdmissionController:
+    """
+    进程内的内存准入控制
+
+    每个请求在执行前按估算内存预留预算，执行完成后归还：
+    - accept: 预算充足，直接执行
+    - chunked: 估算超出预算但函数支持分块读取，按预算确定的块大小执行
+    - sampled: 估算超出预算但函数支持抽样，按预算确定的抽样比例执行
+    - queued: 当前剩余预算不足，排队等待其它请求释放预算后执行
+    - reject: 无法降级，或排队超时
+
+    控制器本身不阻塞：try_acquire在预算不足时立即返回，排队由调用方完成
+    （服务端在事件循环中等待，排队的请求不占用线程池的工作线程）
+    """
+
+    def __init__(self, budget_mb: float = MEMORY_BUDGET_MB,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.budget_mb = budget_mb
+        self.queue_timeout = queue_timeout
+        self._reserved_mb = 0.0
+        # 请求之外常驻内存的缓存（名称 -> MB），同样占用预算
+        self._resident_mb: Dict[str, float] = {}
+        # 缓存的回收函数（名称 -> 回收函数），参数为需要释放的MB数
+        self._reclaimers: Dict[str, Callable[[float], None]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def resident_mb(self) -> float:
+        return sum(self._resident_mb.values())
+
+    @property
+    def available_mb(self) -> float:
+        return self.budget_mb - self._reserved_mb - self.resident_mb
+
+    def set_resident(self, name: str, size_mb: float,
+                     reclaim: Optional[Callable[[float], None]] = None) -> None:
+        """
+        登记某个缓存当前常驻的内存（MB）
+
+        参数:
+            name: 缓存名称
+            size_mb: 当前占用
+            reclaim: 回收函数（可选），请求因缓存占用而无法预留预算时被调用，
+                参数为需要释放的MB数；回收后应再次调用set_resident更新占用
+        """
+        with self._lock:
+            self._resident_mb[name] = size_mb
+            if reclaim is not None:
+                self._reclaimers[name] = reclaim
+
+    def plan(self, estimate: Dict[str, Any], can_chunk: bool = False,
+             can_sample: bool = False) -> Dict[str, Any]:
+        """
+        根据估算结果选择执行模式（不预留预算）
+
+        返回:
+            包含decision、需要预留的内存以及chunksize/sample_frac的字典
+        """
+        needed = estimate["estimated_memory_mb"]
+        decision = {"decision": "accept", "reserved_mb": needed, "budget_mb": self.budget_mb,
+                    "estimate": estimate, "chunksize": None, "sample_frac": None}
+        if needed <= self.budget_mb:
+            return decision
+
+        share = self.budget_mb * DEGRADED_BUDGET_SHARE
+        if can_chunk:
+            row_mb = estimate["row_bytes"] * WORKING_SET_FACTOR / 2 ** 20
+            decision.update(decision="chunked", reserved_mb=share,
+                            chunksize=max(1000, int(share / max(row_mb, 1e-12))))
+        elif can_sample and share / needed >= MIN_SAMPLE_FRAC:
+            frac = share / needed
+            decision.update(decision="sampled", reserved_mb=share, sample_frac=round(float(frac), 6))
+        else:
+            decision.update(decision="reject",
+                            reason=f"估算内存 {needed:.1f}MB 超出预算 {self.budget_mb:.1f}MB，且无法分块或抽样")
+        return decision
+
+    def try_acquire(self, decision: Dict[str, Any]) -> bool:
+        """
+        剩余预算足够时按执行计划预留预算，否则不预留并立即返回
+
+        只因缓存占用而预算不足时，先让缓存回收所缺的内存再重试一次
+
+        返回:
+            是否已预留；执行计划为reject时抛出AdmissionRejected
+        """
+        if decision["decision"] == "reject":
+            raise AdmissionRejected(decision["reason"], decision)
+        needed = min(decision["reserved_mb"], self.budget_mb)
+        decision["reserved_mb"] = needed
+        with self._lock:
+            if self._reserve(needed):
+                return True
+            shortfall = needed - self.available_mb
+            reclaimers = list(self._reclaimers.values()) if needed <= self.budget_mb - self._reserved_mb else []
+        if not reclaimers:
+            return False
+        # 回收函数会获取缓存自身的锁并回调set_resident，不能在持有self._lock时调用
+        for reclaim in reclaimers:
+            reclaim(shortfall)
+        with self._lock:
+            return self._reserve(needed)
+
+    def _reserve(self, needed: float) -> bool:
+        # 调用方持有self._lock
+        if needed > self.available_mb:
+            return False
+        self._reserved_mb += needed
+        return True
+
+    def release(self, decision: Dict[str, Any]) -> None:
+        """归还预留的预算"""
+        with self._lock:
+            self._reserved_mb = max(0.0, self._reserved_mb - decision["reserved_mb"])
+
+    def status(self) -> Dict[str, float]:
+        """当前预算使用情况（请求预留的和缓存常驻的内存）"""
+        with self._lock:
+            return {"budget_mb": self.budget_mb, "reserved_mb": round(self._reserved_mb, 2),
+                    "resident_mb": round(self.resident_mb, 2),
+                    "available_mb": round(self.available_mb, 2)}
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """获取进程内共享的准入控制器"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
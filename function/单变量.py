@@ -1,13 +1,18 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from .绘图规格 import (summary_histogram_panel, density_panel, summary_box_panel, violin_panel,
+                       figure_spec)
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, load_csv
+from .进度 import current_reporter
+from .数值摘要 import split_finite, summarize_numeric, describe_summary
 
 def generate_single_column_plots(
-    csv_path: str,
+    csv_path: CsvInput,
     y_column: str,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    sample_frac: Optional[float] = None
 ) -> str:
     """
     从CSV文件中读取指定列数据，并生成四种统计图表：
@@ -17,69 +22,41 @@ def generate_single_column_plots(
     4. 小提琴图
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 需要分析的数值列名
         save_dir: 图片保存目录，默认为'./charts'
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
 
     返回:
         成功信息字符串
     """
     try:
         # 读取CSV文件
-        df = pd.read_csv(csv_path)
+        df = load_csv(csv_path, usecols=[y_column], sample_frac=sample_frac)
         
         # 检查列是否存在
         if y_column not in df.columns:
             return f"错误：列 '{y_column}' 不存在于CSV文件中"
         
+        if not pd.api.types.is_numeric_dtype(df[y_column]):
+            return f"错误：列 '{y_column}' 不是数值类型"
+        
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         # 获取文件名（不含扩展名）用于命名
-        file_name = os.path.splitext(os.path.basename(csv_path))[0]
-        
-        # 1. 直方图
-        plt.figure(figsize=(12, 8))
-        plt.subplot(2, 2, 1)
-        plt.hist(df[y_column], bins=30, edgecolor='black', alpha=0.7)
-        plt.title(f'{y_column} - 直方图')
-        plt.xlabel(y_column)
-        plt.ylabel('频数')
-        
-        # 2. 核密度估计图
-        plt.subplot(2, 2, 2)
-        sns.kdeplot(data=df[y_column], fill=True)
-        plt.title(f'{y_column} - 核密度估计图')
-        plt.xlabel(y_column)
-        
-        # 3. 箱线图
-        plt.subplot(2, 2, 3)
-        plt.boxplot(df[y_column])
-        plt.title(f'{y_column} - 箱线图')
-        plt.ylabel(y_column)
-        
-        # 4. 小提琴图
-        plt.subplot(2, 2, 4)
-        sns.violinplot(y=df[y_column])
-        plt.title(f'{y_column} - 小提琴图')
-        plt.ylabel(y_column)
-        
-        # 调整布局并保存
-        plt.tight_layout()
+        file_name = dataset_name(csv_path)
         save_path = os.path.join(save_dir, f'{file_name}_{y_column}_analysis.png')
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
         
-        # 计算基本统计信息
-        stats = df[y_column].describe()
+        # 去除缺失值一次，融合摘要一次扫描得到统计量、直方图分箱和箱线统计量
+        values, dropped = split_finite(df[y_column])
+        summary = summarize_numeric(values, bins=30, dropna=False, dropped=dropped)
+        stats = pd.Series(describe_summary(summary), name=y_column, dtype=float)
+        skewness = summary["skew"] if summary["skew"] is not None else float("nan")
+        kurtosis = summary["kurtosis"] if summary["kurtosis"] is not None else float("nan")
         
-        # 计算额外统计量
-        skewness = df[y_column].skew()
-        kurtosis = df[y_column].kurtosis()
+        # 与describe不同，±inf不计入统计量和图表，单独说明
+        inf_note = f"无穷值: {dropped['infinite']} 个（未计入统计量和图表）\n" if dropped["infinite"] else ""
         
         # 创建统计信息字符串
         stats_str = f"""
@@ -88,10 +65,32 @@ def generate_single_column_plots(
         
         偏度: {skewness:.4f}
         峰度: {kurtosis:.4f}
-        
+        {inf_note}
         图表已保存至: {save_path}
         """
         
+        # 统计信息先行推送，图表随后渲染
+        current_reporter().partial("statistics", stats_str.strip())
+        
+        if summary["count"] == 0:
+            return f"错误：列 '{y_column}' 没有有效的数值"
+        
+        # 直方图和箱线图直接由摘要绘制；密度曲线只对数据抽样估计，网格范围和带宽取自摘要
+        panels = [
+            # 1. 直方图
+            summary_histogram_panel(summary, title=f'{y_column} - 直方图',
+                                    xlabel=y_column, ylabel='频数'),
+            # 2. 核密度估计图
+            density_panel(values, summary=summary, title=f'{y_column} - 核密度估计图', xlabel=y_column),
+            # 3. 箱线图
+            summary_box_panel(summary, title=f'{y_column} - 箱线图', ylabel=y_column),
+            # 4. 小提琴图
+            violin_panel(values, summary=summary, title=f'{y_column} - 小提琴图', ylabel=y_column),
+        ]
+        get_render_pool().render(
+            figure_spec(save_path, panels, layout=(2, 2), figsize=(12, 8))
+        )
+        
         return stats_str.strip()
         
     except Exception as e:
@@ -104,4 +103,4 @@ if __name__ == "__main__":
         result = generate_single_column_plots(sys.argv[1], sys.argv[2])
         print(result)
     else:
-        print("用法: python 单变量.py <csv文件路径> <列名>")
\ No newline at end of file
+        print("用法: python -m function.单变量 <csv文件路径> <列名>")
\ No newline at end of file
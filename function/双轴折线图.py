@@ -0,0 +1,95 @@
+import os
+from typing import Dict, Any, List, Optional, Union
+from .绘图规格 import line_series, line_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, read_columns
+from .时间序列 import get_pyramid
+
+def plot_dual_axis_line_chart(
+    csv_path: CsvInput,
+    y1_column: str,
+    y2_column: str,
+    x_column: Optional[str] = None,
+    scale_type: str = 'linear',
+    save_dir: str = "./charts",
+    start: Optional[Union[str, float]] = None,
+    end: Optional[Union[str, float]] = None,
+    width_px: int = 1600
+) -> Dict[str, Any]:
+    """
+    绘制共享横轴、左右两个纵轴的双轴折线图
+
+    两列共用同一个多分辨率金字塔，按时间窗口和绘图宽度选择汇总粒度
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        y1_column: 左侧纵轴的数值列名
+        y2_column: 右侧纵轴的数值列名
+        x_column: 用作横轴的时间列或数值列（可选），缺省时使用行号
+        scale_type: 纵轴刻度类型，可选'linear'/'log'
+        save_dir: 图片保存目录，默认为'./charts'
+        start: 时间窗口起点（可选）
+        end: 时间窗口终点（可选）
+        width_px: 绘图宽度（像素），决定最多绘制的点数，默认为1600
+
+    返回:
+        包含图表路径、所用分辨率、按列名组织的窗口统计量和提示信息的字典
+    """
+    try:
+        if scale_type not in ('linear', 'log'):
+            return {"error": f"不支持的刻度类型: {scale_type}，可选 'linear'/'log'", "success": False}
+
+        # 检查列是否存在（只读取表头）
+        columns = read_columns(csv_path)
+        missing_cols = [col for col in (y1_column, y2_column, x_column) if col and col not in columns]
+        if missing_cols:
+            return {"error": f"列 {missing_cols} 不存在于CSV文件中", "success": False}
+
+        # 确保保存目录存在
+        os.makedirs(save_dir, exist_ok=True)
+
+        pyramid = get_pyramid(csv_path, x_column, [y1_column, y2_column])
+        view = pyramid.query(start, end, width_px=width_px)
+
+        warnings: List[str] = []
+        if scale_type == 'log':
+            non_positive = [col for col in (y1_column, y2_column)
+                            if view["stats"][col]["min"] is not None and view["stats"][col]["min"] <= 0]
+            if non_positive:
+                warnings.append(f"列 {non_positive} 含有非正值，对数刻度下这些点不会显示")
+        if view["median_sampled"]:
+            warnings.append("窗口内数据量较大，中位数为抽样近似值")
+
+        y1, y2 = view["series"][y1_column], view["series"][y2_column]
+        panel = line_panel(
+            [line_series(view["x"], y1["mean"], label=y1_column, lower=y1["min"], upper=y1["max"])],
+            secondary=[line_series(view["x"], y2["mean"], label=y2_column, lower=y2["min"], upper=y2["max"])],
+            secondary_ylabel=y2_column, yscale=scale_type, x_is_time=pyramid.is_time,
+            title=f'{y1_column} 与 {y2_column} 双轴折线图（分辨率: {view["resolution"]}）',
+            xlabel=x_column or '行号', ylabel=y1_column
+        )
+        file_name = dataset_name(csv_path)
+        plot_path = os.path.join(save_dir, f'{file_name}_{y1_column}_{y2_column}_dual_axis.png')
+        get_render_pool().render(figure_spec(plot_path, [panel], figsize=(12, 6)))
+
+        return {
+            "success": True,
+            "plot_path": plot_path,
+            "resolution": view["resolution"],
+            "points_plotted": view["points"],
+            "rows_in_window": view["rows_in_window"],
+            "data_stats": {col: view["stats"][col] for col in (y1_column, y2_column)},
+            "warning": "；".join(warnings) if warnings else "无"
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 3:
+        x_col = sys.argv[4] if len(sys.argv) > 4 else None
+        result = plot_dual_axis_line_chart(sys.argv[1], sys.argv[2], sys.argv[3], x_column=x_col)
+        print(result)
+    else:
+        print("用法: python -m function.双轴折线图 <csv文件路径> <左轴列名> <右轴列名> [时间列名]")
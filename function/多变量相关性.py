@@ -1,31 +1,34 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from scipy import stats
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from .绘图规格 import scatter_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, load_csv
+from .进度 import current_reporter
 
 def generate_scatter_plot(
-    csv_path: str,
+    csv_path: CsvInput,
     x_column: str,
     y_column: str,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    sample_frac: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     从CSV文件中读取指定列数据，生成散点图并计算相关系数
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         x_column: 用作x轴的列名
         y_column: 用作y轴的列名
         save_dir: 图片保存目录，默认为'./charts'
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
 
     返回:
         包含图表路径、相关系数和统计信息的字典
     """
     try:
         # 读取CSV文件
-        df = pd.read_csv(csv_path)
+        df = load_csv(csv_path, usecols=[x_column, y_column], sample_frac=sample_frac)
         
         # 检查列是否存在
         if x_column not in df.columns:
@@ -36,40 +39,31 @@ def generate_scatter_plot(
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         # 获取文件名用于命名
-        file_name = os.path.splitext(os.path.basename(csv_path))[0]
+        file_name = dataset_name(csv_path)
         save_path = os.path.join(save_dir, f'{file_name}_{x_column}_{y_column}_scatter.png')
         
-        # 创建散点图
-        plt.figure(figsize=(10, 8))
-        
-        # 绘制散点图
-        plt.scatter(df[x_column], df[y_column], alpha=0.6)
-        
-        # 添加趋势线
-        z = np.polyfit(df[x_column], df[y_column], 1)
-        p = np.poly1d(z)
-        plt.plot(df[x_column], p(df[x_column]), "r--", alpha=0.8)
+        # 去除缺失值，相关系数和趋势线均基于全量数据计算
+        valid_data = df[[x_column, y_column]].dropna()
+        x = valid_data[x_column].to_numpy(dtype=float)
+        y = valid_data[y_column].to_numpy(dtype=float)
         
         # 计算相关系数
-        pearson_corr, pearson_p = stats.pearsonr(df[x_column], df[y_column])
-        spearman_corr, spearman_p = stats.spearmanr(df[x_column], df[y_column])
-        
-        # 添加标题和标签
-        plt.title(f'{x_column} vs {y_column}\n皮尔逊相关系数: {pearson_corr:.3f} (p={pearson_p:.3f})')
-        plt.xlabel(x_column)
-        plt.ylabel(y_column)
-        
-        # 添加网格
-        plt.grid(True, alpha=0.3)
+        pearson_corr, pearson_p = stats.pearsonr(x, y)
+        spearman_corr, spearman_p = stats.spearmanr(x, y)
+        current_reporter().partial("correlation", {
+            "pearson_correlation": float(pearson_corr),
+            "spearman_correlation": float(spearman_corr),
+            "sample_size": len(valid_data)
+        })
         
-        # 保存图表
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        # 绘制散点图（点数过多时抽样）并添加趋势线
+        panel = scatter_panel(
+            x, y, alpha=0.6, fit_line=True,
+            title=f'{x_column} vs {y_column}\n皮尔逊相关系数: {pearson_corr:.3f} (p={pearson_p:.3f})',
+            xlabel=x_column, ylabel=y_column
+        )
+        get_render_pool().render(figure_spec(save_path, [panel], figsize=(10, 8)))
         
         # 返回结果
         return {
@@ -79,7 +73,7 @@ def generate_scatter_plot(
             "pearson_p_value": float(pearson_p),
             "spearman_correlation": float(spearman_corr),
             "spearman_p_value": float(spearman_p),
-            "sample_size": len(df)
+            "sample_size": len(valid_data)
         }
         
     except Exception as e:
@@ -91,4 +85,4 @@ if __name__ == "__main__":
         result = generate_scatter_plot(sys.argv[1], sys.argv[2], sys.argv[3])
         print(result)
     else:
-        print("用法: python 多变量相关性.py <csv文件路径> <x列名> <y列名>")
\ No newline at end of file
+        print("用法: python -m function.多变量相关性 <csv文件路径> <x列名> <y列名>")
\ No newline at end of file
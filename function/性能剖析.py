@@ -0,0 +1,212 @@
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List, Sequence, Tuple
+
+# 剖析结果（.prof文件和内存分配报告）的保存目录
+PROFILE_DIR = os.environ.get("CHART_PROFILE_DIR", "./profiles")
+# 未显式要求剖析的请求按该比例随机抽取进行剖析，默认为0（不抽样）
+PROFILE_SAMPLE_RATE = float(os.environ.get("CHART_PROFILE_SAMPLE_RATE", "0"))
+# 摘要中列出的热点函数和内存分配位置数量
+PROFILE_TOP_N = 10
+# 内存分配报告中列出的分配位置数量
+ALLOCATION_REPORT_LINES = 50
+# tracemalloc记录的调用栈深度，1即只记录分配发生的代码行
+TRACEMALLOC_FRAMES = 1
+# 检查已跟踪内存是否创新高的间隔（秒）
+PEAK_POLL_INTERVAL = 0.05
+# 已跟踪内存超过上次快照时的该倍数才重新拍摄快照
+PEAK_SNAPSHOT_GROWTH = 1.1
+
+# tracemalloc是进程级的，多个剖析请求同时执行时共用一次跟踪
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+# Python 3.12起同一时间只能启用一个cProfile剖析器（sys.monitoring为进程级），
+# 其它剖析请求只跟踪内存，不做CPU剖析
+_cpu_profiler_lock = threading.Lock()
+CPU_PROFILER_BUSY = "另一个请求正在进行CPU剖析，本次只记录内存"
+
+
+def should_profile(requested: bool = False) -> bool:
+    """请求显式要求剖析，或按CHART_PROFILE_SAMPLE_RATE被抽中"""
+    return requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def _start_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class _PeakSampler(threading.Thread):
+    """
+    后台定期检查已跟踪内存，在创新高时拍摄快照
+
+    计算结束时大部分中间结果已释放，结束时的快照只反映残留内存；
+    峰值附近的快照才能说明内存主要被哪些代码占用
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.snapshot = None
+        self.snapshot_mb = 0.0
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(PEAK_POLL_INTERVAL):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_mb * 2 ** 20 * PEAK_SNAPSHOT_GROWTH:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_mb = current / 2 ** 20
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _hotspots(profiler: cProfile.Profile, top_n: int) -> List[Dict[str, Any]]:
+    """按累计耗时排列的函数，跳过剖析入口本身"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{lineno}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4),
+        })
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[1:top_n + 1] if rows else []
+
+
+def _allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    """按分配量排列的代码行"""
+    statistics = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen *>"),
+    ]).statistics("lineno")
+    return [
+        {
+            "site": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+            "size_mb": round(stat.size / 2 ** 20, 3),
+            "count": stat.count,
+        }
+        for stat in statistics[:limit]
+    ]
+
+
+def run_profiled(func: Callable, args: Sequence[Any] = (), label: str = "request"
+                 ) -> Tuple[Any, Dict[str, Any]]:
+    """
+    在CPU剖析器和tracemalloc下执行函数，剖析结果写入PROFILE_DIR
+
+    cProfile只记录调用线程：分区加载线程和渲染进程中的耗时表现为等待
+    （如wait/acquire）。同一时间只有一个请求做CPU剖析，其余请求照常执行，
+    摘要中注明未做CPU剖析。tracemalloc是进程级的，同时执行的其它请求的分配也会被计入
+
+    参数:
+        func: 要执行的函数
+        args: 位置参数
+        label: 剖析文件名中使用的名称（通常为函数名）
+
+    返回:
+        (函数返回值, 剖析摘要)，摘要包含耗时、内存峰值、热点函数、
+        内存接近峰值时的主要分配位置和文件路径
+    """
+    profiler = cProfile.Profile() if _cpu_profiler_lock.acquire(blocking=False) else None
+    _start_tracing()
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    sampler = _PeakSampler()
+    sampler.start()
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # 进程中还有本模块以外的剖析工具
+                _cpu_profiler_lock.release()
+                profiler = None
+        try:
+            result = func(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _cpu_profiler_lock.release()
+            sampler.stop()
+        wall, cpu = time.perf_counter() - start_wall, time.thread_time() - start_cpu
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = sampler.snapshot or tracemalloc.take_snapshot()
+        snapshot_mb = sampler.snapshot_mb if sampler.snapshot else None
+    finally:
+        _stop_tracing()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{label}_{os.getpid()}_{threading.get_ident()}")
+    profile_path, allocation_path = f"{base}.prof", f"{base}_alloc.txt"
+    if profiler is not None:
+        profiler.dump_stats(profile_path)
+    else:
+        profile_path = None
+    allocations = _allocations(snapshot, ALLOCATION_REPORT_LINES)
+    with open(allocation_path, "w", encoding="utf-8") as f:
+        f.write(f"峰值内存: {peak / 2 ** 20:.2f}MB\n")
+        if snapshot_mb is not None:
+            f.write(f"以下为已跟踪内存达到 {snapshot_mb:.2f}MB 时的分配位置\n")
+        for row in allocations:
+            f.write(f"{row['site']}\t{row['size_mb']}MB\t{row['count']}个对象\n")
+
+    summary = {
+        "wall_seconds": round(wall, 3),
+        "cpu_seconds": round(cpu, 3),
+        "peak_traced_mb": round(peak / 2 ** 20, 2),
+        "cpu_profiled": profiler is not None,
+        "cpu_profile_note": None if profiler is not None else CPU_PROFILER_BUSY,
+        "hotspots": _hotspots(profiler, PROFILE_TOP_N) if profiler is not None else [],
+        "top_allocations": allocations[:PROFILE_TOP_N],
+        "allocations_at_mb": round(snapshot_mb, 2) if snapshot_mb is not None else None,
+        "profile_path": profile_path,
+        "allocation_path": allocation_path,
+    }
+    return result, summary
+
+
+def format_profile_summary(summary: Dict[str, Any], top_n: int = 5) -> str:
+    """剖析摘要的简短文本形式"""
+    lines = [f"耗时 {summary['wall_seconds']}秒（本线程CPU {summary['cpu_seconds']}秒），"
+             f"内存峰值 {summary['peak_traced_mb']}MB"]
+    if summary["cpu_profiled"]:
+        lines.append("热点函数（累计耗时）:")
+        lines.extend(f"  {row['cumtime']}秒  {row['function']}  ×{row['calls']}"
+                     for row in summary["hotspots"][:top_n])
+    else:
+        lines.append(summary["cpu_profile_note"])
+    at_mb = summary.get("allocations_at_mb")
+    lines.append(f"主要内存分配（已跟踪内存 {at_mb}MB 时）:" if at_mb is not None else "主要内存分配:")
+    lines.extend(f"  {row['size_mb']}MB  {row['site']}" for row in summary["top_allocations"][:top_n])
+    lines.append(f"剖析文件: {summary['profile_path'] or summary['allocation_path']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        stats = pstats.Stats(sys.argv[1])
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N * 3)
+    else:
+        print("用法: python -m function.性能剖析 <.prof文件路径>")
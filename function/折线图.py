@@ -0,0 +1,78 @@
+import os
+from typing import Dict, Any, Optional, Union
+from .绘图规格 import line_series, line_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, read_columns
+from .时间序列 import get_pyramid
+
+def plot_csv_column(
+    csv_path: CsvInput,
+    column_name: str,
+    save_path: str = "./charts",
+    x_column: Optional[str] = None,
+    start: Optional[Union[str, float]] = None,
+    end: Optional[Union[str, float]] = None,
+    width_px: int = 1600
+) -> Dict[str, Any]:
+    """
+    从CSV文件中读取指定列数据并绘制折线图
+
+    数据量较大时按时间窗口和绘图宽度从多分辨率金字塔中选择汇总粒度，
+    绘制各时间桶的均值曲线和min/max包络带，绘制点数不超过width_px
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        column_name: 需要绘制的数值列名
+        save_path: 图片保存目录，默认为'./charts'
+        x_column: 用作横轴的时间列或数值列（可选），缺省时使用行号
+        start: 时间窗口起点（可选），如'2026-01-01 08:00'
+        end: 时间窗口终点（可选）
+        width_px: 绘图宽度（像素），决定最多绘制的点数，默认为1600
+
+    返回:
+        包含图表路径、所用分辨率和窗口统计量的字典
+    """
+    try:
+        # 检查列是否存在（只读取表头）
+        columns = read_columns(csv_path)
+        missing_cols = [col for col in (column_name, x_column) if col and col not in columns]
+        if missing_cols:
+            return {"error": f"列 {missing_cols} 不存在于CSV文件中", "success": False}
+
+        # 确保保存目录存在
+        os.makedirs(save_path, exist_ok=True)
+
+        pyramid = get_pyramid(csv_path, x_column, [column_name])
+        view = pyramid.query(start, end, width_px=width_px)
+        data = view["series"][column_name]
+
+        panel = line_panel(
+            [line_series(view["x"], data["mean"], lower=data["min"], upper=data["max"])],
+            x_is_time=pyramid.is_time,
+            title=f'{column_name} 折线图（分辨率: {view["resolution"]}）',
+            xlabel=x_column or '行号', ylabel=column_name
+        )
+        file_name = dataset_name(csv_path)
+        plot_path = os.path.join(save_path, f'{file_name}_{column_name}_line.png')
+        get_render_pool().render(figure_spec(plot_path, [panel], figsize=(12, 6)))
+
+        return {
+            "success": True,
+            "plot_path": plot_path,
+            "resolution": view["resolution"],
+            "points_plotted": view["points"],
+            "rows_in_window": view["rows_in_window"],
+            "data_stats": view["stats"][column_name]
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2:
+        x_col = sys.argv[3] if len(sys.argv) > 3 else None
+        result = plot_csv_column(sys.argv[1], sys.argv[2], x_column=x_col)
+        print(result)
+    else:
+        print("用法: python -m function.折线图 <csv文件路径> <列名> [时间列名]")
@@ -1,12 +1,45 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import os
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from .绘图规格 import scatter_panel, figure_spec, pairplot_spec
+from .共享内存 import SharedFrame
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, load_csv
+
+# 样式分组使用的点形状
+_MARKERS = ['o', 'X', 's', 'P', 'D', '^', 'v', '*', 'p', 'h']
+
+
+def _scatter_groups(
+    df: pd.DataFrame,
+    hue_column: Optional[str],
+    style_column: Optional[str]
+) -> Optional[List[Dict[str, Any]]]:
+    """按颜色列和样式列的取值组合划分散点分组"""
+    if not hue_column and not style_column:
+        return None
+    hue_values = pd.unique(df[hue_column].dropna()) if hue_column else [None]
+    style_values = pd.unique(df[style_column].dropna()) if style_column else [None]
+    groups = []
+    for i, hue in enumerate(hue_values):
+        hue_mask = (df[hue_column] == hue).to_numpy() if hue_column else True
+        for j, style in enumerate(style_values):
+            style_mask = (df[style_column] == style).to_numpy() if style_column else True
+            mask = np.ones(len(df), dtype=bool) & hue_mask & style_mask
+            if not mask.any():
+                continue
+            label = ', '.join(str(v) for v in (hue, style) if v is not None)
+            groups.append({
+                "label": label,
+                "mask": mask,
+                "color": f'C{i % 10}' if hue_column else None,
+                "marker": _MARKERS[j % len(_MARKERS)],
+            })
+    return groups
 
 def generate_scatter_plot_advanced(
-    csv_path: str,
+    csv_path: CsvInput,
     x_column: str,
     y_column: str,
     hue_column: Optional[str] = None,
@@ -15,13 +48,15 @@ def generate_scatter_plot_advanced(
     figsize: Tuple[int, int] = (10, 8),
     alpha: float = 0.6,
     add_regression: bool = True,
-    point_size: int = 50
+    point_size: int = 50,
+    source_column: Optional[str] = None,
+    sample_frac: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     生成高级散点图，支持分组、样式和回归线
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         x_column: 用作x轴的列名
         y_column: 用作y轴的列名
         hue_column: 用于颜色分组的列名（可选）
@@ -31,13 +66,16 @@ def generate_scatter_plot_advanced(
         alpha: 点的透明度，默认为0.6
         add_regression: 是否添加回归线，默认为True
         point_size: 点的大小，默认为50
+        source_column: 读取多个文件时添加来源文件名列的列名（可选），可用作hue_column
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
 
     返回:
         包含图表路径和统计信息的字典
     """
     try:
         # 读取CSV文件
-        df = pd.read_csv(csv_path)
+        df = load_csv(csv_path, usecols=[x_column, y_column, hue_column, style_column],
+                      source_column=source_column, sample_frac=sample_frac)
         
         # 检查必需列是否存在
         required_columns = [x_column, y_column]
@@ -55,59 +93,34 @@ def generate_scatter_plot_advanced(
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         # 获取文件名用于命名
-        file_name = os.path.splitext(os.path.basename(csv_path))[0]
-        
-        # 创建散点图
-        plt.figure(figsize=figsize)
-        
-        # 使用seaborn创建散点图
-        scatter = sns.scatterplot(
-            data=df,
-            x=x_column,
-            y=y_column,
-            hue=hue_column,
-            style=style_column,
-            alpha=alpha,
-            s=point_size
-        )
-        
-        # 添加回归线（如果启用）
-        if add_regression:
-            sns.regplot(
-                data=df,
-                x=x_column,
-                y=y_column,
-                scatter=False,
-                color='red',
-                line_kws={'linestyle': '--', 'alpha': 0.8}
-            )
+        file_name = dataset_name(csv_path)
         
         # 计算相关系数
         valid_data = df[[x_column, y_column]].dropna()
         pearson_corr = valid_data[x_column].corr(valid_data[y_column])
         
+        # 按颜色/样式分组，点数过多时抽样；回归线基于全量有效数据拟合
+        plot_df = df.dropna(subset=[x_column, y_column])
+        x = plot_df[x_column].to_numpy(dtype=float)
+        y = plot_df[y_column].to_numpy(dtype=float)
+        groups = _scatter_groups(plot_df, hue_column, style_column)
+        
         # 添加标题和标签
         title = f'{x_column} vs {y_column}'
         if hue_column:
             title += f' (按{hue_column}分组)'
         
-        plt.title(f'{title}\n相关系数: {pearson_corr:.3f}')
-        plt.xlabel(x_column)
-        plt.ylabel(y_column)
-        
-        # 添加网格
-        plt.grid(True, alpha=0.3)
+        panel = scatter_panel(
+            x, y, alpha=alpha, size=point_size, fit_line=add_regression,
+            groups=groups, legend_title=hue_column or style_column,
+            title=f'{title}\n相关系数: {pearson_corr:.3f}',
+            xlabel=x_column, ylabel=y_column
+        )
         
         # 保存图表
         save_path = os.path.join(save_dir, f'{file_name}_{x_column}_{y_column}_scatter_advanced.png')
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        get_render_pool().render(figure_spec(save_path, [panel], figsize=figsize))
         
         # 计算分组统计（如果有分组变量）
         group_stats = {}
@@ -145,26 +158,31 @@ def generate_scatter_plot_advanced(
         return {"error": str(e), "success": False}
 
 def generate_pairplot(
-    csv_path: str,
+    csv_path: CsvInput,
     numeric_columns: list,
     hue_column: Optional[str] = None,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    source_column: Optional[str] = None,
+    sample_frac: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     生成数值变量的配对图矩阵
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         numeric_columns: 要分析的数值列名列表
         hue_column: 用于颜色分组的列名（可选）
         save_dir: 图片保存目录，默认为'./charts'
+        source_column: 读取多个文件时添加来源文件名列的列名（可选），可用作hue_column
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
 
     返回:
         包含图表路径的字典
     """
     try:
         # 读取CSV文件
-        df = pd.read_csv(csv_path)
+        df = load_csv(csv_path, usecols=list(numeric_columns) + [hue_column],
+                      source_column=source_column, sample_frac=sample_frac)
         
         # 检查列是否存在
         missing_columns = [col for col in numeric_columns if col not in df.columns]
@@ -177,33 +195,16 @@ def generate_pairplot(
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         # 获取文件名用于命名
-        file_name = os.path.splitext(os.path.basename(csv_path))[0]
+        file_name = dataset_name(csv_path)
         save_path = os.path.join(save_dir, f'{file_name}_pairplot.png')
         
-        # 创建配对图
-        plt.figure(figsize=(12, 10))
-        
-        # 使用seaborn创建配对图
-        pair_plot = sns.pairplot(
-            df[numeric_columns + ([hue_column] if hue_column else [])],
-            hue=hue_column,
-            diag_kind='hist',
-            plot_kws={'alpha': 0.6},
-            diag_kws={'alpha': 0.7}
-        )
-        
-        # 添加标题
-        pair_plot.fig.suptitle('数值变量配对图', y=1.02)
-        
-        # 保存图表
-        plt.tight_layout()
-        pair_plot.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        # 配对图需要全部数据点：将所用列放入共享内存，渲染进程只接收描述符
+        plot_columns = numeric_columns + ([hue_column] if hue_column else [])
+        with SharedFrame(df[plot_columns]) as frame:
+            spec = pairplot_spec(save_path, frame.descriptor, hue=hue_column,
+                                 suptitle='数值变量配对图')
+            get_render_pool().render(spec, frame=frame)
         
         return {
             "success": True,
@@ -215,10 +216,64 @@ def generate_pairplot(
     except Exception as e:
         return {"error": str(e), "success": False}
 
+def plot_csv_scatter(
+    csv_path: CsvInput,
+    y_column: str,
+    x_column: Optional[str] = None,
+    save_path: str = "./charts",
+    sample_frac: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    从CSV文件中读取指定列数据并绘制散点图
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        y_column: 用作y轴的列名
+        x_column: 用作x轴的列名(可选)，缺省时使用行索引
+        save_path: 图片保存目录，默认为'./charts'
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
+
+    返回:
+        包含图表路径和数据点数量的字典
+    """
+    try:
+        # 读取CSV文件
+        df = load_csv(csv_path, usecols=[y_column, x_column], sample_frac=sample_frac)
+        
+        # 检查列是否存在
+        for col in [y_column, x_column]:
+            if col is not None and col not in df.columns:
+                return {"error": f"列 '{col}' 不存在于CSV文件中", "success": False}
+        
+        # 确保保存目录存在
+        os.makedirs(save_path, exist_ok=True)
+        
+        # 缺省时使用行索引作为x轴
+        x_label = x_column or '行索引'
+        x_series = df[x_column] if x_column else pd.Series(df.index, index=df.index)
+        valid = x_series.notna() & df[y_column].notna()
+        x = x_series[valid].to_numpy(dtype=float)
+        y = df.loc[valid, y_column].to_numpy(dtype=float)
+        
+        file_name = dataset_name(csv_path)
+        plot_path = os.path.join(save_path, f'{file_name}_{x_column or "index"}_{y_column}_scatter.png')
+        panel = scatter_panel(x, y, alpha=0.6, title=f'{x_label} vs {y_column}',
+                              xlabel=x_label, ylabel=y_column)
+        get_render_pool().render(figure_spec(plot_path, [panel], figsize=(10, 8)))
+        
+        return {
+            "success": True,
+            "plot_path": plot_path,
+            "num_points": int(valid.sum())
+        }
+        
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 3:
         result = generate_scatter_plot_advanced(sys.argv[1], sys.argv[2], sys.argv[3])
         print(result)
     else:
-        print("用法: python 散点图.py <csv文件路径> <x列名> <y列名> [hue列名] [style列名]")
\ No newline at end of file
+        print("用法: python -m function.散点图 <csv文件路径> <x列名> <y列名> [hue列名] [style列名]")
\ No newline at end of file
@@ -0,0 +1,150 @@
+import pandas as pd
+import os
+from scipy import stats
+from typing import Dict, Any, List, Optional
+from .绘图规格 import grouped_box_panel, grouped_violin_panel, grouped_density_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, read_columns, load_csv
+from .查询后端 import frame_groupby_stats, get_backend
+from .进度 import current_reporter
+
+# 支持的图表类型及对应的子图标题
+PLOT_TITLES = {
+    "boxplot": "箱线图",
+    "violin": "小提琴图",
+    "density": "核密度图",
+}
+# DuckDB后端的分组统计覆盖全部数据，绘图只读取抽样后的约该行数
+PLOT_SAMPLE_ROWS = 200000
+
+
+def _anova_from_stats(group_stats: pd.DataFrame) -> Dict[str, Any]:
+    """根据各组的样本数、均值和标准差计算单因素方差分析（无需原始数据）"""
+    valid = group_stats[group_stats['count'] > 0]
+    n, mean, std = valid['count'], valid['mean'], valid['std'].fillna(0.0)
+    k, total = len(valid), n.sum()
+    if k < 2 or total <= k:
+        return {"f_statistic": None, "p_value": None}
+    grand_mean = (n * mean).sum() / total
+    ss_between = (n * (mean - grand_mean) ** 2).sum()
+    ss_within = ((n - 1) * std ** 2).sum()
+    if ss_within == 0:
+        return {"f_statistic": None, "p_value": None}
+    f_statistic = (ss_between / (k - 1)) / (ss_within / (total - k))
+    return {"f_statistic": float(f_statistic), "p_value": float(stats.f.sf(f_statistic, k - 1, total - k))}
+
+
+def analyze_numeric_vs_categorical(
+    csv_path: CsvInput,
+    numeric_col: str,
+    category_col: str,
+    plot_types: Optional[List[str]] = None,
+    show_mean: bool = True,
+    show_median: bool = False,
+    save_dir: str = "./charts",
+    backend: Optional[str] = None,
+    sample_frac: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    分析数值变量在不同类别下的分布差异，生成分组箱线图、小提琴图和核密度图
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        numeric_col: 数值列名
+        category_col: 类别列名
+        plot_types: 图表类型列表，可选'boxplot'/'violin'/'density'，默认全部
+        show_mean: 是否标注各组均值，默认为True
+        show_median: 是否在核密度图中标注各组中位数，默认为False
+        save_dir: 图片保存目录，默认为'./charts'
+        backend: 聚合计算后端，可选'pandas'/'duckdb'，缺省使用环境变量CHART_QUERY_BACKEND
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
+
+    返回:
+        包含图表路径、分组统计和方差分析结果的字典
+    """
+    try:
+        plot_types = list(plot_types or PLOT_TITLES)
+        unsupported = [t for t in plot_types if t not in PLOT_TITLES]
+        if unsupported:
+            return {"error": f"不支持的图表类型: {unsupported}，可选 {list(PLOT_TITLES)}", "success": False}
+
+        # 检查列是否存在（只读取表头）
+        missing_cols = [col for col in (numeric_col, category_col) if col not in read_columns(csv_path)]
+        if missing_cols:
+            return {"error": f"列 {missing_cols} 不存在于CSV文件中", "success": False}
+
+        # 确保保存目录存在
+        os.makedirs(save_dir, exist_ok=True)
+
+        # pandas后端：载入这两列后直接计算分组统计，绘图复用同一份数据；
+        # DuckDB后端：分组统计在文件上流式完成，绘图只载入抽样数据
+        query_backend = get_backend(backend)
+        if query_backend.name == "pandas":
+            df = load_csv(csv_path, usecols=[numeric_col, category_col], sample_frac=sample_frac)
+            if not pd.api.types.is_numeric_dtype(df[numeric_col]):
+                return {"error": f"列 '{numeric_col}' 不是数值型", "success": False}
+            group_stats = frame_groupby_stats(df, numeric_col, category_col)
+        else:
+            df = None
+            group_stats = query_backend.groupby_stats(csv_path, numeric_col, category_col,
+                                                      sample_frac=sample_frac)
+        if group_stats.empty:
+            return {"error": f"列 '{category_col}' 没有有效的类别", "success": False}
+
+        # 方差分析只依赖分组统计量，在渲染图表之前先推送给客户端
+        anova = _anova_from_stats(group_stats)
+        current_reporter().partial("group_stats", {"group_stats": group_stats.round(3).to_string(),
+                                                   "anova_f_statistic": anova["f_statistic"],
+                                                   "anova_p_value": anova["p_value"]})
+
+        if df is None:
+            rows = group_stats['count'].sum()
+            plot_frac = min(sample_frac or 1.0, PLOT_SAMPLE_ROWS / rows if rows else 1.0)
+            df = load_csv(csv_path, usecols=[numeric_col, category_col],
+                          sample_frac=plot_frac if plot_frac < 1 else None)
+            if not pd.api.types.is_numeric_dtype(df[numeric_col]):
+                return {"error": f"列 '{numeric_col}' 不是数值型", "success": False}
+        clean = df.dropna(subset=[numeric_col, category_col])
+        groups = [(str(category), values.to_numpy(dtype=float))
+                  for category, values in clean.groupby(category_col)[numeric_col]
+                  if len(values) > 0]
+
+        panels = []
+        for plot_type in plot_types:
+            labels = {"title": f'{numeric_col} 按 {category_col} 分组 - {PLOT_TITLES[plot_type]}'}
+            if plot_type == "boxplot":
+                panels.append(grouped_box_panel(groups, show_mean=show_mean, xlabel=category_col,
+                                                ylabel=numeric_col, **labels))
+            elif plot_type == "violin":
+                panels.append(grouped_violin_panel(groups, show_mean=show_mean, xlabel=category_col,
+                                                   ylabel=numeric_col, **labels))
+            else:
+                panels.append(grouped_density_panel(groups, show_mean=show_mean, show_median=show_median,
+                                                    legend_title=category_col, xlabel=numeric_col, **labels))
+
+        file_name = dataset_name(csv_path)
+        save_path = os.path.join(save_dir, f'{file_name}_{numeric_col}_by_{category_col}.png')
+        get_render_pool().render(figure_spec(save_path, panels, layout=(1, len(panels)),
+                                             figsize=(7 * len(panels), 6)))
+
+        return {
+            "success": True,
+            "plot_path": save_path,
+            "plot_types": plot_types,
+            "group_stats": group_stats.round(3).to_string(),
+            "num_categories": len(group_stats),
+            "total_samples": int(group_stats['count'].sum()),
+            "anova_f_statistic": anova["f_statistic"],
+            "anova_p_value": anova["p_value"]
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 3:
+        result = analyze_numeric_vs_categorical(sys.argv[1], sys.argv[2], sys.argv[3])
+        print(result)
+    else:
+        print("用法: python -m function.数值型and类别型 <csv文件路径> <数值列名> <类别列名>")
@@ -0,0 +1,223 @@
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 不超过该行数时用一次多位点选择（np.partition）计算精确分位数，否则用抽样草图近似
+EXACT_QUANTILE_MAX_ROWS = 10000000
+# 分位数草图的抽样点数（有放回抽样，秩误差约为 1/sqrt(该值)）
+QUANTILE_SKETCH_SIZE = 1000000
+# 融合扫描每次处理的行数，使一块数据在计算各项统计量时留在缓存中
+BLOCK_ROWS = 1 << 16
+# 箱线图须的范围（四分位距的倍数），与matplotlib一致
+WHISKER_IQR = 1.5
+# 摘要中报告的分位数（同时用于箱线图）
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _lerp(a: float, b: float, t: float) -> float:
+    # 与numpy的线性插值写法一致，t接近1时从b端插值以减小误差
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def _exact_quantiles(x: np.ndarray, quantiles: Sequence[float]) -> Dict[str, Any]:
+    """一次多位点选择得到最小值、最大值和各分位数（线性插值，与np.percentile一致）"""
+    n = len(x)
+    positions = [q * (n - 1) for q in quantiles]
+    kth = {0, n - 1}
+    for pos in positions:
+        kth.update((math.floor(pos), min(math.floor(pos) + 1, n - 1)))
+    part = np.partition(x, sorted(kth))
+    values = []
+    for pos in positions:
+        lo = math.floor(pos)
+        hi = min(lo + 1, n - 1)
+        values.append(_lerp(float(part[lo]), float(part[hi]), pos - lo))
+    return {"min": float(part[0]), "max": float(part[n - 1]), "quantiles": values}
+
+
+def _sketch_quantiles(x: np.ndarray, quantiles: Sequence[float], seed: int = 0) -> List[float]:
+    """对固定种子的有放回抽样计算分位数（数据量很大时避免复制和选择整个数组）"""
+    rng = np.random.default_rng(seed)
+    sample = x[rng.integers(0, len(x), QUANTILE_SKETCH_SIZE)]
+    return [float(v) for v in np.quantile(sample, quantiles)]
+
+
+def _histogram_edges(lo: float, hi: float, bins: int) -> np.ndarray:
+    # 与np.histogram相同：数据范围为单个值时向两侧各扩展0.5
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+
+def _bin_indices(block: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """等宽分箱的箱号，按np.histogram的方式修正浮点舍入误差，最大值落入最后一箱"""
+    bins = len(edges) - 1
+    first, last = edges[0], edges[-1]
+    indices = ((block - first) * (bins / (last - first))).astype(np.intp)
+    indices[indices == bins] -= 1
+    indices[block < edges[indices]] -= 1
+    increment = (block >= edges[indices + 1]) & (indices != bins - 1)
+    indices[increment] += 1
+    return indices
+
+
+def split_finite(values: Any) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    转换为float数组并去除缺失值和无穷值
+
+    返回:
+        (有限值数组, 去除的数量)，数量中missing为NaN个数，infinite为±inf个数
+    """
+    raw = np.asarray(values, dtype=float)
+    finite = np.isfinite(raw)
+    dropped = raw[~finite]
+    infinite = int(np.isinf(dropped).sum())
+    return raw[finite], {"missing": len(dropped) - infinite, "infinite": infinite}
+
+
+def summarize_numeric(values: np.ndarray, bins: Optional[int] = 30,
+                      exact_quantiles: Optional[bool] = None, dropna: bool = True,
+                      dropped: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    数值列的融合摘要：一次去除缺失值，一次融合扫描得到绘图和统计所需的全部量
+
+    先由分位数（精确选择或抽样草图）确定四分位数和箱线图须的界限，再按块扫描一遍，
+    在每一块数据上同时累加各阶矩（以中位数为平移量的幂和，避免大数相减的精度损失）、
+    直方图频数，并划分须内的极值和异常点
+
+    与pandas.Series.describe不同，±inf不计入count/mean/max等统计量（否则均值、
+    标准差和直方图分箱都没有意义），而是单独以infinite报告
+
+    参数:
+        values: 数值数组，可包含NaN和无穷值（均不参与统计）
+        bins: 直方图分箱数（可选），为None时不计算直方图
+        exact_quantiles: 是否计算精确分位数，缺省在行数不超过EXACT_QUANTILE_MAX_ROWS时精确计算
+        dropna: 是否去除NaN和无穷值；调用方已用split_finite去除（以便复用去除后的数组）时传入False
+        dropped: dropna为False时由调用方传入split_finite返回的去除数量
+
+    返回:
+        包含count（有限值个数）/missing（NaN个数）/infinite（±inf个数）/mean/std/skew/kurtosis/min/max、quantiles、
+        box（与box_stats口径一致，fliers为全部异常点）和histogram（counts/edges）的字典；
+        偏度和峰度为与pandas一致的无偏估计（峰度为超额峰度）
+    """
+    if dropna:
+        x, dropped = split_finite(values)
+    else:
+        x = np.asarray(values, dtype=float)
+        dropped = dropped or {"missing": 0, "infinite": 0}
+    n = len(x)
+    summary: Dict[str, Any] = {"count": n, "missing": dropped["missing"], "infinite": dropped["infinite"]}
+    if n == 0:
+        summary.update(mean=None, std=None, skew=None, kurtosis=None, min=None, max=None,
+                       quantiles={}, quantiles_exact=True, box=None, histogram=None)
+        return summary
+
+    if exact_quantiles is None:
+        exact_quantiles = n <= EXACT_QUANTILE_MAX_ROWS
+    if exact_quantiles:
+        selected = _exact_quantiles(x, QUANTILES)
+        lo, hi, quantile_values = selected["min"], selected["max"], selected["quantiles"]
+    else:
+        lo, hi = float(x.min()), float(x.max())
+        quantile_values = _sketch_quantiles(x, QUANTILES)
+    q1, median, q3 = quantile_values
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - WHISKER_IQR * iqr, q3 + WHISKER_IQR * iqr
+
+    edges = _histogram_edges(lo, hi, bins) if bins else None
+    counts = np.zeros(bins, dtype=np.int64) if bins else None
+    sums = np.zeros(4)
+    whislo, whishi = np.inf, -np.inf
+    fliers = []
+    for start in range(0, n, BLOCK_ROWS):
+        block = x[start:start + BLOCK_ROWS]
+        d = block - median
+        d2 = d * d
+        sums += (d.sum(), d2.sum(), (d2 * d).sum(), (d2 * d2).sum())
+        if bins:
+            counts += np.bincount(_bin_indices(block, edges), minlength=bins)
+        inside = (block >= low_fence) & (block <= high_fence)
+        if inside.all():
+            whislo, whishi = min(whislo, block.min()), max(whishi, block.max())
+        else:
+            kept = block[inside]
+            if len(kept):
+                whislo, whishi = min(whislo, kept.min()), max(whishi, kept.max())
+            fliers.append(block[~inside])
+
+    # 由平移后的幂和得到中心矩
+    a, s2, s3, s4 = sums / n
+    m2 = max(s2 - a * a, 0.0)
+    m3 = s3 - 3 * a * s2 + 2 * a ** 3
+    m4 = s4 - 4 * a * s3 + 6 * a * a * s2 - 3 * a ** 4
+    std = math.sqrt(m2 * n / (n - 1)) if n > 1 else None
+    # 平移后的二阶中心矩之和低于pandas的舍入误差阈值时视为常数列（偏度和峰度为0）。
+    # 幂和已按中位数平移，阈值不随数据的量级放大：偏移很大、离散很小的列仍有偏度和峰度
+    constant = m2 * n < 1e-14
+    skew = None if n < 3 else (0.0 if constant else
+                               math.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5)
+    kurtosis = None if n < 4 else (0.0 if constant else
+                                   ((n + 1) * (m4 / m2 ** 2 - 3) + 6) * (n - 1) / ((n - 2) * (n - 3)))
+
+    if whislo > whishi:
+        whislo, whishi = q1, q3
+    summary.update(
+        mean=float(median + a),
+        std=std,
+        skew=skew,
+        kurtosis=kurtosis,
+        min=lo,
+        max=hi,
+        quantiles=dict(zip(QUANTILES, quantile_values)),
+        quantiles_exact=exact_quantiles,
+        box={
+            "med": median,
+            "q1": q1,
+            "q3": q3,
+            "whislo": float(whislo),
+            "whishi": float(whishi),
+            "fliers": np.concatenate(fliers) if fliers else np.array([]),
+        },
+        histogram={"counts": counts, "edges": edges} if bins else None,
+    )
+    return summary
+
+
+def describe_summary(summary: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """按pandas.Series.describe的字段和顺序排列摘要"""
+    quantiles = summary["quantiles"]
+    return {
+        "count": float(summary["count"]),
+        "mean": summary["mean"],
+        "std": summary["std"],
+        "min": summary["min"],
+        "25%": quantiles.get(0.25),
+        "50%": quantiles.get(0.5),
+        "75%": quantiles.get(0.75),
+        "max": summary["max"],
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import pandas as pd
+
+    if len(sys.argv) > 2:
+        series = pd.read_csv(sys.argv[1], usecols=[sys.argv[2]])[sys.argv[2]]
+        start = time.perf_counter()
+        result = summarize_numeric(series.to_numpy(dtype=float))
+        fused = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = series.describe()
+        expected_skew, expected_kurt = series.skew(), series.kurtosis()
+        separate = time.perf_counter() - start
+        print(pd.DataFrame({"融合摘要": pd.Series(describe_summary(result)), "pandas": expected}))
+        print(f"偏度: {result['skew']:.6f} / {expected_skew:.6f}")
+        print(f"峰度: {result['kurtosis']:.6f} / {expected_kurt:.6f}")
+        print(f"缺失值: {result['missing']}，无穷值: {result['infinite']}（未计入融合摘要）")
+        print(f"耗时: 融合摘要 {fused:.3f}秒，pandas {separate:.3f}秒")
+    else:
+        print("用法: python -m function.数值摘要 <csv文件路径> <列名>")
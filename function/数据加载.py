@@ -0,0 +1,323 @@
+import glob
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .进度 import current_reporter
+
+# 并行读取分区文件的线程数，可通过环境变量覆盖
+LOAD_WORKERS = int(os.environ.get("CHART_LOAD_WORKERS", min(8, os.cpu_count() or 1)))
+
+# 抽样读取时使用的随机种子，保证同一请求多次执行结果一致
+SAMPLE_SEED = 0
+
+# 单个文件路径、通配符模式（如 events_2026-10-*.csv）或文件路径列表
+CsvInput = Union[str, Sequence[str]]
+
+_GLOB_CHARS = set('*?[')
+
+
+def _is_pattern(path: str) -> bool:
+    # 已存在的文件按字面路径处理（文件名本身可能含有'['等字符，如 data[1].csv）
+    return any(ch in path for ch in _GLOB_CHARS) and not os.path.exists(path)
+
+
+def resolve_csv_paths(csv_path: CsvInput) -> List[str]:
+    """
+    将输入展开为CSV文件路径列表
+
+    参数:
+        csv_path: 单个文件路径、通配符模式或文件路径列表
+
+    返回:
+        按顺序排列的文件路径列表（通配符匹配结果按文件名排序）
+    """
+    patterns = [csv_path] if isinstance(csv_path, str) else list(csv_path)
+    paths: List[str] = []
+    for pattern in patterns:
+        if _is_pattern(pattern):
+            matched = sorted(glob.glob(pattern))
+            if not matched:
+                raise FileNotFoundError(f"没有匹配 '{pattern}' 的CSV文件")
+            paths.extend(matched)
+        else:
+            paths.append(pattern)
+    if not paths:
+        raise FileNotFoundError("未指定CSV文件")
+    return paths
+
+
+def dataset_name(csv_path: CsvInput) -> str:
+    """
+    生成用于图片命名的数据集名称
+
+    单个文件使用文件名（不含扩展名）；通配符模式将通配符替换为'all'；
+    文件列表使用首个文件名并附加文件数量
+    """
+    if isinstance(csv_path, str):
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        if _is_pattern(csv_path):
+            stem = stem.replace('*', 'all').replace('?', '_').replace('[', '').replace(']', '')
+        return stem
+    paths = list(csv_path)
+    stem = dataset_name(paths[0])
+    return stem if len(paths) == 1 else f'{stem}_等{len(paths)}个文件'
+
+
+def file_fingerprint(csv_path: CsvInput) -> List[Tuple[str, int, int]]:
+    """
+    计算输入文件的指纹（绝对路径、文件大小、修改时间），用于识别同一份数据
+
+    返回:
+        每个文件一项的(绝对路径, 字节数, 修改时间纳秒)列表
+    """
+    fingerprint = []
+    for path in resolve_csv_paths(csv_path):
+        stat = os.stat(path)
+        fingerprint.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith('.parquet')
+
+
+def _header(path: str) -> List[str]:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_columns(csv_path: CsvInput) -> List[str]:
+    """只读取表头，返回首个文件的列名"""
+    return _header(resolve_csv_paths(csv_path)[0])
+
+
+def _read_partition(
+    path: str,
+    usecols: Optional[List[str]],
+    source_column: Optional[str],
+    sample_frac: Optional[float] = None,
+    chunksize: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """读取单个分区，按chunksize分块产出；sample_frac小于1时在解析阶段随机跳过行"""
+    if usecols is not None:
+        # 仅读取存在的列，缺失列交由调用方按原有方式报错
+        usecols = [col for col in _header(path) if col in set(usecols)]
+    sampling = sample_frac is not None and sample_frac < 1
+    if _is_parquet(path):
+        df = pd.read_parquet(path, columns=usecols)
+        if sampling:
+            df = df.sample(frac=sample_frac, random_state=SAMPLE_SEED).sort_index()
+        step = chunksize or max(len(df), 1)
+        chunks = (df.iloc[i:i + step] for i in range(0, len(df), step)) if len(df) else iter([df])
+    else:
+        kwargs: Dict[str, Any] = {}
+        if sampling:
+            # 被跳过的行不会被解析，内存占用随抽样比例下降
+            rng = np.random.default_rng(SAMPLE_SEED)
+            kwargs["skiprows"] = lambda i: i > 0 and rng.random() >= sample_frac
+        if chunksize:
+            chunks = pd.read_csv(path, usecols=usecols, chunksize=chunksize, **kwargs)
+        else:
+            chunks = iter([pd.read_csv(path, usecols=usecols, **kwargs)])
+    for chunk in chunks:
+        if source_column:
+            chunk[source_column] = os.path.basename(path)
+        yield chunk
+
+
+def map_partitions(
+    csv_path: CsvInput,
+    func: Callable[[pd.DataFrame], Any],
+    usecols: Optional[List[str]] = None,
+    source_column: Optional[str] = None,
+    sample_frac: Optional[float] = None,
+    chunksize: Optional[int] = None
+) -> List[Any]:
+    """
+    在线程池中并行读取每个分区文件并对其调用func，不拼接分区
+
+    参数:
+        csv_path: 单个文件路径、通配符模式或文件路径列表
+        func: 作用于单个分区DataFrame的函数（通常计算部分聚合结果）
+        usecols: 只读取的列（可选）
+        source_column: 添加来源文件名列的列名（可选）
+        sample_frac: 随机抽样比例（可选），小于1时只解析部分行
+        chunksize: 分块读取的行数（可选），给出时func作用于每个数据块，
+            单个大文件的内存占用不超过一个数据块
+
+    返回:
+        与文件（及数据块）顺序一致的func结果列表
+    """
+    paths = resolve_csv_paths(csv_path)
+    # 线程池中的读取线程没有请求上下文，显式传递报告器
+    reporter = current_reporter()
+    reporter.phase("解析数据行")
+
+    def _load(path: str) -> List[Any]:
+        results = []
+        for chunk in _read_partition(path, usecols, source_column, sample_frac, chunksize):
+            results.append(func(chunk))
+            reporter.advance(len(chunk))
+        return results
+
+    if len(paths) == 1 or LOAD_WORKERS <= 1:
+        results = [_load(path) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(paths))) as executor:
+            results = list(executor.map(_load, paths))
+    return [result for partition in results for result in partition]
+
+
+def load_csv(
+    csv_path: CsvInput,
+    usecols: Optional[List[str]] = None,
+    source_column: Optional[str] = None,
+    sample_frac: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    读取一个或多个CSV文件，多个分区在线程池中并行读取后按文件顺序拼接
+
+    参数:
+        csv_path: 单个文件路径、通配符模式或文件路径列表
+        usecols: 只读取的列（可选），不存在的列会被忽略
+        source_column: 添加来源文件名列的列名（可选）
+        sample_frac: 随机抽样比例（可选），用于内存不足时的抽样模式
+
+    返回:
+        拼接后的DataFrame
+    """
+    partitions = map_partitions(csv_path, lambda df: df, usecols=usecols,
+                                source_column=source_column, sample_frac=sample_frac)
+    if len(partitions) == 1:
+        return partitions[0]
+    return pd.concat(partitions, ignore_index=True)
+
+
+def partial_value_counts(df: pd.DataFrame, column: str) -> Dict[str, Any]:
+    """单个分区的频数部分聚合"""
+    series = df[column]
+    return {
+        "counts": series.value_counts(),
+        "rows": len(series),
+        "missing": int(series.isnull().sum()),
+    }
+
+
+def combine_value_counts(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并各分区的频数，结果按频数降序排列"""
+    if len(partials) == 1:
+        return partials[0]
+    counts = pd.concat([p["counts"] for p in partials]).groupby(level=0, sort=False).sum()
+    return {
+        "counts": counts.sort_values(ascending=False, kind='stable'),
+        "rows": sum(p["rows"] for p in partials),
+        "missing": sum(p["missing"] for p in partials),
+    }
+
+
+def partial_pearson(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    单个分区的成对Pearson相关部分聚合（成对剔除缺失值，与DataFrame.corr口径一致）
+
+    对每对变量(i, j)记录共同非缺失样本数、各自均值以及离差平方和/离差积和，
+    全部以矩阵形式计算；数据先按列均值平移以保证数值稳定
+    """
+    values = df.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    weights = mask.astype(float)
+    with warnings.catch_warnings():
+        # 全为缺失值的列均值为NaN，按0平移即可
+        warnings.simplefilter('ignore', RuntimeWarning)
+        shift = np.nan_to_num(np.nanmean(values, axis=0))
+    centered = np.where(mask, values - shift, 0.0)
+    n = weights.T @ weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sum_x = centered.T @ weights          # sum_x[i, j]: 在(i, j)共同样本上x_i之和
+        sum_xx = (centered ** 2).T @ weights
+        sum_xy = centered.T @ centered
+        safe_n = np.where(n > 0, n, 1.0)
+        mean = sum_x / safe_n
+        return {
+            "n": n,
+            "mean": mean + shift[:, None],
+            "m2": sum_xx - sum_x ** 2 / safe_n,
+            "comoment": sum_xy - sum_x * sum_x.T / safe_n,
+            "columns": list(df.columns),
+        }
+
+
+def combine_pearson(partials: List[Dict[str, Any]]) -> pd.DataFrame:
+    """使用并行方差合并公式合并各分区的部分聚合，返回Pearson相关系数矩阵"""
+    total = partials[0]
+    for part in partials[1:]:
+        n = total["n"] + part["n"]
+        safe_n = np.where(n > 0, n, 1.0)
+        delta = part["mean"] - total["mean"]
+        weight = total["n"] * part["n"] / safe_n
+        total = {
+            "n": n,
+            "mean": total["mean"] + delta * part["n"] / safe_n,
+            "m2": total["m2"] + part["m2"] + delta ** 2 * weight,
+            "comoment": total["comoment"] + part["comoment"] + delta * delta.T * weight,
+            "columns": total["columns"],
+        }
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = total["comoment"] / np.sqrt(total["m2"] * total["m2"].T)
+    corr[total["n"] < 2] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    # 对角线与DataFrame.corr一致：方差为0或样本不足时为NaN，否则为1
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return pd.DataFrame(corr, index=total["columns"], columns=total["columns"])
+
+
+def partial_moments(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    单个分区各列的矩部分聚合（按列忽略缺失值）
+
+    记录非缺失样本数、均值和以分区均值为中心的二至四阶中心矩之和，全部按列向量计算
+    """
+    values = df.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=0).astype(float)
+    with np.errstate(invalid='ignore', over='ignore'):
+        mean = np.where(mask, values, 0.0).sum(axis=0) / np.where(n > 0, n, 1.0)
+        dev = np.where(mask, values - mean, 0.0)
+        dev2 = dev * dev
+    return {
+        "n": n,
+        "mean": mean,
+        "m2": dev2.sum(axis=0),
+        "m3": (dev2 * dev).sum(axis=0),
+        "m4": (dev2 * dev2).sum(axis=0),
+        "columns": list(df.columns),
+    }
+
+
+def combine_moments(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """使用高阶矩的并行合并公式（Pébay）合并各分区的矩部分聚合"""
+    total = partials[0]
+    for part in partials[1:]:
+        na, nb = total["n"], part["n"]
+        n = na + nb
+        delta = part["mean"] - total["mean"]
+        d = delta / np.where(n > 0, n, 1.0)
+        m2a, m3a, m4a = total["m2"], total["m3"], total["m4"]
+        m2b, m3b, m4b = part["m2"], part["m3"], part["m4"]
+        total = {
+            "n": n,
+            "mean": total["mean"] + d * nb,
+            "m2": m2a + m2b + delta * d * na * nb,
+            "m3": (m3a + m3b + delta * d ** 2 * na * nb * (na - nb)
+                   + 3 * d * (na * m2b - nb * m2a)),
+            "m4": (m4a + m4b + delta * d ** 3 * na * nb * (na * na - na * nb + nb * nb)
+                   + 6 * d ** 2 * (na * na * m2b + nb * nb * m2a) + 4 * d * (na * m3b - nb * m3a)),
+            "columns": total["columns"],
+        }
+    return total
@@ -0,0 +1,405 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .数据加载 import CsvInput, file_fingerprint, load_csv
+from .准入控制 import MEMORY_BUDGET_MB, get_admission_controller
+from .进度 import current_reporter
+
+# 缓存的时间序列金字塔数量上限（按数据文件指纹、时间列和数值列区分）
+PYRAMID_CACHE_SIZE = int(os.environ.get("CHART_PYRAMID_CACHE", "8"))
+# 金字塔缓存占用的内存上限（MB），默认为内存预算的四分之一；缓存占用计入准入控制的预算
+PYRAMID_CACHE_MB = float(os.environ.get("CHART_PYRAMID_CACHE_MB", MEMORY_BUDGET_MB / 4))
+# 磁盘缓存目录（可选）：保存解析后的横轴和数值列，多个服务进程共享，无需各自重新解析CSV
+CACHE_DIR = os.environ.get("CHART_CACHE_DIR")
+# 磁盘缓存的占用上限（MB），超过时按最近使用（文件修改时间）删除
+DISK_CACHE_MB = float(os.environ.get("CHART_CACHE_DIR_MB", "2048"))
+# 时间轴的汇总粒度（秒），相邻粒度成整数倍关系，每一层可由上一层合并得到
+TIME_BUCKETS = [1, 10, 60, 600, 3600, 6 * 3600, 86400, 7 * 86400]
+# 行号/数值轴的汇总粒度（原始采样间隔的倍数）
+INDEX_BUCKETS = [4 ** k for k in range(1, 13)]
+# 汇总到桶数少于该值时不再建立更粗的层级
+MIN_BUCKETS = 100
+# 窗口内原始点数不超过 宽度 × 该值 时直接绘制原始数据
+RAW_POINTS_PER_PX = 2
+# 计算中位数时最多使用的原始点数，超过时等间隔抽样
+MEDIAN_MAX_POINTS = 1000000
+
+_NS_PER_SECOND = 10 ** 9
+
+AxisValue = Union[str, float, int, pd.Timestamp, None]
+
+
+def _bucket_label(bucket: int, is_time: bool, unit: float) -> str:
+    """分辨率的可读名称"""
+    if not is_time:
+        return f"{bucket}行" if unit == 1 else f"{bucket}倍采样间隔"
+    seconds = bucket // _NS_PER_SECOND
+    for unit, size in (("周", 7 * 86400), ("天", 86400), ("小时", 3600), ("分钟", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}秒"
+
+
+def _rollup(keys: np.ndarray, columns: Dict[str, Dict[str, np.ndarray]]
+            ) -> Tuple[np.ndarray, Dict[str, Dict[str, np.ndarray]]]:
+    """按已排序的桶编号合并相邻记录，返回桶编号和每列的min/max/sum/count"""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    merged = {}
+    for name, agg in columns.items():
+        merged[name] = {
+            "min": np.fmin.reduceat(agg["min"], starts),
+            "max": np.fmax.reduceat(agg["max"], starts),
+            "sum": np.add.reduceat(agg["sum"], starts),
+            "count": np.add.reduceat(agg["count"], starts),
+        }
+    return keys[starts], merged
+
+
+class TimeSeriesPyramid:
+    """
+    多分辨率时间序列金字塔
+
+    原始数据按时间排序后保留一份，并预先计算若干粒度下每个时间桶的
+    min/max/mean（按sum和count保存以便逐层合并）。查询时根据时间窗口和
+    绘图宽度选择最细的、桶数不超过像素宽度的层级，返回的点数与原始行数无关。
+    """
+
+    def __init__(self, axis: np.ndarray, values: Dict[str, np.ndarray], is_time: bool):
+        """
+        参数:
+            axis: 横轴数值（时间轴为int64纳秒时间戳，其它为行号或数值列的值）
+            values: 列名到数值数组的映射，长度与axis一致
+            is_time: 横轴是否为时间
+        """
+        order = np.argsort(axis, kind='stable')
+        self.axis = axis[order]
+        self.values = {name: np.asarray(v, dtype=float)[order] for name, v in values.items()}
+        self.is_time = is_time
+        self.unit = 1
+        self.levels: List[Dict[str, Any]] = []
+        self._build()
+
+    def _build(self) -> None:
+        if len(self.axis) < 2:
+            return
+        if self.is_time:
+            # 时间轴以纳秒为单位，粒度为固定的时间长度
+            self.unit = 1
+            buckets = [b * _NS_PER_SECOND for b in TIME_BUCKETS]
+            step = np.median(np.diff(self.axis))
+        else:
+            # 数值轴以原始采样间隔为单位，粒度为其4的幂次倍
+            step = float(np.median(np.diff(self.axis)))
+            self.unit = step if step > 0 else float(np.ptp(self.axis)) / len(self.axis) or 1.0
+            buckets = INDEX_BUCKETS
+        columns = {
+            name: {"min": v, "max": v, "sum": np.nan_to_num(v), "count": (~np.isnan(v)).astype(np.int64)}
+            for name, v in self.values.items()
+        }
+        keys, previous = None, None
+        reporter = current_reporter()
+        reporter.phase("建立时间序列金字塔", total=len(buckets))
+        for bucket in buckets:
+            reporter.advance()
+            # 粒度不大于原始采样间隔的层级没有意义
+            if self.is_time and bucket <= step:
+                continue
+            if keys is None:
+                keys = np.floor_divide(self.axis, bucket * self.unit).astype(np.int64)
+            else:
+                # 相邻粒度成整数倍，由上一层的桶编号直接得到本层的桶编号
+                keys = keys * previous // bucket
+            keys, columns = _rollup(keys, columns)
+            self.levels.append({"bucket": bucket, "starts": keys * (bucket * self.unit),
+                                "columns": columns})
+            previous = bucket
+            if len(keys) < MIN_BUCKETS:
+                break
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.axis)
+
+    @property
+    def nbytes(self) -> int:
+        """原始数据和各层汇总占用的字节数"""
+        total = self.axis.nbytes + sum(v.nbytes for v in self.values.values())
+        for level in self.levels:
+            total += level["starts"].nbytes
+            total += sum(arr.nbytes for agg in level["columns"].values() for arr in agg.values())
+        return total
+
+    def to_axis(self, value: AxisValue, default: float) -> float:
+        """将查询边界（时间字符串、Timestamp或数值）转换为横轴数值"""
+        if value is None:
+            return default
+        if self.is_time:
+            return int(pd.Timestamp(value).value)
+        return float(value)
+
+    def query(self, start: AxisValue = None, end: AxisValue = None,
+              width_px: int = 1600) -> Dict[str, Any]:
+        """
+        查询时间窗口内的绘图数据
+
+        参数:
+            start: 窗口起点（包含），缺省为数据起点
+            end: 窗口终点（包含），缺省为数据终点
+            width_px: 绘图区域的像素宽度，决定最多返回的点数
+
+        返回:
+            包含x、各列series（mean/min/max）、所用分辨率和窗口统计量的字典
+        """
+        if self.num_rows == 0:
+            raise ValueError("没有有效的数据点")
+        lo = self.to_axis(start, self.axis[0])
+        hi = self.to_axis(end, self.axis[-1])
+        if lo > hi:
+            raise ValueError("时间窗口的起点晚于终点")
+        raw_lo = np.searchsorted(self.axis, lo, side='left')
+        raw_hi = np.searchsorted(self.axis, hi, side='right')
+        rows_in_window = int(raw_hi - raw_lo)
+        if rows_in_window == 0:
+            raise ValueError("时间窗口内没有数据")
+
+        level = None
+        if rows_in_window > width_px * RAW_POINTS_PER_PX:
+            for candidate in self.levels:
+                width = candidate["bucket"] * self.unit
+                first = np.searchsorted(candidate["starts"], (lo // width) * width, side='left')
+                last = np.searchsorted(candidate["starts"], hi, side='right')
+                level = (candidate, first, last)
+                if last - first <= width_px:
+                    break
+
+        series: Dict[str, Dict[str, np.ndarray]] = {}
+        stats: Dict[str, Dict[str, Any]] = {}
+        if level is None:
+            x = self.axis[raw_lo:raw_hi]
+            for name, v in self.values.items():
+                series[name] = {"mean": v[raw_lo:raw_hi], "min": None, "max": None}
+            resolution = "原始数据"
+        else:
+            candidate, first, last = level
+            x = candidate["starts"][first:last]
+            for name, agg in candidate["columns"].items():
+                count = agg["count"][first:last]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = np.where(count > 0, agg["sum"][first:last] / count, np.nan)
+                series[name] = {"mean": mean, "min": agg["min"][first:last], "max": agg["max"][first:last]}
+            resolution = _bucket_label(candidate["bucket"], self.is_time, self.unit)
+
+        # 窗口统计量：min/max/mean在原始数据切片上计算，中位数在点数过多时抽样近似
+        stride = max(1, rows_in_window // MEDIAN_MAX_POINTS)
+        for name, v in self.values.items():
+            window = v[raw_lo:raw_hi]
+            valid = int((~np.isnan(window)).sum())
+            stats[name] = {
+                "count": valid,
+                "mean": float(np.nanmean(window)) if valid else None,
+                "median": float(np.nanmedian(window[::stride])) if valid else None,
+                "min": float(np.nanmin(window)) if valid else None,
+                "max": float(np.nanmax(window)) if valid else None,
+            }
+
+        if self.is_time:
+            x = x.astype('datetime64[ns]')
+        return {
+            "x": x,
+            "series": series,
+            "resolution": resolution,
+            "points": len(x),
+            "rows_in_window": rows_in_window,
+            "median_sampled": stride > 1,
+            "stats": stats,
+        }
+
+
+def build_pyramid(df: pd.DataFrame, x_column: Optional[str], columns: List[str]) -> TimeSeriesPyramid:
+    """
+    由DataFrame建立金字塔
+
+    x_column为None时以行号为横轴；x_column为数值列时直接使用其数值；
+    否则解析为时间（无法解析的行被丢弃，带时区的时间统一转换为UTC）
+    """
+    if x_column is None:
+        axis = np.arange(len(df), dtype=float)
+        return TimeSeriesPyramid(axis, {c: df[c].to_numpy(dtype=float) for c in columns}, is_time=False)
+
+    x = df[x_column]
+    if pd.api.types.is_numeric_dtype(x):
+        keep = x.notna().to_numpy()
+        axis = x[keep].to_numpy(dtype=float)
+        is_time = False
+    else:
+        parsed = pd.to_datetime(x, errors='coerce')
+        if getattr(parsed.dt, 'tz', None) is not None:
+            parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+        keep = parsed.notna().to_numpy()
+        if not keep.any():
+            raise ValueError(f"列 '{x_column}' 无法解析为时间")
+        axis = parsed[keep].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        is_time = True
+    values = {c: df[c].to_numpy(dtype=float)[keep] for c in columns}
+    return TimeSeriesPyramid(axis, values, is_time=is_time)
+
+
+def _disk_cache_path(fingerprint: List[Tuple[str, int, int]], x_column: Optional[str],
+                     columns: List[str]) -> Optional[str]:
+    """
+    磁盘缓存文件路径，文件名为"数据源摘要_指纹摘要.npz"
+
+    数据源摘要由文件路径、横轴列和数值列决定，文件被修改后只有指纹摘要变化，
+    同一数据源的旧缓存据此识别并删除
+    """
+    if not CACHE_DIR:
+        return None
+    source = repr(([path for path, _, _ in fingerprint], x_column, sorted(columns)))
+    source_digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    version_digest = hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "pyramid", f"{source_digest}_{version_digest}.npz")
+
+
+def _load_from_disk(path: str, columns: List[str]) -> Optional[TimeSeriesPyramid]:
+    """读取磁盘缓存的原始数据并重建各层汇总；缓存不存在或损坏时返回None"""
+    try:
+        with np.load(path) as data:
+            values = {col: data[f"value_{i}"] for i, col in enumerate(sorted(columns))}
+            pyramid = TimeSeriesPyramid(data["axis"], values, is_time=bool(data["is_time"]))
+    except (OSError, KeyError, ValueError):
+        return None
+    try:
+        # 更新修改时间，磁盘缓存按最近使用淘汰
+        os.utime(path)
+    except OSError:
+        pass
+    return pyramid
+
+
+def _save_to_disk(path: str, pyramid: TimeSeriesPyramid, columns: List[str]) -> None:
+    """写入临时文件后原子替换，其它进程不会读到写了一半的缓存"""
+    arrays = {f"value_{i}": pyramid.values[col] for i, col in enumerate(sorted(columns))}
+    if pyramid.axis.nbytes + sum(a.nbytes for a in arrays.values()) > DISK_CACHE_MB * 2 ** 20:
+        return
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.savez(f, axis=pyramid.axis, is_time=np.array(pyramid.is_time), **arrays)
+        os.replace(tmp_path, path)
+    except OSError:
+        # 缓存写入失败（磁盘已满、无权限等）不影响本次查询
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    _prune_disk_cache(path)
+
+
+def _prune_disk_cache(current: str) -> None:
+    """
+    删除与current同一数据源、指纹已过期的缓存文件，再按最近使用删除其它文件，
+    直至总占用不超过DISK_CACHE_MB（刚写入的current保留）
+
+    多个进程可能同时清理，文件已被删除时忽略
+    """
+    directory = os.path.dirname(current)
+    source_prefix = os.path.basename(current).split("_")[0] + "_"
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".npz"):
+            continue
+        try:
+            if entry.path != current and entry.name.startswith(source_prefix):
+                os.remove(entry.path)
+                continue
+            stat = entry.stat()
+        except OSError:
+            continue
+        total += stat.st_size
+        if entry.path != current:
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    limit_bytes = DISK_CACHE_MB * 2 ** 20
+    for _, size, path in sorted(entries):
+        if total <= limit_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+_cache: "OrderedDict[str, TimeSeriesPyramid]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _evict(limit_bytes: float) -> None:
+    """按最近使用淘汰，直至数量和占用均不超过上限（调用方持有_cache_lock）"""
+    global _cache_bytes
+    while _cache and (len(_cache) > PYRAMID_CACHE_SIZE or _cache_bytes > limit_bytes):
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= evicted.nbytes
+    get_admission_controller().set_resident("pyramid_cache", _cache_bytes / 2 ** 20, reclaim=_reclaim)
+
+
+def _reclaim(size_mb: float) -> None:
+    """准入控制器为预算不足的请求回收内存：按最近使用淘汰，直至释放size_mb"""
+    with _cache_lock:
+        _evict(max(_cache_bytes - size_mb * 2 ** 20, 0))
+
+
+def pyramid_cache_status() -> Dict[str, Any]:
+    """内存中金字塔缓存的条目数和占用"""
+    with _cache_lock:
+        return {"entries": len(_cache), "size_mb": round(_cache_bytes / 2 ** 20, 2),
+                "limit_mb": PYRAMID_CACHE_MB, "max_entries": PYRAMID_CACHE_SIZE}
+
+
+def get_pyramid(csv_path: CsvInput, x_column: Optional[str], columns: List[str]) -> TimeSeriesPyramid:
+    """
+    获取（必要时建立并缓存）数据文件对应的金字塔
+
+    缓存键包含数据文件指纹，文件被修改后会重新建立；内存缓存按最近使用淘汰，
+    条目数不超过PYRAMID_CACHE_SIZE、总占用不超过PYRAMID_CACHE_MB（超过上限的单个金字塔不缓存），
+    占用登记到准入控制器，从请求可用的内存预算中扣除；请求因缓存占用而预算不足时淘汰缓存。
+    设置CHART_CACHE_DIR时先查找磁盘缓存，新解析的数据也写入磁盘供其它进程使用；
+    磁盘缓存同样按最近使用淘汰（总占用不超过DISK_CACHE_MB），数据文件修改后旧缓存被删除
+    """
+    fingerprint = file_fingerprint(csv_path)
+    key = repr((fingerprint, x_column, sorted(columns)))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    disk_path = _disk_cache_path(fingerprint, x_column, columns)
+    pyramid = _load_from_disk(disk_path, columns) if disk_path and os.path.exists(disk_path) else None
+    if pyramid is None:
+        usecols = list(columns) + ([x_column] if x_column else [])
+        df = load_csv(csv_path, usecols=usecols)
+        for col in columns:
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                raise ValueError(f"列 '{col}' 不是数值型")
+        pyramid = build_pyramid(df, x_column, columns)
+        if disk_path:
+            _save_to_disk(disk_path, pyramid, columns)
+    global _cache_bytes
+    limit_bytes = PYRAMID_CACHE_MB * 2 ** 20
+    if pyramid.nbytes > limit_bytes:
+        return pyramid
+    with _cache_lock:
+        if key in _cache:
+            # 并发请求已缓存同一份数据
+            _cache.move_to_end(key)
+            return _cache[key]
+        _cache[key] = pyramid
+        _cache_bytes += pyramid.nbytes
+        _evict(limit_bytes)
+    return pyramid
@@ -0,0 +1,364 @@
+import os
+import threading
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .数据加载 import (CsvInput, resolve_csv_paths, load_csv, map_partitions,
+                       partial_value_counts, combine_value_counts,
+                       partial_pearson, combine_pearson)
+from .共享内存 import SharedFrame, attach_frame
+from .渲染进程池 import get_stats_pool
+from .进度 import current_reporter
+
+# 默认的聚合计算后端，可选'pandas'（默认）或'duckdb'
+QUERY_BACKEND = os.environ.get("CHART_QUERY_BACKEND", "pandas")
+# DuckDB使用的线程数（缺省由DuckDB按CPU核数决定）
+DUCKDB_THREADS = os.environ.get("CHART_DUCKDB_THREADS")
+
+# 使用Kendall系数且行数超过该值时，按变量对拆分到统计计算进程中并行计算
+PARALLEL_KENDALL_MIN_ROWS = 10000
+# 每个并行Kendall任务最多计算的变量对数，限制单个任务的耗时
+KENDALL_PAIRS_PER_TASK = 8
+
+# 分组统计与describe的统计量名称（与pandas的describe一致）
+DESCRIBE_FIELDS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def _pearson_partition(df: pd.DataFrame, numeric_columns: List[str]) -> Tuple[set, Dict[str, Any]]:
+    """单个分区：记录其中的数值型列，并计算Pearson部分聚合（非数值列按缺失处理）"""
+    numeric_df = df[numeric_columns].select_dtypes(include=[np.number])
+    return set(numeric_df.columns), partial_pearson(numeric_df.reindex(columns=numeric_columns))
+
+
+def _kendall_pairs_task(descriptor: Dict[str, Any], pairs: List[Tuple[str, str]]) -> List[Tuple[str, str, float]]:
+    """在子进程中通过共享内存挂载数据，计算一组变量对的Kendall相关系数"""
+    with attach_frame(descriptor) as df:
+        return [(a, b, df[a].corr(df[b], method='kendall')) for a, b in pairs]
+
+
+def _parallel_kendall(numeric_df: pd.DataFrame) -> pd.DataFrame:
+    """将数值列放入共享内存，按变量对分块在统计计算进程池中并行计算Kendall相关系数矩阵"""
+    pool = get_stats_pool()
+    cols = list(numeric_df.columns)
+    pairs = [(a, b) for i, a in enumerate(cols) for b in cols[i + 1:]]
+    num_tasks = min(len(pairs), max(pool.workers * 4, (len(pairs) + KENDALL_PAIRS_PER_TASK - 1) // KENDALL_PAIRS_PER_TASK))
+    chunks = [pairs[k::num_tasks] for k in range(num_tasks)]
+    current_reporter().phase(f"计算Kendall相关系数（{len(pairs)}对变量，分{num_tasks}块）", total=num_tasks)
+    with SharedFrame(numeric_df) as frame:
+        results = pool.run_many(_kendall_pairs_task,
+                                [(frame.descriptor, chunk) for chunk in chunks],
+                                frame=frame)
+    corr_matrix = pd.DataFrame(np.eye(len(cols)), index=cols, columns=cols)
+    for chunk in results:
+        for a, b, value in chunk:
+            corr_matrix.loc[a, b] = corr_matrix.loc[b, a] = value
+    return corr_matrix
+
+
+def frame_groupby_stats(df: pd.DataFrame, value_column: str, group_column: str) -> pd.DataFrame:
+    """已载入的数据按类别列分组，返回数值列的描述统计（与后端groupby_stats的结果格式一致）"""
+    stats = df.groupby(group_column)[value_column].describe()
+    return stats.reindex(columns=DESCRIBE_FIELDS).astype(float)
+
+
+class PandasBackend:
+    """
+    默认后端：在pandas中计算聚合
+
+    可合并的统计量（频数、Pearson相关）按分区计算后合并，其余统计量读取所需列后计算
+    """
+
+    name = "pandas"
+
+    def value_counts(self, csv_path: CsvInput, column: str,
+                     chunksize: Optional[int] = None) -> Dict[str, Any]:
+        """返回{"counts": 按频数降序的Series, "rows": 总行数, "missing": 缺失值数量}"""
+        return combine_value_counts(map_partitions(
+            csv_path, partial(partial_value_counts, column=column), usecols=[column],
+            chunksize=chunksize
+        ))
+
+    def describe(self, csv_path: CsvInput, column: str) -> pd.Series:
+        """返回数值列的描述统计（count/mean/std/min/25%/50%/75%/max）"""
+        series = load_csv(csv_path, usecols=[column])[column]
+        return series.describe().reindex(DESCRIBE_FIELDS).astype(float)
+
+    def corr(self, csv_path: CsvInput, columns: List[str], method: str = 'pearson',
+             chunksize: Optional[int] = None, sample_frac: Optional[float] = None) -> pd.DataFrame:
+        """
+        返回指定列中数值型列之间的相关系数矩阵（成对剔除缺失值）
+
+        Pearson相关按分区（给出chunksize时按数据块）合并部分聚合；
+        秩相关需要全部数据，只能通过sample_frac抽样降低内存占用
+        """
+        if method == 'pearson':
+            partials = map_partitions(
+                csv_path, partial(_pearson_partition, numeric_columns=columns), usecols=columns,
+                sample_frac=sample_frac, chunksize=chunksize
+            )
+            # 仅保留在所有分区中均为数值型的列
+            numeric_cols = [col for col in columns
+                            if all(col in numeric for numeric, _ in partials)]
+            if not numeric_cols:
+                return pd.DataFrame()
+            return combine_pearson([part for _, part in partials]).loc[numeric_cols, numeric_cols]
+
+        # 秩相关需要全局排序，拼接各分区后计算
+        numeric_df = load_csv(csv_path, usecols=columns, sample_frac=sample_frac)[columns]
+        numeric_df = numeric_df.select_dtypes(include=[np.number])
+        if numeric_df.empty:
+            return pd.DataFrame()
+        if (method == 'kendall' and get_stats_pool().workers > 1 and numeric_df.shape[1] > 2
+                and len(numeric_df) >= PARALLEL_KENDALL_MIN_ROWS):
+            return _parallel_kendall(numeric_df)
+        current_reporter().phase(f"计算{method}相关系数")
+        return numeric_df.corr(method=method)
+
+    def groupby_stats(self, csv_path: CsvInput, value_column: str, group_column: str,
+                      sample_frac: Optional[float] = None) -> pd.DataFrame:
+        """按类别列分组，返回数值列的描述统计（每组一行）"""
+        df = load_csv(csv_path, usecols=[value_column, group_column], sample_frac=sample_frac)
+        return frame_groupby_stats(df, value_column, group_column)
+
+
+# DuckDB查询中指向输入文件的临时视图名；列名直接拼入SQL，不再经过str.format
+_SOURCE_VIEW = "source_data"
+# 读取CSV时视为缺失值的字符串，与pandas.read_csv默认的na_values一致
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+                 '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+                 'n/a', 'nan', 'null']
+
+
+def _literal(value: str) -> str:
+    """SQL字符串字面量"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """
+    可选后端：由嵌入式的DuckDB直接扫描CSV/Parquet文件完成聚合
+
+    DuckDB按列、多线程并行扫描文件，且不需要将数据整体载入内存，
+    只有聚合后的小结果返回给绘图代码。需要安装duckdb。
+    """
+
+    name = "duckdb"
+
+    _NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT',
+                      'USMALLINT', 'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE', 'DECIMAL', 'REAL')
+
+    def __init__(self, threads: Optional[str] = DUCKDB_THREADS):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("使用DuckDB后端需要安装duckdb: pip install duckdb")
+        self._duckdb = duckdb
+        self.threads = threads
+
+    def _connect(self):
+        # DuckDB连接不是线程安全的，每次查询使用独立连接
+        con = self._duckdb.connect()
+        if self.threads:
+            con.execute(f"SET threads = {int(self.threads)}")
+        return con
+
+    @staticmethod
+    def _source(csv_path: CsvInput) -> str:
+        # 文件路径以SQL字符串字面量写入视图定义（视图定义中不能使用预处理参数）
+        paths = resolve_csv_paths(csv_path)
+        literals = ", ".join(_literal(path) for path in paths)
+        if all(path.lower().endswith('.parquet') for path in paths):
+            return f"read_parquet([{literals}], union_by_name = true)"
+        # 与pandas后端一致地把"NA"、"null"等标记读作缺失值，否则整列会被推断为字符串
+        nullstr = ", ".join(_literal(token) for token in CSV_NA_VALUES)
+        return f"read_csv_auto([{literals}], union_by_name = true, nullstr = [{nullstr}])"
+
+    def _query(self, sql: str, csv_path: CsvInput, params: Optional[List[Any]] = None) -> pd.DataFrame:
+        """在临时视图_SOURCE_VIEW（指向输入文件）上执行查询"""
+        con = self._connect()
+        try:
+            con.execute(f"CREATE TEMP VIEW {_SOURCE_VIEW} AS SELECT * FROM {self._source(csv_path)}")
+            return con.execute(sql, params or []).df()
+        finally:
+            con.close()
+
+    def _numeric_columns(self, csv_path: CsvInput, columns: List[str]) -> List[str]:
+        schema = self._query(f"DESCRIBE SELECT * FROM {_SOURCE_VIEW}", csv_path)
+        types = dict(zip(schema['column_name'], schema['column_type']))
+        return [col for col in columns
+                if col in types and types[col].upper().startswith(self._NUMERIC_TYPES)]
+
+    def _has_missing(self, csv_path: CsvInput, columns: List[str]) -> bool:
+        select = ", ".join(f"count(*) - count({_quote(col)}) AS m{k}" for k, col in enumerate(columns))
+        return bool(self._query(f"SELECT {select} FROM {_SOURCE_VIEW}", csv_path).iloc[0].any())
+
+    # DuckDB流式扫描文件，内存占用与数据量无关，chunksize/sample_frac参数仅为与pandas后端接口一致
+
+    def value_counts(self, csv_path: CsvInput, column: str,
+                     chunksize: Optional[int] = None) -> Dict[str, Any]:
+        col = _quote(column)
+        counts = self._query(
+            f"SELECT {col} AS value, count(*) AS n FROM {_SOURCE_VIEW} "
+            f"WHERE {col} IS NOT NULL GROUP BY {col} ORDER BY n DESC", csv_path
+        )
+        totals = self._query(f"SELECT count(*) AS rows, count({col}) AS valid FROM {_SOURCE_VIEW}", csv_path)
+        rows, valid = int(totals['rows'].iloc[0]), int(totals['valid'].iloc[0])
+        series = pd.Series(counts['n'].to_numpy(), index=counts['value'].to_numpy(), name='count')
+        series.index.name = column
+        return {"counts": series, "rows": rows, "missing": rows - valid}
+
+    def _describe_select(self, column: str) -> str:
+        col = _quote(column)
+        return (f"count({col}) AS \"count\", avg({col}) AS \"mean\", stddev_samp({col}) AS \"std\", "
+                f"min({col}) AS \"min\", quantile_cont({col}, 0.25) AS \"25%\", "
+                f"quantile_cont({col}, 0.5) AS \"50%\", quantile_cont({col}, 0.75) AS \"75%\", "
+                f"max({col}) AS \"max\"")
+
+    def describe(self, csv_path: CsvInput, column: str) -> pd.Series:
+        result = self._query(f"SELECT {self._describe_select(column)} FROM {_SOURCE_VIEW}", csv_path)
+        return result.iloc[0].reindex(DESCRIBE_FIELDS).astype(float).rename(column)
+
+    def corr(self, csv_path: CsvInput, columns: List[str], method: str = 'pearson',
+             chunksize: Optional[int] = None, sample_frac: Optional[float] = None) -> pd.DataFrame:
+        numeric_cols = self._numeric_columns(csv_path, columns)
+        if not numeric_cols:
+            return pd.DataFrame()
+        # DuckDB没有Kendall聚合函数；Spearman在有缺失值时每对变量要在各自的共同非缺失样本上
+        # 重新排秩，无法在一次扫描中完成。这两种情况退回pandas后端
+        if method == 'kendall' or (method == 'spearman' and self._has_missing(csv_path, numeric_cols)):
+            return PandasBackend().corr(csv_path, numeric_cols, method, sample_frac=sample_frac)
+
+        pairs = [(a, b) for i, a in enumerate(numeric_cols) for b in numeric_cols[i:]]
+        if method == 'pearson':
+            # 聚合函数会跳过任一参数为NULL的行，即成对剔除缺失值；一次扫描计算所有变量对
+            select = ", ".join(f"corr({_quote(a)}, {_quote(b)}) AS c{k}" for k, (a, b) in enumerate(pairs))
+            values = self._query(f"SELECT {select} FROM {_SOURCE_VIEW}", csv_path).iloc[0].to_numpy()
+        elif method == 'spearman':
+            # 无缺失值：一次查询中对每列计算平均秩（并列取平均），再求所有秩列两两的Pearson相关
+            current_reporter().phase("计算Spearman相关系数")
+            ranks = ", ".join(
+                f"rank() OVER (ORDER BY {_quote(col)}) + "
+                f"(count(*) OVER (PARTITION BY {_quote(col)}) - 1) / 2.0 AS r{k}"
+                for k, col in enumerate(numeric_cols)
+            )
+            index = {col: k for k, col in enumerate(numeric_cols)}
+            select = ", ".join(f"corr(r{index[a]}, r{index[b]}) AS c{k}" for k, (a, b) in enumerate(pairs))
+            values = self._query(
+                f"SELECT {select} FROM (SELECT {ranks} FROM {_SOURCE_VIEW})", csv_path
+            ).iloc[0].to_numpy()
+        else:
+            raise ValueError(f"不支持的相关系数方法: {method}")
+
+        matrix = pd.DataFrame(np.nan, index=numeric_cols, columns=numeric_cols)
+        for (a, b), value in zip(pairs, values):
+            matrix.loc[a, b] = matrix.loc[b, a] = value
+        # 对角线与pandas一致：方差为0时为NaN，否则为1
+        for col in numeric_cols:
+            if not pd.isna(matrix.loc[col, col]):
+                matrix.loc[col, col] = 1.0
+        return matrix.astype(float)
+
+    def groupby_stats(self, csv_path: CsvInput, value_column: str, group_column: str,
+                      sample_frac: Optional[float] = None) -> pd.DataFrame:
+        group = _quote(group_column)
+        result = self._query(
+            f"SELECT {group} AS grp, {self._describe_select(value_column)} FROM {_SOURCE_VIEW} "
+            f"WHERE {group} IS NOT NULL GROUP BY {group} ORDER BY {group}", csv_path
+        )
+        result = result.set_index('grp')
+        result.index.name = group_column
+        return result.reindex(columns=DESCRIBE_FIELDS).astype(float)
+
+
+_BACKENDS = {"pandas": PandasBackend, "duckdb": DuckDBBackend}
+_backend_instances: Dict[str, Any] = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    获取聚合计算后端
+
+    参数:
+        name: 'pandas'或'duckdb'，缺省使用环境变量CHART_QUERY_BACKEND（默认pandas）
+
+    返回:
+        后端实例，提供value_counts/describe/corr/groupby_stats方法
+    """
+    name = (name or QUERY_BACKEND).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"不支持的计算后端: {name}，可选 {list(_BACKENDS)}")
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = _BACKENDS[name]()
+        return _backend_instances[name]
+
+
+def check_backend_parity(
+    csv_path: CsvInput,
+    numeric_columns: List[str],
+    category_column: Optional[str] = None,
+    other: str = "duckdb",
+    atol: float = 1e-8
+) -> Dict[str, bool]:
+    """
+    比较pandas后端与另一后端在同一数据上的聚合结果是否一致
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式或文件路径列表
+        numeric_columns: 参与describe/corr/groupby比较的数值列
+        category_column: 参与value_counts/groupby比较的类别列（可选）
+        other: 对比的后端名称
+        atol: 数值比较的绝对误差容限
+
+    返回:
+        每项比较的结果，键形如'corr[pearson]'、'describe[列名]'
+    """
+    base, alt = get_backend("pandas"), get_backend(other)
+    results: Dict[str, bool] = {}
+
+    def _close(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+        a, b = a.sort_index(), b.sort_index()
+        if list(a.index) != list(b.index) or list(a.columns) != list(b.columns):
+            return False
+        return bool(np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float),
+                                atol=atol, rtol=1e-6, equal_nan=True))
+
+    for method in ('pearson', 'spearman', 'kendall'):
+        results[f'corr[{method}]'] = _close(base.corr(csv_path, numeric_columns, method),
+                                            alt.corr(csv_path, numeric_columns, method))
+    for col in numeric_columns:
+        results[f'describe[{col}]'] = _close(base.describe(csv_path, col).to_frame(),
+                                             alt.describe(csv_path, col).to_frame())
+    if category_column:
+        a = base.value_counts(csv_path, category_column)
+        b = alt.value_counts(csv_path, category_column)
+        results[f'value_counts[{category_column}]'] = (
+            a["rows"] == b["rows"] and a["missing"] == b["missing"]
+            and a["counts"].sort_index().to_dict() == b["counts"].sort_index().to_dict()
+        )
+        for col in numeric_columns:
+            results[f'groupby[{col} by {category_column}]'] = _close(
+                base.groupby_stats(csv_path, col, category_column),
+                alt.groupby_stats(csv_path, col, category_column)
+            )
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2:
+        category = sys.argv[3] if len(sys.argv) > 3 else None
+        parity = check_backend_parity(sys.argv[1], sys.argv[2].split(','), category)
+        for item, ok in parity.items():
+            print(f"{'一致' if ok else '不一致'}: {item}")
+        sys.exit(0 if all(parity.values()) else 1)
+    else:
+        print("用法: python -m function.查询后端 <csv文件路径> <数值列1,数值列2,...> [类别列]")
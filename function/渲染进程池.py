@@ -0,0 +1,615 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+from .进度 import OperationCancelled, current_reporter
+
+# 渲染进程池配置，可通过环境变量覆盖
+# CHART_RENDER_WORKERS=0 时不启动子进程，直接在当前进程内渲染
+RENDER_WORKERS = int(os.environ.get("CHART_RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_MAX_TASKS_PER_WORKER = int(os.environ.get("CHART_RENDER_MAX_TASKS", "50"))
+RENDER_TIMEOUT = float(os.environ.get("CHART_RENDER_TIMEOUT", "120"))
+# 统计计算（如并行Kendall相关系数）使用独立的进程池，耗时较长的计算不占用渲染进程，
+# 也不受渲染超时限制。CHART_STATS_WORKERS=0 时在当前进程内计算
+STATS_WORKERS = int(os.environ.get("CHART_STATS_WORKERS", RENDER_WORKERS))
+STATS_TIMEOUT = float(os.environ.get("CHART_STATS_TIMEOUT", "600"))
+# 等待渲染任务时检查请求是否已取消的间隔（秒）
+CANCEL_POLL_INTERVAL = 0.5
+
+_worker_ready = False
+
+
+def _init_worker() -> None:
+    """
+    渲染进程初始化：预先导入绘图库、完成字体查找，
+    之后每个任务只需执行绘图本身
+    """
+    global _worker_ready
+    if _worker_ready:
+        return
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn  # noqa: F401  预热seaborn的导入开销
+    from matplotlib import font_manager
+
+    # 设置中文字体支持
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    # 触发字体查找并写入font_manager缓存
+    font_manager.findfont(font_manager.FontProperties(family=plt.rcParams['font.sans-serif']))
+    _worker_ready = True
+
+
+def _init_pool_worker() -> None:
+    """
+    渲染子进程的初始化
+
+    子进程的生命周期由主进程管理：终端Ctrl-C会发给整个进程组，
+    子进程忽略SIGINT，由主进程在关闭进程池时通知它们退出。SIGTERM保持默认处理
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker()
+
+
+def _init_stats_worker() -> None:
+    """统计计算子进程的初始化：与渲染子进程一样忽略SIGINT，不预热绘图库"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _draw_lines(ax, series: List[Dict[str, Any]], color_offset: int) -> List[Any]:
+    """绘制折线序列及其min/max包络带，返回用于图例的线条"""
+    handles = []
+    for i, item in enumerate(series):
+        color = item.get("color") or f'C{(i + color_offset) % 10}'
+        line, = ax.plot(item["x"], item["y"], color=color, linewidth=1, label=item.get("label"))
+        if item.get("lower") is not None:
+            ax.fill_between(item["x"], item["lower"], item["upper"], color=color,
+                            alpha=0.2, linewidth=0)
+        handles.append(line)
+    return handles
+
+
+def _draw_panel(ax, panel: Dict[str, Any]) -> None:
+    import pandas as pd
+    import seaborn as sns
+
+    kind = panel["kind"]
+    if kind == "hist":
+        edges = panel["edges"]
+        ax.hist(edges[:-1], bins=edges, weights=panel["counts"],
+                edgecolor='black', alpha=0.7)
+    elif kind == "density":
+        # 单条曲线或分组曲线（curves）
+        curves = panel.get("curves") or [{"x": panel["x"], "y": panel["y"]}]
+        for curve in curves:
+            if not len(curve["x"]):
+                continue
+            line, = ax.plot(curve["x"], curve["y"], label=curve.get("label"))
+            if panel.get("fill"):
+                ax.fill_between(curve["x"], curve["y"], alpha=0.25, color=line.get_color())
+            for name, value in curve.get("lines", {}).items():
+                ax.axvline(value, color=line.get_color(), alpha=0.8,
+                           linestyle='--' if name == "mean" else ':')
+        if any(curve.get("label") is not None for curve in curves):
+            ax.legend(title=panel.get("legend_title"))
+    elif kind == "box":
+        # 单个箱体的统计量字典或分组箱体的统计量列表
+        stats = panel["stats"] if isinstance(panel["stats"], list) else [panel["stats"]]
+        ax.bxp(stats, showfliers=True, showmeans=panel.get("show_mean", False))
+        if len(stats) > 1:
+            ax.tick_params(axis='x', rotation=panel.get("rotation", 45))
+    elif kind == "violin":
+        violins = panel.get("violins") or [{"y": panel["y"], "density": panel["density"],
+                                            "stats": panel["stats"]}]
+        for pos, violin in enumerate(violins):
+            stats = violin["stats"]
+            if len(violin["y"]):
+                half_width = violin["density"] / violin["density"].max() * 0.4
+                ax.fill_betweenx(violin["y"], pos - half_width, pos + half_width,
+                                 facecolor=f'C{pos % 10}', edgecolor='black', alpha=0.8)
+            ax.vlines(pos, stats["whislo"], stats["whishi"], color='0.25', linewidth=1.5)
+            ax.vlines(pos, stats["q1"], stats["q3"], color='0.25', linewidth=6)
+            ax.scatter([pos], [stats["med"]], color='white', s=20, zorder=3)
+            if "mean" in stats:
+                ax.scatter([pos], [stats["mean"]], color='red', marker='^', s=30, zorder=4)
+        ax.set_xlim(-0.5, len(violins) - 0.5)
+        if any(violin.get("label") is not None for violin in violins):
+            ax.set_xticks(range(len(violins)))
+            ax.set_xticklabels([violin["label"] for violin in violins],
+                               rotation=panel.get("rotation", 45))
+        else:
+            ax.set_xticks([])
+    elif kind == "bar":
+        bars = ax.bar(panel["categories"], panel["values"])
+        ax.tick_params(axis='x', rotation=panel.get("rotation", 0))
+        if panel.get("annotate"):
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width() / 2., height,
+                        f'{int(height)}', ha='center', va='bottom')
+    elif kind == "pie":
+        ax.pie(panel["values"], labels=panel["categories"], autopct='%1.1f%%')
+    elif kind == "scatter":
+        for group in panel["groups"]:
+            ax.scatter(group["x"], group["y"], alpha=panel.get("alpha", 0.6),
+                       s=panel.get("size"), marker=group.get("marker", "o"),
+                       color=group.get("color"), label=group.get("label"))
+        if panel.get("line") is not None:
+            ax.plot(panel["line"]["x"], panel["line"]["y"], "r--", alpha=0.8)
+        if any(group.get("label") is not None for group in panel["groups"]):
+            ax.legend(title=panel.get("legend_title"))
+        ax.grid(True, alpha=0.3)
+    elif kind == "line":
+        handles = _draw_lines(ax, panel["series"], 0)
+        ax.set_yscale(panel.get("yscale", "linear"))
+        if panel["secondary"]:
+            ax2 = ax.twinx()
+            handles += _draw_lines(ax2, panel["secondary"], len(panel["series"]))
+            ax2.set_yscale(panel.get("yscale", "linear"))
+            if panel.get("secondary_ylabel") is not None:
+                ax2.set_ylabel(panel["secondary_ylabel"])
+        if any(handle.get_label() and not handle.get_label().startswith('_') for handle in handles):
+            ax.legend(handles=handles, loc='upper left')
+        if panel.get("x_is_time"):
+            ax.tick_params(axis='x', rotation=30)
+        ax.grid(True, alpha=0.3)
+    elif kind == "heatmap":
+        matrix = pd.DataFrame(panel["matrix"], index=panel["row_labels"],
+                              columns=panel["col_labels"])
+        sns.heatmap(matrix, annot=panel.get("annot", True), cmap=panel.get("cmap"),
+                    fmt=panel.get("fmt", '.2f'), square=panel.get("square", True),
+                    cbar_kws={'shrink': 0.8}, ax=ax)
+    else:
+        raise ValueError(f"不支持的子图类型: {kind}")
+
+    if panel.get("title"):
+        ax.set_title(panel["title"])
+    if panel.get("xlabel") is not None:
+        ax.set_xlabel(panel["xlabel"])
+    if panel.get("ylabel") is not None:
+        ax.set_ylabel(panel["ylabel"])
+
+
+def render_spec(spec: Dict[str, Any]) -> str:
+    """
+    根据图表规格绘制并保存图片（在渲染进程中执行，也可在当前进程直接调用）
+
+    参数:
+        spec: 由function.绘图规格中的函数生成的图表规格
+
+    返回:
+        图片保存路径
+    """
+    _init_worker()
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+
+    os.makedirs(os.path.dirname(spec["save_path"]) or ".", exist_ok=True)
+    figure_kind = spec.get("figure_kind", "grid")
+
+    if figure_kind == "grid":
+        rows, cols = spec["layout"]
+        fig, axes = plt.subplots(rows, cols, figsize=spec["figsize"], squeeze=False)
+        try:
+            for ax, panel in zip(axes.flat, spec["panels"]):
+                _draw_panel(ax, panel)
+            if spec.get("suptitle"):
+                fig.suptitle(spec["suptitle"])
+            fig.tight_layout()
+            fig.savefig(spec["save_path"], dpi=spec["dpi"], bbox_inches='tight')
+        finally:
+            plt.close(fig)
+    elif figure_kind == "clustermap":
+        matrix = pd.DataFrame(spec["matrix"], index=spec["labels"], columns=spec["labels"])
+        linkage = spec.get("linkage")
+        grid = sns.clustermap(matrix, annot=spec["annot"], cmap=spec["cmap"],
+                              fmt=spec["fmt"], figsize=spec["figsize"],
+                              row_linkage=linkage, col_linkage=linkage)
+        try:
+            grid.savefig(spec["save_path"], dpi=spec["dpi"], bbox_inches='tight')
+        finally:
+            plt.close(grid.fig)
+    elif figure_kind == "pairplot":
+        # 配对图需要原始数据点，通过共享内存零拷贝挂载而不是随任务序列化传递
+        from .共享内存 import attach_frame
+        with attach_frame(spec["frame"]) as df:
+            grid = sns.pairplot(df, hue=spec.get("hue"), diag_kind='hist',
+                                plot_kws={'alpha': 0.6}, diag_kws={'alpha': 0.7})
+            try:
+                if spec.get("suptitle"):
+                    grid.fig.suptitle(spec["suptitle"], y=1.02)
+                grid.savefig(spec["save_path"], dpi=spec["dpi"], bbox_inches='tight')
+            finally:
+                plt.close(grid.fig)
+                del grid
+    else:
+        raise ValueError(f"不支持的图表类型: {figure_kind}")
+
+    return spec["save_path"]
+
+
+def _worker_main(conn, initializer: Callable[[], None]) -> None:
+    """
+    子进程的主循环：初始化完成后通知主进程，之后逐个执行通过管道收到的任务
+
+    收到None或管道关闭时退出
+    """
+    initializer()
+    conn.send(None)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        func, args = task
+        try:
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # 结果或异常对象无法序列化
+            conn.send((False, RuntimeError(f"渲染进程任务的结果无法传回: {e!r}")))
+
+
+class _Task:
+    """
+    提交到渲染进程池的一个任务，提供与AsyncResult相同的ready/wait/get接口
+
+    任务只完成一次（成功、出错、超时或开始前被取消），完成时先调用on_done，
+    再唤醒等待结果的线程
+    """
+
+    def __init__(self, func: Callable, args: Sequence[Any], timeout: float,
+                 on_done: Optional[Callable[[], None]] = None):
+        self.func = func
+        self.args = tuple(args)
+        self.timeout = timeout
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._started = False
+        self._done = False
+        self._success = False
+        self._value = None
+
+    def start(self) -> bool:
+        """由工作线程在发送任务前调用，任务已完成（被取消）时返回False"""
+        with self._lock:
+            if self._done:
+                return False
+            self._started = True
+            return True
+
+    def cancel(self) -> bool:
+        """取消尚未开始执行的任务，返回是否取消成功"""
+        with self._lock:
+            if self._started or self._done:
+                return False
+            self._finish(False, OperationCancelled("任务在开始执行前被取消"))
+        self._notify()
+        return True
+
+    def set_result(self, success: bool, value: Any) -> bool:
+        with self._lock:
+            if self._done:
+                return False
+            self._finish(success, value)
+        self._notify()
+        return True
+
+    def _finish(self, success: bool, value: Any) -> None:
+        # 调用时持有self._lock
+        self._done = True
+        self._success, self._value = success, value
+
+    def _notify(self) -> None:
+        if self._on_done is not None:
+            self._on_done()
+        self._event.set()
+
+    def ready(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        self._event.wait(timeout)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        if not self._event.wait(timeout):
+            raise multiprocessing.TimeoutError()
+        if self._success:
+            return self._value
+        raise self._value
+
+
+class _Worker:
+    """一个渲染子进程及与它通信的管道"""
+
+    def __init__(self, ctx, initializer: Callable[[], None]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+
+    def wait_ready(self) -> bool:
+        """等待子进程完成初始化，子进程启动失败时返回False"""
+        try:
+            self.conn.recv()
+            return True
+        except (EOFError, OSError):
+            self.kill()
+            return False
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        """通知子进程退出并等待其结束"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class RenderPool:
+    """
+    常驻的图表渲染进程池
+
+    子进程在启动时预先导入matplotlib/seaborn并完成字体查找，
+    接收紧凑的图表规格（分箱、密度曲线、抽样点等）而非完整的DataFrame，
+    多个图表可在多个CPU核心上并行渲染。统计计算进程池（get_stats_pool）使用同一个类，
+    子进程不预热绘图库。
+
+    每个子进程由一个工作线程管理：工作线程从共享的任务队列中取出任务交给子进程，
+    从任务开始执行时计时，超时只结束这一个子进程（随即重启），
+    其它请求在其它子进程上执行或排队的任务不受影响。
+    """
+
+    def __init__(
+        self,
+        workers: int = RENDER_WORKERS,
+        max_tasks_per_worker: int = RENDER_MAX_TASKS_PER_WORKER,
+        timeout: float = RENDER_TIMEOUT,
+        initializer: Callable[[], None] = _init_pool_worker
+    ):
+        """
+        参数:
+            workers: 渲染进程数量，为0时在当前进程内渲染
+            max_tasks_per_worker: 每个渲染进程处理多少个任务后被回收重建
+            timeout: 单个渲染任务的超时时间（秒，从任务开始执行时计算）
+            initializer: 子进程启动时执行的模块级函数，默认预热绘图库
+        """
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout = timeout
+        self.initializer = initializer
+        self._tasks: "queue.Queue[Optional[_Task]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            ctx = multiprocessing.get_context("spawn")
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._serve, args=(ctx,),
+                                          name=f"render-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _serve(self, ctx) -> None:
+        """工作线程：启动子进程，逐个执行队列中的任务，收到None时结束子进程并退出"""
+        worker = None
+        while True:
+            if worker is None:
+                # 子进程在取任务之前启动并完成初始化，启动耗时不计入任务的超时时间
+                worker = _Worker(ctx, self.initializer)
+                if not worker.wait_ready():
+                    worker = None
+            task = self._tasks.get()
+            if task is None:
+                break
+            if not task.start():
+                continue
+            if worker is None:
+                task.set_result(False, RuntimeError("渲染进程启动失败"))
+                continue
+            worker = self._execute(worker, task)
+        if worker is not None:
+            worker.stop()
+
+    def _execute(self, worker: _Worker, task: _Task) -> Optional[_Worker]:
+        """
+        在子进程中执行一个任务
+
+        返回:
+            可继续使用的子进程；子进程被结束（超时、意外退出或达到任务数上限）时返回None
+        """
+        try:
+            worker.conn.send((task.func, task.args))
+        except (OSError, ValueError):
+            worker.kill()
+            task.set_result(False, RuntimeError("渲染进程意外退出"))
+            return None
+        except Exception as e:
+            # 函数或参数无法序列化，子进程未收到任务
+            task.set_result(False, e)
+            return worker
+        if not worker.conn.poll(task.timeout):
+            worker.kill()
+            task.set_result(False, TimeoutError(f"渲染进程任务超时（超过{task.timeout}秒）"))
+            return None
+        try:
+            success, value = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.kill()
+            task.set_result(False, RuntimeError("渲染进程意外退出"))
+            return None
+        except Exception as e:
+            # 子进程抛出的异常在主进程中无法还原
+            success, value = False, e
+        task.set_result(success, value)
+        worker.tasks_done += 1
+        if self.max_tasks_per_worker and worker.tasks_done >= self.max_tasks_per_worker:
+            worker.stop()
+            return None
+        return worker
+
+    def submit(self, func: Callable, args: Sequence[Any] = (), frame=None,
+               timeout: Optional[float] = None) -> _Task:
+        """
+        异步提交一个任务，返回具有ready/wait/get接口的任务对象
+
+        指定frame时任务持有它的一个引用，任务完成（出错、超时或被取消）时释放
+        """
+        self._ensure_started()
+        timeout = self.timeout if timeout is None else timeout
+        if frame is None:
+            task = _Task(func, args, timeout)
+        else:
+            frame.acquire()
+            task = _Task(func, args, timeout, on_done=frame.release)
+        self._tasks.put(task)
+        return task
+
+    def run_many(
+        self,
+        func: Callable,
+        args_list: List[Sequence[Any]],
+        timeout: Optional[float] = None,
+        frame=None
+    ) -> List[Any]:
+        """
+        在渲染进程中并行执行多个任务
+
+        参数:
+            func: 模块级函数（需可被子进程导入）
+            args_list: 每个任务的参数
+            timeout: 每个任务的超时时间（秒，从任务开始执行时计算），缺省使用进程池配置
+            frame: 任务所使用的SharedFrame（可选），每个任务持有一个引用直至完成
+
+        返回:
+            与args_list顺序一致的结果列表
+
+        每完成一个任务报告一次进度；等待期间定期检查请求是否已取消，
+        取消时尚未开始的任务不再执行，已开始的任务在后台结束
+        """
+        reporter = current_reporter()
+        if self.workers <= 0:
+            results = []
+            for args in args_list:
+                reporter.checkpoint()
+                results.append(func(*args))
+                reporter.advance()
+            return results
+        pending = [self.submit(func, args, frame=frame, timeout=timeout) for args in args_list]
+        try:
+            results = []
+            for task in pending:
+                while not task.ready():
+                    task.wait(CANCEL_POLL_INTERVAL)
+                    reporter.checkpoint()
+                results.append(task.get())
+                reporter.advance()
+            return results
+        except OperationCancelled:
+            for task in pending:
+                task.cancel()
+            raise
+
+    def render(self, spec: Dict[str, Any], timeout: Optional[float] = None, frame=None) -> str:
+        """
+        渲染单个图表并等待完成
+
+        参数:
+            spec: 图表规格
+            timeout: 超时时间（秒），缺省使用进程池配置
+            frame: 图表规格引用的SharedFrame（可选）
+
+        返回:
+            图片保存路径
+        """
+        return self.render_many([spec], timeout=timeout, frame=frame)[0]
+
+    def render_many(self, specs: List[Dict[str, Any]], timeout: Optional[float] = None,
+                    frame=None) -> List[str]:
+        """
+        并行渲染多个图表
+
+        参数:
+            specs: 图表规格列表
+            timeout: 每个任务的超时时间（秒），缺省使用进程池配置
+            frame: 图表规格引用的SharedFrame（可选）
+
+        返回:
+            与specs顺序一致的图片保存路径列表
+        """
+        current_reporter().phase("渲染图表", total=len(specs))
+        return self.run_many(render_spec, [(spec,) for spec in specs],
+                             timeout=timeout, frame=frame)
+
+    def shutdown(self) -> None:
+        """关闭进程池，等待已提交的任务完成"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            for _ in threads:
+                self._tasks.put(None)
+            for thread in threads:
+                thread.join()
+
+    def status(self) -> Dict[str, Any]:
+        """进程池配置和是否已启动子进程"""
+        with self._lock:
+            return {"workers": self.workers, "started": bool(self._threads),
+                    "timeout": self.timeout}
+
+
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """获取进程内共享的渲染进程池（首次使用时创建）"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool()
+            atexit.register(_render_pool.shutdown)
+        return _render_pool
+
+
+_stats_pool: Optional[RenderPool] = None
+
+
+def get_stats_pool() -> RenderPool:
+    """获取进程内共享的统计计算进程池（首次使用时创建），与渲染进程池互不占用"""
+    global _stats_pool
+    with _render_pool_lock:
+        if _stats_pool is None:
+            _stats_pool = RenderPool(workers=STATS_WORKERS, timeout=STATS_TIMEOUT,
+                                     initializer=_init_stats_worker)
+            atexit.register(_stats_pool.shutdown)
+        return _stats_pool
+
+
+def shutdown_render_pool() -> None:
+    """关闭进程内共享的渲染进程池和统计计算进程池（服务退出时调用，未创建时不做任何事）"""
+    with _render_pool_lock:
+        pools = [pool for pool in (_render_pool, _stats_pool) if pool is not None]
+    for pool in pools:
+        pool.shutdown()
@@ -1,25 +1,105 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import os
+import threading
+from collections import OrderedDict
 from typing import List, Optional, Tuple, Dict, Any
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+from .绘图规格 import heatmap_panel, clustermap_spec, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, read_columns, file_fingerprint
+from .查询后端 import get_backend
+from .进度 import current_reporter
+from .结果输出 import matrix_page, top_pairs, check_output_format, write_table
+
+# 缓存的聚类结果数量（按数据文件指纹、列、相关系数方法和抽样比例区分）
+CLUSTER_CACHE_SIZE = int(os.environ.get("CHART_CLUSTER_CACHE", "32"))
+# 变量数超过该值时默认不绘制树状图，直接按聚类顺序绘制普通热力图
+DENDROGRAM_MAX_VARIABLES = 50
+# 变量数不超过该值时计算最优叶节点顺序（相邻叶节点距离之和最小，计算量随变量数快速增长）
+OPTIMAL_ORDERING_MAX_VARIABLES = 200
+# 不绘制树状图时，变量数超过该值则不标注相关系数值
+ANNOT_MAX_VARIABLES = 30
+# 不绘制树状图时的图形边长上限（英寸）和分辨率，避免数百个变量生成过大的图片
+LARGE_FIGURE_MAX_INCHES = 30
+LARGE_FIGURE_DPI = 150
+
+
+def _correlation_linkage(corr_matrix: pd.DataFrame) -> np.ndarray:
+    """
+    以 1 - 相关系数 为距离做平均连接层次聚类
+
+    无法计算相关系数的变量（如常数列）按不相关处理
+    """
+    corr = np.nan_to_num(corr_matrix.to_numpy(dtype=float), nan=0.0)
+    distance = np.clip(1.0 - (corr + corr.T) / 2, 0.0, 2.0)
+    np.fill_diagonal(distance, 0.0)
+    return hierarchy.linkage(squareform(distance, checks=False), method='average',
+                             optimal_ordering=len(corr) <= OPTIMAL_ORDERING_MAX_VARIABLES)
+
+
+_cluster_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cluster_cache_lock = threading.Lock()
+
+
+def get_cluster_order(csv_path: CsvInput, corr_matrix: pd.DataFrame, method: str,
+                      sample_frac: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    获取（必要时计算并缓存）相关系数矩阵的层次聚类结果
+
+    缓存键包含数据文件指纹、列集合、相关系数方法和抽样比例，文件被修改后重新计算；
+    缓存按最近使用淘汰
+
+    参数:
+        csv_path: 计算相关系数所用的数据文件
+        corr_matrix: 相关系数矩阵
+        method: 相关系数方法
+        sample_frac: 计算相关系数时的抽样比例（可选）
+
+    返回:
+        (包含labels/linkage/order的字典, 是否命中缓存)；linkage按labels的顺序编号
+    """
+    labels = sorted(corr_matrix.columns)
+    key = repr((file_fingerprint(csv_path), labels, method, sample_frac))
+    with _cluster_cache_lock:
+        if key in _cluster_cache:
+            _cluster_cache.move_to_end(key)
+            return _cluster_cache[key], True
+    linkage = _correlation_linkage(corr_matrix.loc[labels, labels])
+    leaves = hierarchy.leaves_list(linkage)
+    clustering = {"labels": labels, "linkage": linkage, "order": [labels[i] for i in leaves]}
+    with _cluster_cache_lock:
+        _cluster_cache[key] = clustering
+        _cluster_cache.move_to_end(key)
+        while len(_cluster_cache) > CLUSTER_CACHE_SIZE:
+            _cluster_cache.popitem(last=False)
+    return clustering, False
+
 
 def generate_correlation_heatmap(
-    csv_path: str,
+    csv_path: CsvInput,
     numeric_columns: List[str],
     save_dir: str = "./charts",
     corr_method: str = 'pearson',
     cluster: bool = False,
     annot: bool = True,
     cmap: str = 'coolwarm',
-    figsize: Optional[Tuple[int, int]] = None
+    figsize: Optional[Tuple[int, int]] = None,
+    backend: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    sample_frac: Optional[float] = None,
+    show_dendrogram: Optional[bool] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    top_k: int = 20,
+    output_format: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     生成数值变量之间的相关系数热力图
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         numeric_columns: 需要分析的数值列名列表
         save_dir: 图片保存目录，默认为'./charts'
         corr_method: 相关系数类型，可选'pearson'/'spearman'/'kendall'
@@ -27,81 +107,107 @@ def generate_correlation_heatmap(
         annot: 是否显示相关系数值，默认为True
         cmap: 颜色图谱，默认为'coolwarm'
         figsize: 图形尺寸，自动根据列数调整
+        backend: 聚合计算后端，可选'pandas'/'duckdb'，缺省使用环境变量CHART_QUERY_BACKEND
+        chunksize: 分块读取的行数（可选，仅Pearson），内存预算不足时由服务端自动设置
+        sample_frac: 随机抽样比例（可选），内存预算不足时由服务端自动设置
+        show_dendrogram: 聚类时是否绘制树状图，缺省在变量数不超过DENDROGRAM_MAX_VARIABLES时绘制；
+            不绘制时按聚类顺序绘制普通热力图，变量较多时不标注数值
+        offset: 相关系数矩阵从第几行开始返回，默认为0
+        limit: 相关系数矩阵返回的行数，缺省为100
+        top_k: 返回绝对值最大的前k个变量对，默认为20
+        output_format: 将完整矩阵写入文件的格式（可选），'csv'/'parquet'/'npy'
+            （npy只保存数值，行列顺序与返回的columns一致）
 
     返回:
-        包含热力图路径和相关系数矩阵的字典
+        包含热力图路径、分页的相关系数矩阵（二维数组）和最强相关变量对的字典；
+        聚类时还包含按聚类顺序排列的列名ordered_columns；
+        指定output_format时correlation_matrix_path为完整矩阵的文件路径
     """
     try:
-        # 读取CSV文件
-        df = pd.read_csv(csv_path)
-        
-        # 检查列是否存在
-        missing_cols = [col for col in numeric_columns if col not in df.columns]
+        format_error = check_output_format(output_format, numeric_only=True)
+        if format_error:
+            return {"error": format_error, "success": False}
+
+        # 检查列是否存在（只读取表头）
+        missing_cols = [col for col in numeric_columns if col not in read_columns(csv_path)]
         if missing_cols:
             return {"error": f"列 {missing_cols} 不存在于CSV文件中", "success": False}
         
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
-        # 选择数值列
-        numeric_df = df[numeric_columns].select_dtypes(include=[np.number])
-        
-        if numeric_df.empty:
+        # 计算相关系数矩阵（由计算后端完成，只返回聚合后的矩阵）
+        method_names = {'pearson': 'Pearson', 'spearman': 'Spearman', 'kendall': 'Kendall'}
+        if corr_method not in method_names:
+            return {"error": f"不支持的相关系数方法: {corr_method}", "success": False}
+        corr_matrix = get_backend(backend).corr(csv_path, numeric_columns, method=corr_method,
+                                                chunksize=chunksize, sample_frac=sample_frac)
+        if corr_matrix.empty:
             return {"error": "没有找到数值型列", "success": False}
+        method_used = method_names[corr_method]
         
-        # 计算相关系数矩阵
-        if corr_method == 'pearson':
-            corr_matrix = numeric_df.corr(method='pearson')
-            method_used = 'Pearson'
-        elif corr_method == 'spearman':
-            corr_matrix = numeric_df.corr(method='spearman')
-            method_used = 'Spearman'
-        elif corr_method == 'kendall':
-            corr_matrix = numeric_df.corr(method='kendall')
-            method_used = 'Kendall'
-        else:
-            return {"error": f"不支持的相关系数方法: {corr_method}", "success": False}
+        # 分页的矩阵和最强相关变量对在渲染热力图之前先推送给客户端
+        corr_payload = matrix_page(corr_matrix, offset, limit)
+        strongest = top_pairs(corr_matrix, top_k)
+        current_reporter().partial("correlation_matrix", {"method_used": method_used,
+                                                          "correlation_matrix": corr_payload,
+                                                          "top_pairs": strongest})
         
         # 设置图形尺寸
-        if figsize is None:
-            n_cols = len(numeric_columns)
+        n_cols = len(numeric_columns)
+        default_figsize = figsize is None
+        if default_figsize:
             figsize = (max(8, n_cols * 1.2), max(8, n_cols * 1.2))
         
-        # 创建热力图
-        plt.figure(figsize=figsize)
+        file_name = dataset_name(csv_path)
+        labels = list(corr_matrix.columns)
+        extra: Dict[str, Any] = {}
         
-        # 如果启用聚类，使用聚类排序
+        # 如果启用聚类，使用缓存的层次聚类结果排序
         if cluster:
-            sns.clustermap(corr_matrix, annot=annot, cmap=cmap, 
-                          fmt='.2f', figsize=figsize)
-            save_path = os.path.join(save_dir, 
-                                   f'{os.path.splitext(os.path.basename(csv_path))[0]}_correlation_cluster.png')
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            plt.close()
+            current_reporter().phase("层次聚类")
+            clustering, cached = get_cluster_order(csv_path, corr_matrix, corr_method, sample_frac)
+            if show_dendrogram is None:
+                show_dendrogram = len(labels) <= DENDROGRAM_MAX_VARIABLES
+            save_path = os.path.join(save_dir, f'{file_name}_correlation_cluster.png')
+            if show_dendrogram:
+                # 聚类结果作为连接矩阵传给clustermap，绘图时不再重新计算
+                cluster_labels = clustering["labels"]
+                spec = clustermap_spec(save_path, corr_matrix.loc[cluster_labels, cluster_labels].values,
+                                       cluster_labels, annot=annot, cmap=cmap, fmt='.2f',
+                                       figsize=figsize, linkage=clustering["linkage"])
+            else:
+                order = clustering["order"]
+                dpi = 300
+                if default_figsize:
+                    side = min(max(8, n_cols * 0.15), LARGE_FIGURE_MAX_INCHES)
+                    figsize, dpi = (side, side), LARGE_FIGURE_DPI
+                panel = heatmap_panel(corr_matrix.loc[order, order].values, order,
+                                      annot=annot and len(order) <= ANNOT_MAX_VARIABLES, cmap=cmap,
+                                      fmt='.2f', title=f'变量间相关系数热力图 ({method_used}，聚类排序)')
+                spec = figure_spec(save_path, [panel], figsize=figsize, dpi=dpi)
+            extra = {"ordered_columns": clustering["order"], "dendrogram": show_dendrogram,
+                     "cluster_cached": cached}
         else:
-            sns.heatmap(corr_matrix, annot=annot, cmap=cmap, fmt='.2f',
-                       square=True, cbar_kws={'shrink': 0.8})
-            plt.title(f'变量间相关系数热力图 ({method_used})')
-            
-            save_path = os.path.join(save_dir, 
-                                   f'{os.path.splitext(os.path.basename(csv_path))[0]}_correlation_heatmap.png')
-            plt.tight_layout()
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            plt.close()
+            save_path = os.path.join(save_dir, f'{file_name}_correlation_heatmap.png')
+            panel = heatmap_panel(corr_matrix.values, labels, annot=annot, cmap=cmap,
+                                  fmt='.2f', title=f'变量间相关系数热力图 ({method_used})')
+            spec = figure_spec(save_path, [panel], figsize=figsize)
+        get_render_pool().render(spec)
         
-        # 创建相关系数矩阵的字符串表示
-        corr_str = corr_matrix.round(3).to_string()
+        if output_format:
+            extra["correlation_matrix_path"] = write_table(
+                corr_matrix, os.path.join(save_dir, f'{file_name}_correlation_{corr_method}'),
+                output_format, index=True)
         
         return {
             "success": True,
             "heatmap_path": save_path,
-            "correlation_matrix": corr_str,
+            "correlation_matrix": corr_payload,
+            "top_pairs": strongest,
             "method_used": method_used,
-            "num_variables": len(numeric_columns)
+            "num_variables": len(numeric_columns),
+            **extra
         }
         
     except Exception as e:
@@ -114,4 +220,4 @@ if __name__ == "__main__":
         result = generate_correlation_heatmap(sys.argv[1], cols)
         print(result)
     else:
-        print("用法: python 热力图.py <csv文件路径> <列名1> <列名2> ...")
\ No newline at end of file
+        print("用法: python -m function.热力图 <csv文件路径> <列名1> <列名2> ...")
\ No newline at end of file
@@ -1,49 +1,62 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 from typing import Dict, Any, Optional
+from .绘图规格 import bar_panel, pie_panel, figure_spec
+from .渲染进程池 import get_render_pool
+from .数据加载 import CsvInput, dataset_name, read_columns
+from .查询后端 import get_backend
+from .进度 import current_reporter
+from .结果输出 import records_page, check_output_format, write_table
 
 def analyze_categorical_column(
-    csv_path: str,
+    csv_path: CsvInput,
     y_column: str,
     save_dir: str = "./charts",
     top_n: Optional[int] = None,
-    min_freq: int = 1
+    min_freq: int = 1,
+    backend: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    output_format: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     分析类别型变量的分布特征，生成条形图和饼图
 
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 要分析的分类型列名
         save_dir: 图片保存目录，默认为'./charts'
         top_n: 仅显示频率最高的前n个类别（可选）
         min_freq: 显示最小频数阈值（可选）
+        backend: 聚合计算后端，可选'pandas'/'duckdb'，缺省使用环境变量CHART_QUERY_BACKEND
+        chunksize: 分块读取的行数（可选），内存预算不足时由服务端自动设置
+        offset: 频数表从第几行开始返回，默认为0
+        limit: 频数表返回的行数，缺省为100
+        output_format: 将完整频数表写入文件的格式（可选），'csv'或'parquet'
 
     返回:
-        包含图表路径和统计信息的字典
+        包含图表路径、统计摘要和分页频数表（records）的字典；
+        指定output_format时frequency_table_path为完整频数表的文件路径
     """
     try:
-        # 读取CSV文件
-        df = pd.read_csv(csv_path)
-        
-        # 检查列是否存在
-        if y_column not in df.columns:
+        format_error = check_output_format(output_format)
+        if format_error:
+            return {"error": format_error, "success": False}
+
+        # 检查列是否存在（只读取表头）
+        if y_column not in read_columns(csv_path):
             return {"error": f"列 '{y_column}' 不存在于CSV文件中", "success": False}
         
         # 确保保存目录存在
         os.makedirs(save_dir, exist_ok=True)
         
-        # 设置中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
         # 获取文件名用于命名
-        file_name = os.path.splitext(os.path.basename(csv_path))[0]
+        file_name = dataset_name(csv_path)
         
-        # 计算频数
-        value_counts = df[y_column].value_counts()
+        # 由计算后端统计频数，不拼接整个数据集
+        counts = get_backend(backend).value_counts(csv_path, y_column, chunksize=chunksize)
+        value_counts = counts["counts"]
+        unique_count = len(value_counts)
         
         # 应用过滤条件
         if min_freq > 1:
@@ -52,59 +65,57 @@ def analyze_categorical_column(
         if top_n is not None:
             value_counts = value_counts.head(top_n)
         
-        # 创建图表
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
-        
-        # 条形图
-        bars = ax1.bar(value_counts.index, value_counts.values)
-        ax1.set_title(f'{y_column} - 类别分布（条形图）')
-        ax1.set_xlabel(y_column)
-        ax1.set_ylabel('频数')
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # 添加数值标签
-        for bar in bars:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 饼图
-        ax2.pie(value_counts.values, labels=value_counts.index, autopct='%1.1f%%')
-        ax2.set_title(f'{y_column} - 类别分布（饼图）')
-        
-        # 保存图表
-        save_path = os.path.join(save_dir, f'{file_name}_{y_column}_categorical.png')
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
         # 计算统计摘要
-        total_count = len(df[y_column])
-        unique_count = df[y_column].nunique()
+        total_count = counts["rows"]
         most_common = value_counts.index[0] if len(value_counts) > 0 else None
-        most_common_count = value_counts.iloc[0] if len(value_counts) > 0 else 0
-        
-        summary_stats = f"""
-        总样本数: {total_count}
-        唯一类别数: {unique_count}
-        最常见类别: {most_common} ({most_common_count}次, {most_common_count/total_count*100:.1f}%)
-        缺失值数量: {df[y_column].isnull().sum()}
-        """
+        most_common_count = int(value_counts.iloc[0]) if len(value_counts) > 0 else 0
+        
+        summary_stats = {
+            "total_count": int(total_count),
+            "unique_count": int(unique_count),
+            "most_common": None if most_common is None else str(most_common),
+            "most_common_count": most_common_count,
+            "most_common_percent": round(most_common_count / total_count * 100, 1) if total_count else None,
+            "missing_count": int(counts['missing']),
+        }
         
         # 创建频数表
         frequency_table = value_counts.reset_index()
         frequency_table.columns = [y_column, '频数']
         frequency_table['百分比'] = (frequency_table['频数'] / total_count * 100).round(2)
+        frequency_page = records_page(frequency_table, offset, limit)
+        
+        # 统计结果先行推送，图表随后渲染
+        current_reporter().partial("frequency_table", {
+            "frequency_table": frequency_page,
+            "summary_stats": summary_stats
+        })
+        
+        # 创建图表：条形图（带数值标签）和饼图，仅传递过滤后的频数
+        panels = [
+            bar_panel(value_counts.index, value_counts.values, annotate=True, rotation=45,
+                      title=f'{y_column} - 类别分布（条形图）', xlabel=y_column, ylabel='频数'),
+            pie_panel(value_counts.index, value_counts.values,
+                      title=f'{y_column} - 类别分布（饼图）'),
+        ]
+        
+        # 保存图表
+        save_path = os.path.join(save_dir, f'{file_name}_{y_column}_categorical.png')
+        get_render_pool().render(figure_spec(save_path, panels, layout=(1, 2), figsize=(16, 8)))
         
-        return {
+        result = {
             "success": True,
             "barplot_path": save_path,
             "piechart_path": save_path,
-            "frequency_table": frequency_table.to_string(index=False),
-            "summary_stats": summary_stats.strip(),
+            "frequency_table": frequency_page,
+            "summary_stats": summary_stats,
             "total_categories": unique_count,
-            "most_frequent_category": most_common
+            "most_frequent_category": summary_stats["most_common"]
         }
+        if output_format:
+            result["frequency_table_path"] = write_table(
+                frequency_table, os.path.join(save_dir, f'{file_name}_{y_column}_frequency'), output_format)
+        return result
         
     except Exception as e:
         return {"error": str(e), "success": False}
@@ -115,4 +126,4 @@ if __name__ == "__main__":
         result = analyze_categorical_column(sys.argv[1], sys.argv[2])
         print(result)
     else:
-        print("用法: python 类别型变量.py <csv文件路径> <列名>")
\ No newline at end of file
+        print("用法: python -m function.类别型变量 <csv文件路径> <列名>")
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 响应中默认返回的表格行数（频数表的类别数、相关系数矩阵的行数）
+DEFAULT_PAGE_ROWS = 100
+# 单次响应最多返回的行数，更多的数据应分页获取或写入文件
+MAX_PAGE_ROWS = 10000
+# 响应中数值保留的小数位数
+VALUE_DECIMALS = 4
+# 支持的完整结果输出文件格式
+OUTPUT_FORMATS = ("csv", "parquet", "npy")
+
+
+def _native(value: Any) -> Any:
+    """转换为JSON可序列化的Python类型，缺失值和非有限数转换为None"""
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), VALUE_DECIMALS) if np.isfinite(value) else None
+    if value is None or (not isinstance(value, (list, tuple, dict)) and pd.isna(value)):
+        return None
+    return value if isinstance(value, (int, str, bool)) else str(value)
+
+
+def _page_bounds(total: int, offset: int, limit: Optional[int]) -> Dict[str, int]:
+    if offset < 0:
+        raise ValueError("offset不能为负数")
+    limit = DEFAULT_PAGE_ROWS if limit is None else limit
+    if limit < 0:
+        raise ValueError("limit不能为负数")
+    limit = min(limit, MAX_PAGE_ROWS)
+    start = min(offset, total)
+    end = min(start + limit, total)
+    return {"start": start, "end": end, "limit": limit}
+
+
+def _page_info(total: int, bounds: Dict[str, int]) -> Dict[str, Any]:
+    has_more = bounds["end"] < total
+    return {
+        "offset": bounds["start"],
+        "limit": bounds["limit"],
+        "total_rows": total,
+        "has_more": has_more,
+        "next_offset": bounds["end"] if has_more else None,
+    }
+
+
+def records_page(df: pd.DataFrame, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    表格的一页，按记录（列名到值的映射）返回
+
+    参数:
+        df: 完整表格
+        offset: 起始行
+        limit: 返回的行数，缺省为DEFAULT_PAGE_ROWS，最多MAX_PAGE_ROWS
+
+    返回:
+        包含columns、records和分页信息（total_rows/has_more/next_offset）的字典
+    """
+    bounds = _page_bounds(len(df), offset, limit)
+    page = df.iloc[bounds["start"]:bounds["end"]]
+    columns = [str(col) for col in df.columns]
+    records = [dict(zip(columns, (_native(v) for v in row)))
+               for row in page.itertuples(index=False, name=None)]
+    return {"columns": columns, "records": records, **_page_info(len(df), bounds)}
+
+
+def matrix_page(matrix: pd.DataFrame, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    数值矩阵按行分页，行以数组返回
+
+    返回:
+        包含columns（列标签）、row_labels、values（二维数组）和分页信息的字典
+    """
+    bounds = _page_bounds(len(matrix), offset, limit)
+    block = matrix.iloc[bounds["start"]:bounds["end"]].to_numpy(dtype=float)
+    values = np.round(block, VALUE_DECIMALS).astype(object)
+    values[~np.isfinite(block)] = None
+    return {
+        "columns": [str(col) for col in matrix.columns],
+        "row_labels": [str(label) for label in matrix.index[bounds["start"]:bounds["end"]]],
+        "values": values.tolist(),
+        **_page_info(len(matrix), bounds),
+    }
+
+
+def top_pairs(matrix: pd.DataFrame, k: int) -> List[Dict[str, Any]]:
+    """对称矩阵中绝对值最大的k个非对角元素（每对变量只出现一次）"""
+    values = matrix.to_numpy(dtype=float)
+    rows, cols = np.triu_indices(len(values), k=1)
+    pair_values = values[rows, cols]
+    finite = np.isfinite(pair_values)
+    rows, cols, pair_values = rows[finite], cols[finite], pair_values[finite]
+    k = min(k, len(pair_values))
+    if k <= 0:
+        return []
+    # 先用argpartition选出前k个，再只对这k个排序
+    top = np.argpartition(-np.abs(pair_values), k - 1)[:k]
+    top = top[np.argsort(-np.abs(pair_values[top]), kind='stable')]
+    labels = [str(label) for label in matrix.index]
+    return [{"x": labels[rows[i]], "y": labels[cols[i]], "value": _native(pair_values[i])} for i in top]
+
+
+def check_output_format(output_format: Optional[str], numeric_only: bool = False) -> Optional[str]:
+    """检查输出格式，不支持时返回错误信息"""
+    if output_format is None:
+        return None
+    if output_format not in OUTPUT_FORMATS:
+        return f"不支持的输出格式: {output_format}，可选 {list(OUTPUT_FORMATS)}"
+    if output_format == "npy" and not numeric_only:
+        return "npy格式只适用于数值矩阵，请使用csv或parquet"
+    if output_format == "parquet" and not _parquet_available():
+        return "写入parquet文件需要安装pyarrow，请安装后重试或使用csv"
+    return None
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def write_table(df: pd.DataFrame, path_base: str, output_format: str, index: bool = False) -> str:
+    """
+    将完整表格写入文件
+
+    参数:
+        df: 完整表格
+        path_base: 不含扩展名的文件路径
+        output_format: 'csv'/'parquet'/'npy'（npy只保存数值，行列标签需另行记录）
+        index: 是否保存行索引（csv/parquet）
+
+    返回:
+        写入的文件路径
+    """
+    path = f"{path_base}.{output_format}"
+    if output_format == "csv":
+        df.to_csv(path, index=index, encoding="utf-8-sig")
+    elif output_format == "parquet":
+        df.to_parquet(path, index=index)
+    elif output_format == "npy":
+        np.save(path, df.to_numpy(dtype=float))
+    else:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    return os.path.abspath(path)
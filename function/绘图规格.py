@@ -0,0 +1,332 @@
+import numpy as np
+from scipy import stats
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# 图表规格中允许携带的数据量上限，超出部分随机抽样，保证传给渲染进程的数据足够紧凑
+MAX_SCATTER_POINTS = 20000
+MAX_KDE_POINTS = 20000
+MAX_FLIERS = 2000
+DENSITY_GRID_SIZE = 200
+
+
+def sample_indices(n: int, limit: int, seed: int = 0) -> Optional[np.ndarray]:
+    """
+    当样本量超过上限时返回有序的随机抽样下标，否则返回None
+
+    参数:
+        n: 样本总量
+        limit: 允许的最大样本量
+        seed: 随机种子，保证同一数据多次渲染结果一致
+
+    返回:
+        抽样下标数组或None
+    """
+    if n <= limit:
+        return None
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n, size=limit, replace=False))
+
+
+def _sample(values: np.ndarray, limit: int) -> np.ndarray:
+    idx = sample_indices(len(values), limit)
+    return values if idx is None else values[idx]
+
+
+def _panel(kind: str, title: Optional[str] = None, xlabel: Optional[str] = None,
+           ylabel: Optional[str] = None, **data) -> Dict[str, Any]:
+    panel = {"kind": kind, "title": title, "xlabel": xlabel, "ylabel": ylabel}
+    panel.update(data)
+    return panel
+
+
+def histogram_panel(values: np.ndarray, bins: int = 30, **labels) -> Dict[str, Any]:
+    """根据数据预先计算直方图分箱，仅传递频数和分箱边界"""
+    counts, edges = np.histogram(values, bins=bins)
+    return _panel("hist", counts=counts, edges=edges, **labels)
+
+
+def _kde(values: np.ndarray, cut: float, gridsize: int = DENSITY_GRID_SIZE,
+         summary: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # 提供数值摘要（见function.数值摘要）时直接使用其中的标准差和极值，不再扫描全量数据
+    if summary is not None:
+        n, std, lo, hi = summary["count"], summary["std"], summary["min"], summary["max"]
+    else:
+        n = len(values)
+        std = np.std(values, ddof=1) if n > 1 else None
+        lo, hi = (values.min(), values.max()) if n else (None, None)
+    # 常数列或样本过少时无法估计密度，返回空曲线
+    if n < 2 or lo == hi:
+        return np.array([]), np.array([])
+    kde = stats.gaussian_kde(_sample(values, MAX_KDE_POINTS))
+    bw = kde.factor * std
+    grid = np.linspace(lo - cut * bw, hi + cut * bw, gridsize)
+    return grid, kde(grid)
+
+
+def density_panel(values: np.ndarray, fill: bool = True, summary: Optional[Dict[str, Any]] = None,
+                  **labels) -> Dict[str, Any]:
+    """在固定网格上计算核密度估计曲线（与seaborn默认的cut=3一致），values应已去除缺失值"""
+    grid, density = _kde(values, cut=3, summary=summary)
+    labels.setdefault("ylabel", "Density")
+    return _panel("density", x=grid, y=density, fill=fill, **labels)
+
+
+def summary_histogram_panel(summary: Dict[str, Any], **labels) -> Dict[str, Any]:
+    """由数值摘要中的直方图频数和分箱边界生成直方图规格"""
+    histogram = summary["histogram"]
+    return _panel("hist", counts=histogram["counts"], edges=histogram["edges"], **labels)
+
+
+def summary_box_panel(summary: Dict[str, Any], **labels) -> Dict[str, Any]:
+    """由数值摘要中的箱线统计量生成箱线图规格，异常点数量过多时抽样"""
+    stats_ = dict(summary["box"], fliers=_sample(summary["box"]["fliers"], MAX_FLIERS))
+    return _panel("box", stats=stats_, **labels)
+
+
+def box_stats(values: np.ndarray) -> Dict[str, Any]:
+    """
+    计算箱线图所需的统计量（与matplotlib的boxplot_stats口径一致）
+
+    返回:
+        可直接传给Axes.bxp的统计量字典
+    """
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = values[(values >= low_fence) & (values <= high_fence)]
+    whislo = inside.min() if len(inside) else q1
+    whishi = inside.max() if len(inside) else q3
+    fliers = values[(values < whislo) | (values > whishi)]
+    return {
+        "med": float(med),
+        "q1": float(q1),
+        "q3": float(q3),
+        "whislo": float(whislo),
+        "whishi": float(whishi),
+        "fliers": _sample(fliers, MAX_FLIERS),
+    }
+
+
+def box_panel(values: np.ndarray, **labels) -> Dict[str, Any]:
+    """预先计算箱线图统计量，异常点数量过多时抽样"""
+    return _panel("box", stats=box_stats(values), **labels)
+
+
+def violin_panel(values: np.ndarray, summary: Optional[Dict[str, Any]] = None,
+                 **labels) -> Dict[str, Any]:
+    """
+    预先计算小提琴图的密度轮廓和内部箱线（与seaborn默认的cut=2一致）
+
+    提供数值摘要时内部箱线直接取自摘要，values只用于密度估计的抽样
+    """
+    grid, density = _kde(values, cut=2, summary=summary)
+    if summary is not None:
+        stats_ = {key: value for key, value in summary["box"].items() if key != "fliers"}
+    else:
+        stats_ = box_stats(values)
+        stats_.pop("fliers")
+    return _panel("violin", y=grid, density=density, stats=stats_, **labels)
+
+
+def _group_lines(values: np.ndarray, show_mean: bool, show_median: bool) -> Dict[str, float]:
+    lines = {}
+    if show_mean:
+        lines["mean"] = float(values.mean())
+    if show_median:
+        lines["median"] = float(np.median(values))
+    return lines
+
+
+def grouped_box_panel(groups: List[Tuple[str, np.ndarray]], show_mean: bool = False,
+                      **labels) -> Dict[str, Any]:
+    """分组箱线图规格，每组一个箱体，可标注均值"""
+    stats_list = []
+    for label, values in groups:
+        stats_ = box_stats(values)
+        stats_["label"] = str(label)
+        if show_mean:
+            stats_["mean"] = float(values.mean())
+        stats_list.append(stats_)
+    return _panel("box", stats=stats_list, show_mean=show_mean, **labels)
+
+
+def grouped_violin_panel(groups: List[Tuple[str, np.ndarray]], show_mean: bool = False,
+                         **labels) -> Dict[str, Any]:
+    """分组小提琴图规格，每组一个密度轮廓，可标注均值"""
+    violins = []
+    for label, values in groups:
+        grid, density = _kde(values, cut=2)
+        stats_ = box_stats(values)
+        stats_.pop("fliers")
+        if show_mean:
+            stats_["mean"] = float(values.mean())
+        violins.append({"label": str(label), "y": grid, "density": density, "stats": stats_})
+    return _panel("violin", violins=violins, **labels)
+
+
+def grouped_density_panel(groups: List[Tuple[str, np.ndarray]], show_mean: bool = False,
+                          show_median: bool = False, legend_title: Optional[str] = None,
+                          **labels) -> Dict[str, Any]:
+    """分组核密度曲线规格，各组曲线叠加绘制，可用竖线标注均值/中位数"""
+    curves = []
+    for label, values in groups:
+        grid, density = _kde(values, cut=3)
+        curves.append({"label": str(label), "x": grid, "y": density,
+                       "lines": _group_lines(values, show_mean, show_median)})
+    labels.setdefault("ylabel", "Density")
+    return _panel("density", curves=curves, fill=False, legend_title=legend_title, **labels)
+
+
+def bar_panel(categories: Sequence[Any], values: Sequence[float],
+              annotate: bool = True, rotation: int = 45, **labels) -> Dict[str, Any]:
+    """条形图规格"""
+    return _panel("bar", categories=[str(c) for c in categories],
+                  values=np.asarray(values), annotate=annotate,
+                  rotation=rotation, **labels)
+
+
+def pie_panel(categories: Sequence[Any], values: Sequence[float], **labels) -> Dict[str, Any]:
+    """饼图规格"""
+    return _panel("pie", categories=[str(c) for c in categories],
+                  values=np.asarray(values), **labels)
+
+
+def scatter_panel(x: np.ndarray, y: np.ndarray, alpha: float = 0.6,
+                  size: Optional[float] = None, fit_line: bool = False,
+                  groups: Optional[List[Dict[str, Any]]] = None,
+                  legend_title: Optional[str] = None,
+                  line: Optional[Dict[str, np.ndarray]] = None, **labels) -> Dict[str, Any]:
+    """
+    散点图规格，点数超过MAX_SCATTER_POINTS时抽样，回归线基于全量数据拟合
+
+    参数:
+        x, y: 全量数据（已去除缺失值）
+        alpha: 点的透明度
+        size: 点的大小（可选）
+        fit_line: 是否绘制一次回归线
+        groups: 分组绘制时的分组列表，每项包含label、mask、marker（可选）
+        legend_title: 图例标题（可选）
+        line: 自定义参考线{"x": ..., "y": ...}（可选），优先于fit_line
+    """
+    idx = sample_indices(len(x), MAX_SCATTER_POINTS)
+    keep = np.ones(len(x), dtype=bool)
+    if idx is not None:
+        keep[:] = False
+        keep[idx] = True
+    panel_groups = []
+    for group in groups or [{"label": None, "mask": np.ones(len(x), dtype=bool)}]:
+        mask = group["mask"] & keep
+        panel_groups.append({
+            "label": group.get("label"),
+            "marker": group.get("marker", "o"),
+            "color": group.get("color"),
+            "x": x[mask],
+            "y": y[mask],
+        })
+    if line is None and fit_line and len(x) > 1 and np.ptp(x) > 0:
+        slope, intercept = np.polyfit(x, y, 1)
+        line_x = np.array([x.min(), x.max()])
+        line = {"x": line_x, "y": slope * line_x + intercept}
+    return _panel("scatter", groups=panel_groups, alpha=alpha, size=size,
+                  line=line, legend_title=legend_title, **labels)
+
+
+def line_series(x: np.ndarray, y: np.ndarray, label: Optional[str] = None,
+                lower: Optional[np.ndarray] = None, upper: Optional[np.ndarray] = None,
+                color: Optional[str] = None) -> Dict[str, Any]:
+    """折线图中的一条序列，lower/upper给出时绘制为包络带（如时间桶内的min/max）"""
+    return {"x": x, "y": y, "label": label, "lower": lower, "upper": upper, "color": color}
+
+
+def line_panel(series: List[Dict[str, Any]], secondary: Optional[List[Dict[str, Any]]] = None,
+               secondary_ylabel: Optional[str] = None, yscale: str = 'linear',
+               x_is_time: bool = False, **labels) -> Dict[str, Any]:
+    """
+    折线图规格，数据应已按绘图宽度降采样（见function.时间序列）
+
+    参数:
+        series: 主纵轴上的序列列表（由line_series生成）
+        secondary: 次纵轴上的序列列表（可选，给出时绘制双轴图）
+        secondary_ylabel: 次纵轴标签
+        yscale: 纵轴刻度类型，'linear'或'log'
+        x_is_time: 横轴是否为时间
+    """
+    return _panel("line", series=series, secondary=secondary or [],
+                  secondary_ylabel=secondary_ylabel, yscale=yscale,
+                  x_is_time=x_is_time, **labels)
+
+
+def heatmap_panel(matrix: np.ndarray, row_labels: Sequence[str],
+                  col_labels: Optional[Sequence[str]] = None, annot: bool = True,
+                  cmap: str = 'coolwarm', fmt: str = '.2f', square: bool = True,
+                  **labels) -> Dict[str, Any]:
+    """热力图规格，仅传递矩阵数值和行列标签"""
+    return _panel("heatmap", matrix=np.asarray(matrix, dtype=float),
+                  row_labels=list(row_labels),
+                  col_labels=list(col_labels if col_labels is not None else row_labels),
+                  annot=annot, cmap=cmap, fmt=fmt, square=square, **labels)
+
+
+def figure_spec(save_path: str, panels: List[Dict[str, Any]],
+                layout: Tuple[int, int] = (1, 1), figsize: Tuple[float, float] = (10, 8),
+                dpi: int = 300, suptitle: Optional[str] = None) -> Dict[str, Any]:
+    """
+    组装由若干子图组成的整图规格
+
+    参数:
+        save_path: 图片保存路径
+        panels: 子图规格列表，按行优先顺序排列
+        layout: 子图行列数
+        figsize: 图形尺寸
+        dpi: 保存分辨率
+        suptitle: 总标题（可选）
+
+    返回:
+        可提交给渲染进程池的图表规格字典
+    """
+    return {
+        "figure_kind": "grid",
+        "save_path": save_path,
+        "panels": panels,
+        "layout": tuple(layout),
+        "figsize": tuple(figsize),
+        "dpi": dpi,
+        "suptitle": suptitle,
+    }
+
+
+def clustermap_spec(save_path: str, matrix: np.ndarray, labels: Sequence[str],
+                    annot: bool = True, cmap: str = 'coolwarm', fmt: str = '.2f',
+                    figsize: Tuple[float, float] = (10, 10), dpi: int = 300,
+                    linkage: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    聚类热力图规格（seaborn.clustermap为整图级别的图表）
+
+    linkage为按labels顺序编号的SciPy连接矩阵（可选），提供时行列都按它排序，
+    渲染进程不再重新聚类
+    """
+    return {
+        "figure_kind": "clustermap",
+        "save_path": save_path,
+        "matrix": np.asarray(matrix, dtype=float),
+        "labels": list(labels),
+        "annot": annot,
+        "cmap": cmap,
+        "fmt": fmt,
+        "figsize": tuple(figsize),
+        "dpi": dpi,
+        "linkage": None if linkage is None else np.asarray(linkage, dtype=float),
+    }
+
+
+def pairplot_spec(save_path: str, frame_descriptor: Dict[str, Any], hue: Optional[str] = None,
+                  suptitle: Optional[str] = None, dpi: int = 300) -> Dict[str, Any]:
+    """配对图规格，数据通过共享内存描述符引用（见function.共享内存）"""
+    return {
+        "figure_kind": "pairplot",
+        "save_path": save_path,
+        "frame": frame_descriptor,
+        "hue": hue,
+        "suptitle": suptitle,
+        "dpi": dpi,
+    }
@@ -0,0 +1,134 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+# 两次进度通知之间的最短间隔（秒），阶段切换和部分结果不受限制
+PROGRESS_MIN_INTERVAL = 0.2
+
+
+class OperationCancelled(Exception):
+    """请求已被取消，分析函数在检查点处中止"""
+
+
+class ProgressReporter:
+    """
+    长耗时分析的进度报告与协作式取消
+
+    分析函数在工作线程中通过current_reporter()获取当前请求的报告器：
+    - phase/advance: 报告阶段和进度（已解析的行数、已计算的变量对、已渲染的图表）
+    - partial: 统计结果一经算出即推送，无需等待图表渲染完成
+    - checkpoint: 请求被取消时抛出OperationCancelled
+
+    事件以字典形式同步交给各个监听器，监听器负责转发到客户端（见server._dispatch）。
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._last_emit = 0.0
+        # 进度通知要求单调递增，按所有阶段累计的步数报告
+        self.steps = 0
+        self.phase_name: Optional[str] = None
+        self.phase_done = 0
+        self.phase_total: Optional[int] = None
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                # 通知失败（如客户端已断开）不影响计算
+                pass
+
+    def _progress_event(self) -> Dict[str, Any]:
+        if self.phase_total:
+            message = f"{self.phase_name}: {self.phase_done}/{self.phase_total}"
+        else:
+            message = f"{self.phase_name}: {self.phase_done}"
+        return {"type": "progress", "progress": self.steps, "message": message}
+
+    def phase(self, name: str, total: Optional[int] = None) -> None:
+        """进入新阶段（同时作为取消检查点）"""
+        self.checkpoint()
+        with self._lock:
+            self.phase_name, self.phase_done, self.phase_total = name, 0, total
+            self.steps += 1
+            self._last_emit = time.monotonic()
+            event = self._progress_event()
+        self._emit(event)
+
+    def advance(self, amount: int = 1) -> None:
+        """当前阶段完成amount个单位（同时作为取消检查点，可在多个线程中调用）"""
+        self.checkpoint()
+        with self._lock:
+            self.phase_done += amount
+            self.steps += 1
+            now = time.monotonic()
+            finished = self.phase_total is not None and self.phase_done >= self.phase_total
+            if not finished and now - self._last_emit < PROGRESS_MIN_INTERVAL:
+                return
+            self._last_emit = now
+            event = self._progress_event()
+        self._emit(event)
+
+    def partial(self, name: str, data: Any) -> None:
+        """推送提前得到的部分结果（如统计量），图表可能仍在渲染"""
+        self._emit({"type": "partial", "name": name, "data": data})
+
+    def checkpoint(self) -> None:
+        """协作式取消检查点"""
+        if self._cancelled.is_set():
+            raise OperationCancelled("请求已取消")
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class _NullReporter(ProgressReporter):
+    """未在请求上下文中调用分析函数（如命令行直接调用）时使用，不做任何报告"""
+
+    def phase(self, name: str, total: Optional[int] = None) -> None:
+        pass
+
+    def advance(self, amount: int = 1) -> None:
+        pass
+
+    def partial(self, name: str, data: Any) -> None:
+        pass
+
+
+_NULL_REPORTER = _NullReporter()
+_local = threading.local()
+
+
+def current_reporter() -> ProgressReporter:
+    """返回当前线程所执行请求的报告器"""
+    return getattr(_local, "reporter", None) or _NULL_REPORTER
+
+
+@contextmanager
+def use_reporter(reporter: ProgressReporter) -> Iterator[ProgressReporter]:
+    """在当前线程中设置请求的报告器"""
+    previous = getattr(_local, "reporter", None)
+    _local.reporter = reporter
+    try:
+        yield reporter
+    finally:
+        _local.reporter = previous
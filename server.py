@@ -1,44 +1,340 @@
+import argparse
 import asyncio
+import contextlib
+import copy
+import functools
 import json
+import os
+import socket
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 import pandas as pd
 import numpy as np
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.transport_security import TransportSecuritySettings
 
 # 导入所有图表函数
 from function.单变量 import generate_single_column_plots
 from function.多变量相关性 import generate_scatter_plot
 from function.类别型变量 import analyze_categorical_column
 from function.热力图 import generate_correlation_heatmap
-from function.散点图 import plot_csv_scatter
+from function.散点图 import generate_pairplot, generate_scatter_plot_advanced, plot_csv_scatter
 from function.数值型and类别型 import analyze_numeric_vs_categorical
 from function.折线图 import plot_csv_column
 from function.双轴折线图 import plot_dual_axis_line_chart
-from function.qq图 import generate_qq_plot_with_test
+from function.qq图 import generate_qq_plot_with_test, test_normality_columns
+
+from function.数据加载 import file_fingerprint
+from function.准入控制 import (ADMISSION_POLL_INTERVAL, AdmissionRejected, estimate_request,
+                               get_admission_controller)
+from function.进度 import ProgressReporter, use_reporter
+from function.性能剖析 import format_profile_summary, run_profiled, should_profile
+from function.渲染进程池 import RENDER_WORKERS, STATS_WORKERS, get_render_pool, get_stats_pool, shutdown_render_pool
+from function.时间序列 import CACHE_DIR, pyramid_cache_status
 
 # 创建MCP服务器
 mcp = FastMCP("Chart Analysis Server")
 
+# 服务进程启动时间，用于健康检查
+_STARTED_AT = time.monotonic()
+
+# 正在执行中的请求，键由函数名、规范化后的参数和数据文件指纹组成
+_inflight: Dict[str, "_Flight"] = {}
+
+
+def _request_key(func, kwargs: Dict[str, Any]) -> Optional[str]:
+    """生成请求的去重键；数据文件无法访问时返回None（不参与去重）"""
+    normalized = dict(kwargs)
+    try:
+        if "csv_path" in normalized:
+            normalized["csv_path"] = file_fingerprint(normalized["csv_path"])
+    except OSError:
+        return None
+    for key in ("save_dir", "save_path"):
+        if isinstance(normalized.get(key), str):
+            normalized[key] = str(Path(normalized[key]).resolve())
+    return json.dumps([func.__module__, func.__name__, normalized],
+                      sort_keys=True, default=str, ensure_ascii=False)
+
+
+# 各分析函数超出内存预算时可采用的降级方式：分块读取（chunksize）或抽样（sample_frac）
+_ADMISSION_PROFILES: Dict[Any, Dict[str, Any]] = {
+    generate_single_column_plots: {"sample": True},
+    generate_scatter_plot: {"sample": True},
+    analyze_categorical_column: {"chunk": True},
+    # 只有Pearson相关可按数据块合并，秩相关只能抽样
+    generate_correlation_heatmap: {"chunk": lambda kw: kw.get("corr_method", "pearson") == "pearson",
+                                   "sample": True},
+    plot_csv_scatter: {"sample": True},
+    generate_scatter_plot_advanced: {"sample": True},
+    generate_pairplot: {"sample": True},
+    analyze_numeric_vs_categorical: {"sample": True},
+    generate_qq_plot_with_test: {"sample": True},
+    # 正态性检验只依赖各列的矩，可按数据块合并
+    test_normality_columns: {"chunk": True, "sample": True},
+}
+
+# 请求参数中表示所用列的参数名，用于只按实际读取的列估算内存
+_COLUMN_ARGS = ("x_column", "y_column", "column_name", "y1_column", "y2_column",
+                "numeric_col", "category_col", "numeric_columns", "columns",
+                "hue_column", "style_column")
+
+
+def _request_columns(kwargs: Dict[str, Any]) -> Optional[List[str]]:
+    columns: List[str] = []
+    for name in _COLUMN_ARGS:
+        value = kwargs.get(name)
+        if isinstance(value, str):
+            columns.append(value)
+        elif isinstance(value, (list, tuple)):
+            columns.extend(value)
+    return columns or None
+
+
+def _supports(profile: Dict[str, Any], mode: str, kwargs: Dict[str, Any]) -> bool:
+    option = profile.get(mode, False)
+    return bool(option(kwargs) if callable(option) else option)
+
+
+def _admission_summary(decision: Dict[str, Any]) -> Dict[str, Any]:
+    """响应中报告的准入决策"""
+    estimate = decision["estimate"]
+    summary = {
+        "decision": decision["decision"],
+        "estimated_memory_mb": estimate["estimated_memory_mb"],
+        "estimated_seconds": estimate["estimated_seconds"],
+        "estimated_rows": estimate["estimated_rows"],
+        "budget_mb": decision["budget_mb"],
+    }
+    for key in ("chunksize", "sample_frac", "waited_seconds", "reason"):
+        if decision.get(key) is not None:
+            summary[key] = decision[key]
+    if decision.get("queued"):
+        summary["queued"] = True
+    return summary
+
+
+def _attach_admission(result: Any, decision: Dict[str, Any]) -> Any:
+    summary = _admission_summary(decision)
+    if isinstance(result, dict):
+        result["admission"] = summary
+    elif isinstance(result, str) and summary["decision"] != "accept":
+        result += f"\n准入控制: {summary}"
+    return result
+
+
+# 等待内存预算的排队请求（事件循环中的Future），有请求归还预算或被取消时唤醒
+_admission_waiters: List[asyncio.Future] = []
+
+
+def _wake_admission_waiters() -> None:
+    for waiter in _admission_waiters:
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+async def _wait_for_admission(controller, decision: Dict[str, Any], reporter: ProgressReporter) -> None:
+    """
+    在事件循环中等待内存预算（不占用工作线程）
+
+    有请求归还预算时被唤醒，此外至少每ADMISSION_POLL_INTERVAL秒重新检查一次
+    （缓存缩小等预算变化不会发出通知），同时检查请求是否已取消和是否排队超时
+    """
+    start = time.monotonic()
+    deadline = start + controller.queue_timeout
+    loop = asyncio.get_running_loop()
+    while not controller.try_acquire(decision):
+        decision["queued"] = True
+        reporter.checkpoint()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            decision.update(decision="reject",
+                            reason=f"排队等待内存预算超时（{controller.queue_timeout:.0f}秒）")
+            raise AdmissionRejected(decision["reason"], decision)
+        waiter = loop.create_future()
+        _admission_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, min(remaining, ADMISSION_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _admission_waiters.remove(waiter)
+    decision["waited_seconds"] = round(time.monotonic() - start, 3)
+
+
+def _attach_profile(result: Any, summary: Dict[str, Any]) -> Any:
+    if isinstance(result, dict):
+        result["profile"] = summary
+    elif isinstance(result, str):
+        result += f"\n性能剖析:\n{format_profile_summary(summary)}"
+    return result
+
+
+def _execute(func, kwargs: Dict[str, Any], reporter: ProgressReporter, profiled: bool) -> Any:
+    """
+    执行一次计算（在工作线程中运行），需要剖析时在剖析器下执行并附加热点摘要
+
+    执行期间分析函数通过current_reporter()报告进度和部分结果
+    """
+    with use_reporter(reporter):
+        # 排队期间请求可能已被取消
+        reporter.checkpoint()
+        if not profiled:
+            return func(**kwargs)
+        result, summary = run_profiled(functools.partial(func, **kwargs), label=func.__name__)
+        return _attach_profile(result, summary)
+
+
+async def _run_admitted(func, kwargs: Dict[str, Any], reporter: ProgressReporter, profiled: bool) -> Any:
+    """
+    在内存准入控制下执行分析函数
+
+    先（在工作线程中）按文件大小和抽样行宽估算内存；超出预算时改用分块或抽样模式，
+    当前剩余预算不足时在事件循环中排队，无法执行时直接返回错误，决策附加在结果中。
+    只有分析函数本身在线程池中执行
+    """
+    loop = asyncio.get_running_loop()
+    controller = get_admission_controller()
+    try:
+        estimate = await loop.run_in_executor(None, estimate_request, kwargs["csv_path"],
+                                              _request_columns(kwargs))
+    except Exception:
+        # 无法估算（文件不存在、格式错误等）时交由分析函数自身报告错误
+        return await loop.run_in_executor(None, _execute, func, kwargs, reporter, profiled)
+
+    profile = _ADMISSION_PROFILES.get(func, {})
+    decision = controller.plan(estimate, can_chunk=_supports(profile, "chunk", kwargs),
+                               can_sample=_supports(profile, "sample", kwargs))
+    try:
+        await _wait_for_admission(controller, decision, reporter)
+    except AdmissionRejected as e:
+        return _attach_admission({"error": f"请求被拒绝: {e}", "success": False}, decision)
+    try:
+        if decision["chunksize"]:
+            kwargs = dict(kwargs, chunksize=decision["chunksize"])
+        if decision["sample_frac"]:
+            kwargs = dict(kwargs, sample_frac=decision["sample_frac"])
+        result = await loop.run_in_executor(None, _execute, func, kwargs, reporter, profiled)
+    finally:
+        controller.release(decision)
+        _wake_admission_waiters()
+    return _attach_admission(result, decision)
+
+
+def _progress_listener(ctx: Context, loop: asyncio.AbstractEventLoop, stream_partial: bool):
+    """
+    把报告器的事件转发给客户端（在工作线程中调用，通知在事件循环中发送）
+
+    进度以MCP进度通知发送（客户端请求中带有progressToken时才会发出）；
+    MCP没有部分结果消息，部分结果以JSON格式的日志通知发送
+    """
+    def listener(event: Dict[str, Any]) -> None:
+        if event["type"] == "progress":
+            coro = ctx.report_progress(event["progress"], None, event["message"])
+        elif stream_partial:
+            coro = ctx.info(json.dumps({"partial_result": event["name"], "data": event["data"]},
+                                       ensure_ascii=False, default=str))
+        else:
+            return
+        asyncio.run_coroutine_threadsafe(coro, loop)
+    return listener
+
+
+class _Flight:
+    """一次正在执行的计算：结果、报告器和等待该结果的请求数"""
+
+    def __init__(self, future: asyncio.Future, reporter: ProgressReporter):
+        self.future = future
+        self.reporter = reporter
+        self.waiters = 0
+
+
+async def _dispatch(func, ctx: Context = None, stream_partial: bool = False,
+                    profile: bool = False, **kwargs) -> Any:
+    """
+    在线程池中执行分析函数，避免阻塞事件循环
+
+    参数与数据文件完全相同的并发请求只计算一次：后到的请求等待正在执行的
+    计算并获得同一结果的副本，同时也收到该计算之后的进度通知。每次计算都
+    经过内存准入控制（见_run_admitted）。等待同一计算的请求全部被取消时，
+    计算在下一个检查点中止，释放工作线程和内存预算
+
+    需要剖析的请求（显式要求或按CHART_PROFILE_SAMPLE_RATE抽中）单独计算，
+    不与其它请求合并，剖析结果只反映本次请求
+
+    参数:
+        func: 分析函数
+        ctx: 当前请求的MCP上下文（可选），用于发送进度通知和部分结果
+        stream_partial: 是否以日志通知推送部分结果
+        profile: 是否对本次计算进行CPU和内存剖析
+        kwargs: 分析函数的参数
+    """
+    loop = asyncio.get_running_loop()
+    profiled = should_profile(profile)
+    key = None if profiled else _request_key(func, kwargs)
+    flight = _inflight.get(key) if key is not None else None
+    owner = flight is None
+    if owner:
+        reporter = ProgressReporter()
+        future = asyncio.ensure_future(_run_admitted(func, kwargs, reporter, profiled))
+        # 计算被取消后可能无人等待结果，避免事件循环报告未获取的异常
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        flight = _Flight(future, reporter)
+        if key is not None:
+            _inflight[key] = flight
+
+    listener = _progress_listener(ctx, loop, stream_partial) if ctx is not None else None
+    if listener is not None:
+        flight.reporter.add_listener(listener)
+    flight.waiters += 1
+    try:
+        # 当前请求被取消时不影响正在等待同一结果的其它请求
+        result = await asyncio.shield(flight.future)
+    except asyncio.CancelledError:
+        if flight.waiters == 1:
+            flight.reporter.cancel()
+            # 计算可能正在排队等待预算，唤醒后立即结束
+            _wake_admission_waiters()
+            if key is not None and _inflight.get(key) is flight:
+                del _inflight[key]
+        raise
+    finally:
+        flight.waiters -= 1
+        if listener is not None:
+            flight.reporter.remove_listener(listener)
+        if key is not None and flight.future.done() and _inflight.get(key) is flight:
+            del _inflight[key]
+    return result if owner else copy.deepcopy(result)
+
 @mcp.tool()
 async def analyze_single_variable(
-    csv_path: str, 
+    csv_path: Union[str, List[str]],
     y_column: str, 
-    save_dir: str = r"D:\桌面"
+    save_dir: str = r"D:\桌面",
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
 ) -> str:
     """
     从CSV文件中读取指定列数据，并生成四种统计图表(绘制直方图,绘制核密度估计图,绘制箱线图,绘制小提琴图)保存到指定目录
     
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 需要分析的数值列名
         save_dir: 图片保存目录，默认为D:\桌面
+        stream_partial_results: 是否在图表渲染完成前先以日志通知推送统计结果(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
     
     返回值:
         str: 操作结果的字符串描述
     """
     try:
-        result = generate_single_column_plots(
+        result = await _dispatch(
+            generate_single_column_plots,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             y_column=y_column,
             save_dir=save_dir
@@ -49,26 +345,35 @@ async def analyze_single_variable(
 
 @mcp.tool()
 async def analyze_correlation(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     x_column: str,
     y_column: str,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
 ) -> Dict[str, Any]:
     """分析两个数值变量之间的相关性
     从CSV文件中读取指定列数据并绘制散点图
     
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 用作y轴的列名
         x_column: 用作x轴的列名(可选)，缺省时使用行索引
         save_path: 图片保存路径，默认为'D:\\桌面'
+        stream_partial_results: 是否在图表渲染完成前先以日志通知推送统计结果(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
     
     返回:
         操作结果状态字符串
 
     """
     try:
-        result = generate_scatter_plot(
+        result = await _dispatch(
+            generate_scatter_plot,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             x_column=x_column,
             y_column=y_column,
@@ -80,64 +385,87 @@ async def analyze_correlation(
 
 @mcp.tool()
 async def analyze_categorical(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     y_column: str,
     save_dir: str = r"D:\桌面",
     top_n: int = None,
-    min_freq: int = 1
-) -> str:
+    min_freq: int = 1,
+    backend: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    output_format: Optional[str] = None,
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
     """分析类别型变量的分布特征
         对分类变量生成条形图、饼图和频数表
     
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 要分析的分类型列名
         save_dir: 图片保存目录，默认为D:\桌面
         top_n: 仅显示频率最高的前n个类别（可选）
         min_freq: 显示最小频数阈值（可选）
+        backend: 聚合计算后端，可选'pandas'/'duckdb'（可选）
+        offset: 频数表分页的起始行，默认为0
+        limit: 频数表每页行数，默认为100（可选）
+        output_format: 将完整频数表写入save_dir下的文件，可选'csv'/'parquet'（可选）
+        stream_partial_results: 是否在图表渲染完成前先以日志通知推送统计结果(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
     
     返回值:
         dict: 包含以下键的字典:
             - 'barplot_path': 条形图路径
             - 'piechart_path': 饼图路径
-            - 'frequency_table': 频数表文本
+            - 'frequency_table': 频数表的一页（columns、records、total_rows、has_more、next_offset）
             - 'summary_stats': 统计摘要
+            - 'frequency_table_path': 完整频数表文件路径（指定output_format时）
     """
     try:
-        result = analyze_categorical_column(
+        return await _dispatch(
+            analyze_categorical_column,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             y_column=y_column,
             save_dir=save_dir,
             top_n=top_n,
-            min_freq=min_freq
+            min_freq=min_freq,
+            backend=backend,
+            offset=offset,
+            limit=limit,
+            output_format=output_format
         )
-        result_str = f"条形图路径: {result['barplot_path']}\n"
-        result_str += f"饼图路径: {result['piechart_path']}\n\n"
-        result_str += "频率表:\n"
-        result_str += f"{result['frequency_table']}\n\n"
-        result_str += "统计摘要:\n"
-        result_str += f"{result['summary_stats']}\n\n"
-        result_str += f"操作状态: {'成功' if result['success'] else '失败'}"
-        return result_str
     except Exception as e:
-        return "输出失败"
+        return {"success": False, "error": str(e)}
 
 @mcp.tool()
 async def generate_heatmap(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     numeric_columns: List[str],
     save_dir: str = r"D:\桌面",
     corr_method: str = 'pearson',
     cluster: bool = False,
     annot: bool = True,
     cmap: str = 'coolwarm',
-    figsize: Optional[tuple] = None
-) -> str:
+    figsize: Optional[tuple] = None,
+    backend: Optional[str] = None,
+    show_dendrogram: Optional[bool] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    top_k: int = 20,
+    output_format: Optional[str] = None,
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
     """生成数值变量之间的相关系数热力图
     生成数值变量之间的相关系数热力图
     
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         numeric_columns: 需要分析的数值列名列表
         save_dir: 图片保存目录，默认为D:\桌面
         corr_method: 相关系数类型，可选 'pearson'(默认)/'spearman'/'kendall'
@@ -145,13 +473,27 @@ async def generate_heatmap(
         annot: 是否显示相关系数值，默认为True
         cmap: 颜色图谱，默认为'coolwarm'
         figsize: 图形尺寸，自动根据列数调整(可选覆盖)
+        backend: 聚合计算后端，可选'pandas'/'duckdb'（可选）
+        show_dendrogram: 聚类时是否绘制树状图，缺省在变量不多于50个时绘制(可选)
+        offset: 相关系数矩阵分页的起始行，默认为0
+        limit: 相关系数矩阵每页行数，默认为100(可选)
+        top_k: 返回绝对值最大的前k个变量对，默认为20
+        output_format: 将完整矩阵写入save_dir下的文件，可选'csv'/'parquet'/'npy'(可选)
+        stream_partial_results: 是否在图表渲染完成前先以日志通知推送统计结果(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
     
     返回值:
-        热力图保存路径，相关系数矩阵文本，使用的相关系数方法
+        热力图保存路径，相关系数矩阵的一页（columns、row_labels、values二维数组及分页信息），
+        最强相关的变量对，使用的相关系数方法，聚类时附带聚类排序后的列名，
+        指定output_format时附带完整矩阵的文件路径
 
     """
     try:
-        result = generate_correlation_heatmap(
+        return await _dispatch(
+            generate_correlation_heatmap,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             numeric_columns=numeric_columns,
             save_dir=save_dir,
@@ -159,38 +501,44 @@ async def generate_heatmap(
             cluster=cluster,
             annot=annot,
             cmap=cmap,
-            figsize=figsize
+            figsize=figsize,
+            backend=backend,
+            show_dendrogram=show_dendrogram,
+            offset=offset,
+            limit=limit,
+            top_k=top_k,
+            output_format=output_format
         )
-        result_str = f"热力图保存路径: {result['heatmap_path']}\n\n"
-        result_str += f"相关系数计算方法: {result['method_used']}\n\n"
-        result_str += "相关系数矩阵:\n"
-        result_str += f"{result['correlation_matrix']}\n\n"
-        result_str += f"操作状态: {'成功' if result['success'] else '失败'}"
-        return result_str
     except Exception as e:
-        return "操作失败"
+        return {"success": False, "error": str(e)}
 
 @mcp.tool()
 async def create_scatter_plot(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     y_column: str,
     x_column: Optional[str] = None,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    profile: bool = False,
+    ctx: Context = None
 ) -> Dict[str, Any]:
     """创建散点图
         从CSV文件中读取指定列数据并绘制散点图
     
     参数:
-        csv_path: CSV文件路径
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
         y_column: 用作y轴的列名
         x_column: 用作x轴的列名(可选)，缺省时使用行索引
         save_dir: 图片保存目录，默认为D:\桌面
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
     
     返回:
         操作结果状态字符串  
     """
     try:
-        result = plot_csv_scatter(
+        result = await _dispatch(
+            plot_csv_scatter,
+            ctx=ctx,
+            profile=profile,
             csv_path=csv_path,
             y_column=y_column,
             x_column=x_column,
@@ -200,26 +548,122 @@ async def create_scatter_plot(
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@mcp.tool()
+async def create_advanced_scatter_plot(
+    csv_path: Union[str, List[str]],
+    x_column: str,
+    y_column: str,
+    hue_column: Optional[str] = None,
+    style_column: Optional[str] = None,
+    save_dir: str = "./charts",
+    add_regression: bool = True,
+    alpha: float = 0.6,
+    point_size: int = 50,
+    source_column: Optional[str] = None,
+    profile: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """创建按颜色和样式分组的散点图
+        可添加回归线；读取多个文件时可用source_column添加来源文件名列，并将其作为hue_column按文件着色
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        x_column: 用作x轴的列名
+        y_column: 用作y轴的列名
+        hue_column: 用于颜色分组的列名(可选)
+        style_column: 用于样式分组的列名(可选)
+        save_dir: 图片保存目录
+        add_regression: 是否添加回归线，默认为True
+        alpha: 点的透明度，默认为0.6
+        point_size: 点的大小，默认为50
+        source_column: 添加来源文件名列的列名(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
+    """
+    try:
+        return await _dispatch(
+            generate_scatter_plot_advanced,
+            ctx=ctx,
+            profile=profile,
+            csv_path=csv_path,
+            x_column=x_column,
+            y_column=y_column,
+            hue_column=hue_column,
+            style_column=style_column,
+            save_dir=save_dir,
+            add_regression=add_regression,
+            alpha=alpha,
+            point_size=point_size,
+            source_column=source_column
+        )
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@mcp.tool()
+async def create_pairplot(
+    csv_path: Union[str, List[str]],
+    numeric_columns: List[str],
+    hue_column: Optional[str] = None,
+    save_dir: str = "./charts",
+    source_column: Optional[str] = None,
+    profile: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """创建数值变量的配对图矩阵
+        读取多个文件时可用source_column添加来源文件名列，并将其作为hue_column按文件着色
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        numeric_columns: 需要分析的数值列名列表
+        hue_column: 用于颜色分组的列名(可选)
+        save_dir: 图片保存目录
+        source_column: 添加来源文件名列的列名(可选)
+        profile: 是否对本次调用进行CPU和内存剖析，结果中附带热点摘要(可选)
+    """
+    try:
+        return await _dispatch(
+            generate_pairplot,
+            ctx=ctx,
+            profile=profile,
+            csv_path=csv_path,
+            numeric_columns=numeric_columns,
+            hue_column=hue_column,
+            save_dir=save_dir,
+            source_column=source_column
+        )
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @mcp.tool()
 async def analyze_numeric_categorical(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     numeric_col: str,
     category_col: str,
     plot_types: List[str] = ["boxplot", "violin", "density"],
     show_mean: bool = True,
     show_median: bool = False,
-    save_dir: str = r"D:\桌面"
+    save_dir: str = r"D:\桌面",
+    backend: Optional[str] = None,
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
 ) -> Dict[str, Any]:
-    """分析数值变量与类别变量的关系"""
+    """分析数值变量与类别变量的关系
+        分组统计和方差分析由聚合计算后端（'pandas'/'duckdb'）完成
+    """
     try:
-        result = analyze_numeric_vs_categorical(
+        result = await _dispatch(
+            analyze_numeric_vs_categorical,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             numeric_col=numeric_col,
             category_col=category_col,
             plot_types=plot_types,
             show_mean=show_mean,
             show_median=show_median,
-            save_dir=save_dir
+            save_dir=save_dir,
+            backend=backend
         )
         return {"success": True, "result": result}
     except Exception as e:
@@ -227,16 +671,40 @@ async def analyze_numeric_categorical(
 
 @mcp.tool()
 async def create_line_plot(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     column_name: str,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    x_column: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    width_px: int = 1600,
+    profile: bool = False,
+    ctx: Context = None
 ) -> Dict[str, Any]:
-    """创建折线图"""
+    """创建折线图
+        大数据量时按时间窗口和绘图宽度自动选择汇总粒度（均值曲线+min/max包络带）
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        column_name: 需要绘制的数值列名
+        save_dir: 图片保存目录
+        x_column: 用作横轴的时间列或数值列(可选)，缺省时使用行号
+        start: 时间窗口起点(可选)，如'2026-01-01 08:00'
+        end: 时间窗口终点(可选)
+        width_px: 绘图宽度（像素），决定最多绘制的点数
+    """
     try:
-        result = plot_csv_column(
+        result = await _dispatch(
+            plot_csv_column,
+            ctx=ctx,
+            profile=profile,
             csv_path=csv_path,
             column_name=column_name,
-            save_path=save_dir
+            save_path=save_dir,
+            x_column=x_column,
+            start=start,
+            end=end,
+            width_px=width_px
         )
         return {"success": True, "result": result}
     except Exception as e:
@@ -244,59 +712,92 @@ async def create_line_plot(
 
 @mcp.tool()
 async def create_dual_axis_plot(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     y1_column: str,
     y2_column: str,
     x_column: Optional[str] = None,
     scale_type: str = 'linear',
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    width_px: int = 1600,
+    profile: bool = False,
+    ctx: Context = None
 ) -> str:
-    """创建双轴折线图"""
+    """创建双轴折线图
+        大数据量时按时间窗口和绘图宽度自动选择汇总粒度
+
+    参数:
+        csv_path: CSV文件路径，支持通配符模式（如'events_*.csv'）或文件路径列表
+        y1_column: 左侧纵轴的数值列名
+        y2_column: 右侧纵轴的数值列名
+        x_column: 用作横轴的时间列或数值列(可选)，缺省时使用行号
+        scale_type: 纵轴刻度类型，可选'linear'/'log'
+        save_dir: 图片保存目录
+        start: 时间窗口起点(可选)
+        end: 时间窗口终点(可选)
+        width_px: 绘图宽度（像素），决定最多绘制的点数
+    """
     try:
-        result = plot_dual_axis_line_chart(
+        result = await _dispatch(
+            plot_dual_axis_line_chart,
+            ctx=ctx,
+            profile=profile,
             csv_path=csv_path,
             y1_column=y1_column,
             y2_column=y2_column,
             x_column=x_column,
             scale_type=scale_type,
-            save_dir=save_dir
+            save_dir=save_dir,
+            start=start,
+            end=end,
+            width_px=width_px
         )
         data = result
-        result_str = f"图表保存路径: {data['plot_path']}\n\n"
-
-        # 添加温度统计信息
-        result_str += "温度统计数据:\n"
-        temp_stats = data['data_stats']['temperature']
-        result_str += f"  平均值: {float(temp_stats['mean'])}\n"
-        result_str += f"  中位数: {float(temp_stats['median'])}\n"
-        result_str += f"  最小值: {float(temp_stats['min'])}\n"
-        result_str += f"  最大值: {float(temp_stats['max'])}\n\n"
-
-        # 添加销售额统计信息
-        result_str += "销售额统计数据:\n"
-        sales_stats = data['data_stats']['sales']
-        result_str += f"  平均值: {float(sales_stats['mean'])}\n"
-        result_str += f"  中位数: {float(sales_stats['median'])}\n"
-        result_str += f"  最小值: {int(sales_stats['min'])}\n"
-        result_str += f"  最大值: {int(sales_stats['max'])}\n\n"
+        if not data['success']:
+            return f"操作失败：{data['error']}"
+        result_str = f"图表保存路径: {data['plot_path']}\n"
+        result_str += f"分辨率: {data['resolution']}（绘制{data['points_plotted']}个点，窗口内{data['rows_in_window']}行）\n\n"
+
+        # 添加各列的统计信息
+        for column, stats in data['data_stats'].items():
+            result_str += f"{column}统计数据:\n"
+            result_str += f"  平均值: {stats['mean']}\n"
+            result_str += f"  中位数: {stats['median']}\n"
+            result_str += f"  最小值: {stats['min']}\n"
+            result_str += f"  最大值: {stats['max']}\n\n"
 
         # 添加操作状态和警告信息
         result_str += f"操作状态: {'成功' if data['success'] else '失败'}\n"
-        result_str += f"提示信息: {data['warning']}" 
+        result_str += f"提示信息: {data['warning']}"
+        if 'admission' in data:
+            result_str += f"\n准入控制: {data['admission']}"
+        if 'profile' in data:
+            result_str += f"\n性能剖析:\n{format_profile_summary(data['profile'])}"
         return result_str       
     except Exception as e:
         return "操作失败"
 
 @mcp.tool()
 async def create_qq_plot(
-    csv_path: str,
+    csv_path: Union[str, List[str]],
     y_column: str,
     alpha: float = 0.05,
-    save_dir: str = "./charts"
+    save_dir: str = "./charts",
+    stream_partial_results: bool = False,
+    profile: bool = False,
+    ctx: Context = None
 ) -> Dict[str, Any]:
-    """创建QQ图并进行正态性检验"""
+    """创建QQ图并进行正态性检验
+        按样本量自动选择检验方法：n<=5000使用Shapiro-Wilk，
+        更大的样本使用D'Agostino K²并附带Anderson-Darling或KS检验
+    """
     try:
-        result = generate_qq_plot_with_test(
+        result = await _dispatch(
+            generate_qq_plot_with_test,
+            ctx=ctx,
+            profile=profile,
+            stream_partial=stream_partial_results,
             csv_path=csv_path,
             y_column=y_column,
             alpha=alpha,
@@ -306,5 +807,151 @@ async def create_qq_plot(
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@mcp.tool()
+async def batch_normality_test(
+    csv_path: Union[str, List[str]],
+    columns: List[str],
+    alpha: float = 0.05,
+    profile: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """对多个数值列一次性进行正态性检验（向量化的D'Agostino K²检验，不绘图）"""
+    try:
+        result = await _dispatch(
+            test_normality_columns,
+            ctx=ctx,
+            profile=profile,
+            csv_path=csv_path,
+            columns=columns,
+            alpha=alpha
+        )
+        return {"success": True, "result": result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@mcp.tool()
+async def health_check() -> Dict[str, Any]:
+    """
+    服务健康与就绪检查
+
+    返回当前进程的运行时间、正在执行的计算数、内存预算使用情况（含常驻缓存）、
+    渲染进程池状态、时间序列金字塔缓存占用和磁盘缓存目录；多进程部署时每个请求由其中一个进程回答
+    """
+    admission = get_admission_controller().status()
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.monotonic() - _STARTED_AT, 1),
+        "inflight_computations": len(_inflight),
+        "admission": admission,
+        "memory_available_mb": admission["available_mb"],
+        "render_pool": get_render_pool().status(),
+        "stats_pool": get_stats_pool().status(),
+        "pyramid_cache": pyramid_cache_status(),
+        "cache_dir": CACHE_DIR,
+    }
+
+
+# DNS重绑定防护（检查Host和Origin头）始终允许的回环地址
+_LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+# 监听所有地址时无法由监听地址得到主机名，改为允许本机主机名
+_WILDCARD_HOSTS = ("0.0.0.0", "::", "")
+
+
+def _transport_security(host: str, extra_hosts: List[str]) -> TransportSecuritySettings:
+    """
+    由监听地址和额外允许的主机名生成DNS重绑定防护设置
+
+    允许回环地址、监听地址（监听所有地址时为本机主机名）和extra_hosts，
+    每个名称允许任意端口，Origin允许http和https
+    """
+    names = list(_LOOPBACK_HOSTS)
+    names += [socket.gethostname(), socket.getfqdn()] if host in _WILDCARD_HOSTS else [host]
+    names += extra_hosts
+    allowed_hosts, allowed_origins = [], []
+    for name in dict.fromkeys(name for name in names if name):
+        if ":" in name and not name.startswith("["):
+            name = f"[{name}]"  # IPv6地址
+        allowed_hosts += [name, f"{name}:*"]
+        allowed_origins += [f"{scheme}://{name}{port}" for scheme in ("http", "https") for port in ("", ":*")]
+    return TransportSecuritySettings(enable_dns_rebinding_protection=True,
+                                     allowed_hosts=allowed_hosts, allowed_origins=allowed_origins)
+
+
+def create_app():
+    """
+    创建Streamable HTTP传输的ASGI应用（uvicorn的应用工厂，每个工作进程调用一次）
+
+    多个工作进程之间不共享会话，因此使用无状态模式：每个请求独立处理，
+    可由任意一个工作进程回答。应用退出时关闭本进程的渲染进程池。
+    DNS重绑定防护只接受监听地址和CHART_ALLOWED_HOSTS（逗号分隔）中的主机名
+    """
+    mcp.settings.stateless_http = True
+    host = os.environ.get("CHART_HTTP_HOST", mcp.settings.host)
+    extra_hosts = [name.strip() for name in os.environ.get("CHART_ALLOWED_HOSTS", "").split(",") if name.strip()]
+    mcp.settings.transport_security = _transport_security(host, extra_hosts)
+    app = mcp.streamable_http_app()
+    session_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        try:
+            async with session_lifespan(app):
+                yield
+        finally:
+            shutdown_render_pool()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    命令行入口
+
+    默认使用stdio传输（由MCP客户端启动）；streamable-http传输在一个端口上
+    启动多个工作进程，每个进程有各自的事件循环、线程池和渲染进程池，
+    内存预算、渲染进程数和统计计算进程数在工作进程之间平分
+    """
+    parser = argparse.ArgumentParser(description="CSV图表分析MCP服务器")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio",
+                        help="传输方式，默认为stdio")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP监听地址，默认为127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP监听端口，默认为8000")
+    parser.add_argument("--workers", type=int, default=1, help="HTTP工作进程数，默认为1")
+    parser.add_argument("--allowed-host", action="append", default=[],
+                        help="除监听地址外允许的Host头主机名（如反向代理或公网域名），可重复指定")
+    parser.add_argument("--graceful-timeout", type=float, default=30,
+                        help="关闭时等待正在执行的请求完成的最长时间（秒），默认为30")
+    args = parser.parse_args(argv)
+
+    if args.transport == "stdio":
+        mcp.run(transport='stdio')
+        return
+
+    import uvicorn
+
+    # 工作进程通过导入本模块创建应用，配置经环境变量传递
+    os.environ["CHART_HTTP_HOST"] = args.host
+    if args.allowed_host:
+        os.environ["CHART_ALLOWED_HOSTS"] = ",".join(args.allowed_host)
+    if args.workers > 1 and "CHART_MEMORY_BUDGET_MB" not in os.environ:
+        budget = get_admission_controller().budget_mb
+        os.environ["CHART_MEMORY_BUDGET_MB"] = str(budget / args.workers)
+    # 每个工作进程各自启动渲染进程池和统计计算进程池，总数保持为CPU核数左右
+    for name, count in (("CHART_RENDER_WORKERS", RENDER_WORKERS), ("CHART_STATS_WORKERS", STATS_WORKERS)):
+        if args.workers > 1 and name not in os.environ and count > 0:
+            os.environ[name] = str(max(1, count // args.workers))
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        app_dir=str(Path(__file__).resolve().parent),
+        log_level=mcp.settings.log_level.lower(),
+    )
+
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 直接运行pytest（而非python -m pytest）时仓库根目录不在sys.path中，function包无法导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,116 @@
+"""内存准入控制：执行计划、预算预留和事件循环中的排队测试"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from function.准入控制 import AdmissionController, AdmissionRejected, estimate_request
+from function.进度 import OperationCancelled, ProgressReporter
+
+server = pytest.importorskip("server")
+
+
+def _estimate(memory_mb: float) -> dict:
+    return {"estimated_memory_mb": memory_mb, "row_bytes": 100.0}
+
+
+def test_plan_decisions():
+    controller = AdmissionController(budget_mb=100)
+    assert controller.plan(_estimate(50))["decision"] == "accept"
+    chunked = controller.plan(_estimate(500), can_chunk=True)
+    assert chunked["decision"] == "chunked" and chunked["chunksize"] >= 1000
+    sampled = controller.plan(_estimate(500), can_sample=True)
+    assert sampled["decision"] == "sampled" and sampled["sample_frac"] == pytest.approx(0.1)
+    assert controller.plan(_estimate(500))["decision"] == "reject"
+
+
+def test_try_acquire_respects_reserved_and_resident_memory():
+    controller = AdmissionController(budget_mb=100)
+    first = controller.plan(_estimate(60))
+    assert controller.try_acquire(first)
+    assert not controller.try_acquire(controller.plan(_estimate(60)))
+    controller.release(first)
+    controller.set_resident("cache", 50)
+    assert controller.status()["available_mb"] == 50
+    assert not controller.try_acquire(controller.plan(_estimate(60)))
+    with pytest.raises(AdmissionRejected):
+        controller.try_acquire(controller.plan(_estimate(500)))
+
+
+def test_cache_reclaimed_when_request_would_fit():
+    controller = AdmissionController(budget_mb=100)
+    freed = []
+
+    def reclaim(size_mb):
+        freed.append(size_mb)
+        controller.set_resident("cache", 50 - size_mb)
+
+    controller.set_resident("cache", 50, reclaim=reclaim)
+    decision = controller.plan(_estimate(60))
+    assert controller.try_acquire(decision)
+    assert freed == [pytest.approx(10)]
+    assert controller.status()["reserved_mb"] == 60 and controller.status()["resident_mb"] == pytest.approx(40)
+    # 其它请求占用的预算无法通过回收缓存得到
+    assert not controller.try_acquire(controller.plan(_estimate(60)))
+    assert len(freed) == 1
+    with pytest.raises(AdmissionRejected):
+        controller.try_acquire(controller.plan(_estimate(500)))
+
+
+def test_estimate_request(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"a": np.arange(20000) * 0.5, "b": ["x"] * 20000}).to_csv(path, index=False)
+    estimate = estimate_request(str(path), ["a"])
+    assert estimate["used_columns"] == 1
+    assert estimate["estimated_rows"] == pytest.approx(20000, rel=0.2)
+
+
+def test_queued_request_waits_on_event_loop():
+    async def scenario():
+        controller = AdmissionController(budget_mb=100, queue_timeout=10)
+        holder = controller.plan(_estimate(80))
+        assert controller.try_acquire(holder)
+        queued = controller.plan(_estimate(80))
+        waiter = asyncio.ensure_future(server._wait_for_admission(controller, queued, ProgressReporter()))
+        await asyncio.sleep(0.1)
+        # 排队期间事件循环未被阻塞，释放预算后被唤醒
+        assert not waiter.done() and queued["queued"]
+        controller.release(holder)
+        server._wake_admission_waiters()
+        await asyncio.wait_for(waiter, 1)
+        assert controller.status()["reserved_mb"] == 80
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_cancelled_or_timed_out():
+    async def scenario():
+        controller = AdmissionController(budget_mb=100, queue_timeout=0.3)
+        assert controller.try_acquire(controller.plan(_estimate(100)))
+        reporter = ProgressReporter()
+        cancelled = asyncio.ensure_future(
+            server._wait_for_admission(controller, controller.plan(_estimate(50)), reporter))
+        await asyncio.sleep(0.05)
+        reporter.cancel()
+        server._wake_admission_waiters()
+        with pytest.raises(OperationCancelled):
+            await asyncio.wait_for(cancelled, 1)
+        decision = controller.plan(_estimate(50))
+        with pytest.raises(AdmissionRejected):
+            await server._wait_for_admission(controller, decision, ProgressReporter())
+        assert decision["decision"] == "reject"
+
+    asyncio.run(scenario())
+
+
+def test_estimate_request_parquet_reads_one_batch(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "data.parquet"
+    pd.DataFrame({"a": np.arange(20000) * 0.5, "b": ["x"] * 20000}).to_parquet(path, row_group_size=5000)
+    # 估算不得读取整个文件
+    monkeypatch.setattr(pd, "read_parquet", lambda *args, **kwargs: pytest.fail("读取了整个文件"))
+    estimate = estimate_request(str(path), ["a"])
+    assert estimate["estimated_rows"] == 20000 and estimate["used_columns"] == 1
+    assert estimate["row_bytes"] == pytest.approx(8, abs=1)
+    assert pq.ParquetFile(str(path)).metadata.num_rows == 20000
@@ -0,0 +1,55 @@
+"""CSV路径展开（通配符、文件列表、含通配符字符的文件名）与多文件读取测试"""
+import pandas as pd
+import pytest
+
+from function.数据加载 import dataset_name, load_csv, resolve_csv_paths
+
+
+@pytest.fixture
+def partitions(tmp_path):
+    for day in (2, 1, 3):
+        pd.DataFrame({"v": [day, day * 10]}).to_csv(tmp_path / f"events_{day}.csv", index=False)
+    return tmp_path
+
+
+def test_glob_pattern_sorted(partitions):
+    paths = resolve_csv_paths(str(partitions / "events_*.csv"))
+    assert [p.rsplit("_", 1)[1] for p in paths] == ["1.csv", "2.csv", "3.csv"]
+
+
+def test_glob_without_match_raises(partitions):
+    with pytest.raises(FileNotFoundError):
+        resolve_csv_paths(str(partitions / "missing_*.csv"))
+
+
+def test_existing_file_with_glob_characters_is_literal(tmp_path):
+    path = tmp_path / "data[1].csv"
+    pd.DataFrame({"v": [1, 2, 3]}).to_csv(path, index=False)
+    assert resolve_csv_paths(str(path)) == [str(path)]
+    assert dataset_name(str(path)) == "data[1]"
+    assert load_csv(str(path))["v"].tolist() == [1, 2, 3]
+
+
+def test_dataset_name():
+    assert dataset_name("/data/events_*.csv") == "events_all"
+    assert dataset_name(["/data/a.csv", "/data/b.csv"]) == "a_等2个文件"
+
+
+def test_load_csv_concatenates_in_file_order(partitions):
+    df = load_csv([str(partitions / "events_3.csv"), str(partitions / "events_1.csv")], source_column="source")
+    assert df["v"].tolist() == [3, 30, 1, 10]
+    assert df["source"].tolist() == ["events_3.csv"] * 2 + ["events_1.csv"] * 2
+
+
+def test_combined_moments_match_whole_frame():
+    import numpy as np
+
+    from function.数据加载 import combine_moments, partial_moments
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.exponential(size=1000) + 1e6, "b": rng.normal(size=1000)})
+    df.loc[::5, "b"] = np.nan
+    parts = [partial_moments(df.iloc[i:i + 130]) for i in range(0, 1000, 130)]
+    combined, whole = combine_moments(parts), partial_moments(df)
+    for key in ("n", "mean", "m2", "m3", "m4"):
+        np.testing.assert_allclose(combined[key], whole[key], rtol=1e-8)
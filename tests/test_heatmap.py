@@ -0,0 +1,62 @@
+"""相关系数热力图：层次聚类结果缓存测试"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import function.热力图 as heatmap
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(heatmap, "_cluster_cache", type(heatmap._cluster_cache)())
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200, 4)), columns=["d", "a", "c", "b"])
+    path = tmp_path / "wide.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _corr(csv_path):
+    return pd.read_csv(csv_path).corr()
+
+
+def test_cluster_order_cache_hit(csv_path):
+    corr = _corr(csv_path)
+    first, cached = heatmap.get_cluster_order(csv_path, corr, "pearson")
+    assert not cached
+    assert first["labels"] == ["a", "b", "c", "d"]
+    assert sorted(first["order"]) == first["labels"]
+
+    # 列顺序不同但列集合相同时同样命中
+    shuffled = corr.loc[["b", "d", "a", "c"], ["b", "d", "a", "c"]]
+    second, cached = heatmap.get_cluster_order(csv_path, shuffled, "pearson")
+    assert cached
+    assert second is first
+
+    for kwargs in ({"method": "spearman"}, {"method": "pearson", "sample_frac": 0.5}):
+        _, cached = heatmap.get_cluster_order(csv_path, corr, **kwargs)
+        assert not cached
+    _, cached = heatmap.get_cluster_order(csv_path, corr.loc[["a", "b"], ["a", "b"]], "pearson")
+    assert not cached
+
+
+def test_cluster_order_cache_miss_after_file_change(csv_path):
+    corr = _corr(csv_path)
+    heatmap.get_cluster_order(csv_path, corr, "pearson")
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("0,0,0,0\n")
+    _, cached = heatmap.get_cluster_order(csv_path, _corr(csv_path), "pearson")
+    assert not cached
+    _, cached = heatmap.get_cluster_order(csv_path, _corr(csv_path), "pearson")
+    assert cached
+
+
+def test_cluster_order_cache_evicts_least_recently_used(csv_path, monkeypatch):
+    monkeypatch.setattr(heatmap, "CLUSTER_CACHE_SIZE", 2)
+    corr = _corr(csv_path)
+    for method in ("pearson", "spearman"):
+        heatmap.get_cluster_order(csv_path, corr, method)
+    heatmap.get_cluster_order(csv_path, corr, "pearson")
+    heatmap.get_cluster_order(csv_path, corr, "kendall")
+    assert heatmap.get_cluster_order(csv_path, corr, "pearson")[1]
+    assert not heatmap.get_cluster_order(csv_path, corr, "spearman")[1]
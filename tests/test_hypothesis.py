@@ -0,0 +1,75 @@
+"""按样本量选择的正态性检验、批量检验和QQ图分位点测试"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+import function.假设检验 as hypothesis
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_test_selected_by_sample_size(rng):
+    small = hypothesis.normality_test(rng.normal(size=500))
+    assert small["test"] == "Shapiro-Wilk"
+    large = hypothesis.normality_test(rng.normal(size=20000))
+    assert large["test"] == "D'Agostino K²"
+    assert [t["test"] for t in large["supplementary_tests"]] == ["Anderson-Darling"]
+
+
+def test_rejects_degenerate_samples():
+    with pytest.raises(ValueError):
+        hypothesis.normality_test([1.0, np.nan])
+    with pytest.raises(ValueError):
+        hypothesis.normality_test([2.0] * 10)
+
+
+def test_batch_matches_scipy_normaltest(rng):
+    df = pd.DataFrame({"normal": rng.normal(size=2000), "skewed": rng.exponential(size=2000)})
+    df.loc[::7, "normal"] = np.nan
+    results = hypothesis.batch_normality_tests(df)
+    for col in df.columns:
+        statistic, p_value = stats.normaltest(df[col].dropna())
+        assert results.loc[col, "statistic"] == pytest.approx(statistic)
+        assert results.loc[col, "p_value"] == pytest.approx(p_value)
+    assert not results.loc["skewed", "is_normal"]
+
+
+def test_qq_points_exact_for_small_samples(rng):
+    values = rng.normal(size=500)
+    qq = hypothesis.qq_points(values)
+    assert qq["num_points"] == 500
+    np.testing.assert_array_equal(qq["sample"], np.sort(values))
+
+
+def test_qq_points_sketch_for_huge_samples(rng, monkeypatch):
+    values = rng.normal(size=200000)
+    exact = hypothesis.qq_points(values, max_points=200)
+    monkeypatch.setattr(hypothesis, "QQ_SKETCH_MIN_N", 100000)
+    monkeypatch.setattr(hypothesis, "QQ_SKETCH_SIZE", 50000)
+    sketch = hypothesis.qq_points(values, max_points=200)
+    assert sketch["num_points"] == exact["num_points"] == 200
+    # 端点取精确的最小值和最大值，中间分位点由抽样草图近似
+    assert sketch["sample"][0] == values.min() and sketch["sample"][-1] == values.max()
+    np.testing.assert_allclose(sketch["sample"][5:-5], exact["sample"][5:-5], atol=0.05)
+
+
+def test_normality_columns_combines_partition_moments(rng, tmp_path):
+    from function.qq图 import test_normality_columns as normality_columns
+
+    df = pd.DataFrame({"normal": rng.normal(10, 2, size=3000), "skewed": rng.exponential(size=3000),
+                       "label": ["x"] * 3000})
+    df.loc[::11, "normal"] = np.nan
+    for k in range(3):
+        df.iloc[k * 1000:(k + 1) * 1000].to_csv(tmp_path / f"part_{k}.csv", index=False)
+    result = normality_columns(str(tmp_path / "part_*.csv"), ["normal", "skewed", "label"], chunksize=250)
+    assert result["success"], result
+    assert result["skipped_columns"] == ["label"]
+    for col in ("normal", "skewed"):
+        statistic, p_value = stats.normaltest(df[col].dropna())
+        assert result["results"][col]["sample_size"] == df[col].count()
+        assert result["results"][col]["statistic"] == pytest.approx(statistic)
+        assert result["results"][col]["p_value"] == pytest.approx(p_value)
@@ -0,0 +1,79 @@
+"""融合数值摘要与pandas/numpy/matplotlib口径的一致性测试"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from function.数值摘要 import split_finite, summarize_numeric, describe_summary
+from function.绘图规格 import box_stats
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(1)
+    # 偏离零点很远的重尾数据，检验平移幂和的数值稳定性
+    return rng.standard_t(3, size=20001) * 5 + 1e6
+
+
+def test_matches_pandas_describe(values):
+    summary = summarize_numeric(values)
+    series = pd.Series(values)
+    expected = series.describe()
+    actual = pd.Series(describe_summary(summary))
+    np.testing.assert_allclose(actual[expected.index].to_numpy(dtype=float), expected.to_numpy(), rtol=1e-9)
+    assert summary["skew"] == pytest.approx(series.skew(), rel=1e-6)
+    assert summary["kurtosis"] == pytest.approx(series.kurtosis(), rel=1e-6)
+
+
+def test_histogram_matches_numpy(values):
+    histogram = summarize_numeric(values, bins=30)["histogram"]
+    counts, edges = np.histogram(values, bins=30)
+    np.testing.assert_array_equal(histogram["counts"], counts)
+    np.testing.assert_allclose(histogram["edges"], edges)
+
+
+def test_box_matches_box_stats(values):
+    box = summarize_numeric(values)["box"]
+    expected = box_stats(values)
+    expected = expected[0] if isinstance(expected, list) else expected
+    for key in ("med", "q1", "q3", "whislo", "whishi"):
+        assert box[key] == pytest.approx(expected[key])
+    assert len(box["fliers"]) == len(expected["fliers"])
+
+
+def test_sketch_quantiles_close_to_exact(values):
+    exact = summarize_numeric(values, exact_quantiles=True)["quantiles"]
+    sketch = summarize_numeric(values, exact_quantiles=False)
+    assert sketch["quantiles_exact"] is False
+    for q, value in exact.items():
+        assert sketch["quantiles"][q] == pytest.approx(value, abs=0.5)
+
+
+def test_nan_and_inf_reported_separately():
+    raw = np.array([1.0, 2.0, np.nan, np.inf, -np.inf, 3.0, 4.0])
+    finite, dropped = split_finite(raw)
+    assert dropped == {"missing": 1, "infinite": 2}
+    summary = summarize_numeric(raw)
+    assert (summary["count"], summary["missing"], summary["infinite"]) == (4, 1, 2)
+    assert summary["max"] == 4.0 and summary["mean"] == pytest.approx(2.5)
+    assert summarize_numeric(finite, dropna=False, dropped=dropped)["infinite"] == 2
+
+
+def test_degenerate_inputs():
+    empty = summarize_numeric([])
+    assert empty["count"] == 0 and empty["mean"] is None and empty["histogram"] is None
+    constant = summarize_numeric([5.0] * 10)
+    assert constant["std"] == 0.0 and constant["skew"] == 0.0 and constant["kurtosis"] == 0.0
+    assert constant["histogram"]["counts"].sum() == 10
+    single = summarize_numeric([7.0])
+    assert single["std"] is None and single["skew"] is None and single["max"] == 7.0
+
+
+def test_large_offset_small_spread_keeps_skew_and_kurtosis():
+    # 例如标准差很小的Unix时间戳（秒）
+    series = pd.Series(np.random.default_rng(2).normal(1e9, 1, size=100000))
+    summary = summarize_numeric(series.to_numpy())
+    assert summary["skew"] != 0.0 and summary["kurtosis"] != 0.0
+    assert summary["skew"] == pytest.approx(series.skew(), rel=1e-4)
+    assert summary["kurtosis"] == pytest.approx(series.kurtosis(), rel=1e-4)
+    constant = summarize_numeric(np.full(1000, 1e9 + 0.1))
+    assert constant["skew"] == 0.0 and constant["kurtosis"] == 0.0
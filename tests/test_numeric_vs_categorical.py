@@ -0,0 +1,49 @@
+"""数值变量按类别分组分析：各计算后端的数据读取次数测试"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import function.数值型and类别型 as grouped
+from function.渲染进程池 import RenderPool
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"value": rng.normal(size=1000), "group": rng.choice(["a", "b", "c"], size=1000)})
+    path = tmp_path / "grouped.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+    load_csv = grouped.load_csv
+
+    def counting_load_csv(*args, **kwargs):
+        calls.append(kwargs.get("sample_frac"))
+        return load_csv(*args, **kwargs)
+
+    monkeypatch.setattr(grouped, "load_csv", counting_load_csv)
+    monkeypatch.setattr(grouped, "get_render_pool", lambda: RenderPool(workers=0))
+    return calls
+
+
+def test_pandas_backend_reads_file_once(csv_path, loads, tmp_path):
+    result = grouped.analyze_numeric_vs_categorical(csv_path, "value", "group", plot_types=["boxplot"],
+                                                    save_dir=str(tmp_path), backend="pandas")
+    assert result["success"], result
+    assert loads == [None]
+    assert result["total_samples"] == 1000 and result["num_categories"] == 3
+
+
+def test_duckdb_backend_samples_plot_data(csv_path, loads, tmp_path, monkeypatch):
+    pytest.importorskip("duckdb")
+    monkeypatch.setattr(grouped, "PLOT_SAMPLE_ROWS", 100)
+    result = grouped.analyze_numeric_vs_categorical(csv_path, "value", "group", plot_types=["boxplot"],
+                                                    save_dir=str(tmp_path), backend="duckdb")
+    assert result["success"], result
+    # 分组统计覆盖全部数据，绘图只载入约PLOT_SAMPLE_ROWS行
+    assert result["total_samples"] == 1000
+    assert loads == [pytest.approx(0.1)]
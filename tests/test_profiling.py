@@ -0,0 +1,51 @@
+"""性能剖析：并发剖析请求共用CPU剖析器的测试"""
+import threading
+
+import pytest
+
+import function.性能剖析 as profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+
+
+def test_profile_summary():
+    result, summary = profiling.run_profiled(sum, ([1, 2, 3],), label="sum")
+    assert result == 6
+    assert summary["cpu_profiled"] and summary["profile_path"].endswith(".prof")
+    assert "热点函数" in profiling.format_profile_summary(summary)
+
+
+def test_concurrent_requests_share_cpu_profiler():
+    first_running, second_done = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def first_request():
+        first_running.set()
+        assert second_done.wait(10)
+        return "first"
+
+    def run(name, func):
+        try:
+            outcomes[name] = profiling.run_profiled(func, label=name)
+        except Exception as e:
+            outcomes[name] = e
+
+    thread = threading.Thread(target=run, args=("first", first_request))
+    thread.start()
+    assert first_running.wait(10)
+    run("second", lambda: "second")
+    second_done.set()
+    thread.join(10)
+
+    # 第二个请求在CPU剖析器被占用时照常完成，只记录内存
+    result, summary = outcomes["second"]
+    assert result == "second"
+    assert not summary["cpu_profiled"] and summary["profile_path"] is None
+    assert profiling.CPU_PROFILER_BUSY in profiling.format_profile_summary(summary)
+    result, summary = outcomes["first"]
+    assert result == "first" and summary["cpu_profiled"]
+    # 剖析器释放后后续请求重新做CPU剖析
+    assert profiling.run_profiled(len, ("ab",))[1]["cpu_profiled"]
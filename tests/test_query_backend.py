@@ -0,0 +1,107 @@
+"""pandas后端与DuckDB后端的聚合结果一致性测试"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from function.查询后端 import get_backend, check_backend_parity  # noqa: E402
+
+NUMERIC_COLUMNS = ["x", "y", "z"]
+
+
+@pytest.fixture
+def backends():
+    return get_backend("pandas"), get_backend("duckdb")
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """含缺失值、并列值和非数值列的测试数据"""
+    rng = np.random.default_rng(0)
+    n = 300
+    x = rng.normal(size=n)
+    df = pd.DataFrame({
+        "x": np.where(rng.random(n) < 0.1, np.nan, x),
+        "y": np.round(x + rng.normal(scale=0.5, size=n), 1),
+        "z": rng.integers(0, 20, size=n),
+        "label": [f"id_{i}" for i in range(n)],
+        "cat": rng.choice(["a", "b", "c", None], size=n, p=[0.5, 0.3, 0.15, 0.05]),
+    })
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def assert_frames_close(a: pd.DataFrame, b: pd.DataFrame) -> None:
+    a, b = a.sort_index(), b.sort_index()
+    assert list(a.index) == list(b.index)
+    assert list(a.columns) == list(b.columns)
+    np.testing.assert_allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float),
+                               rtol=1e-6, atol=1e-8, equal_nan=True)
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman", "kendall"])
+def test_corr_skips_non_numeric_and_handles_missing(backends, csv_path, method):
+    base, alt = backends
+    columns = NUMERIC_COLUMNS + ["label"]
+    expected = base.corr(csv_path, columns, method)
+    assert list(expected.columns) == NUMERIC_COLUMNS
+    assert_frames_close(expected, alt.corr(csv_path, columns, method))
+
+
+def test_spearman_without_missing(backends, csv_path):
+    # 无缺失值时DuckDB在一次查询中对所有列排秩，y包含大量并列值
+    base, alt = backends
+    assert_frames_close(base.corr(csv_path, ["y", "z"], "spearman"),
+                        alt.corr(csv_path, ["y", "z"], "spearman"))
+
+
+@pytest.mark.parametrize("column", NUMERIC_COLUMNS)
+def test_describe(backends, csv_path, column):
+    base, alt = backends
+    assert_frames_close(base.describe(csv_path, column).to_frame(),
+                        alt.describe(csv_path, column).to_frame())
+
+
+def test_value_counts(backends, csv_path):
+    base, alt = backends
+    expected, actual = base.value_counts(csv_path, "cat"), alt.value_counts(csv_path, "cat")
+    assert expected["rows"] == actual["rows"] == 300
+    assert expected["missing"] == actual["missing"] > 0
+    assert expected["counts"].sort_index().to_dict() == actual["counts"].sort_index().to_dict()
+
+
+@pytest.mark.parametrize("column", NUMERIC_COLUMNS)
+def test_groupby_stats(backends, csv_path, column):
+    base, alt = backends
+    assert_frames_close(base.groupby_stats(csv_path, column, "cat"),
+                        alt.groupby_stats(csv_path, column, "cat"))
+
+
+def test_column_names_with_braces(backends, tmp_path):
+    path = tmp_path / "braces.csv"
+    pd.DataFrame({"a{x}": [1.0, 2.0, np.nan, 4.0], "b": [2.0, 1.0, 3.0, 5.0]}).to_csv(path, index=False)
+    base, alt = backends
+    assert_frames_close(base.corr(str(path), ["a{x}", "b"]), alt.corr(str(path), ["a{x}", "b"]))
+    assert_frames_close(base.describe(str(path), "a{x}").to_frame(),
+                        alt.describe(str(path), "a{x}").to_frame())
+
+
+def test_check_backend_parity(csv_path):
+    results = check_backend_parity(csv_path, NUMERIC_COLUMNS, "cat")
+    assert results and all(results.values()), results
+
+
+def test_na_tokens_read_as_missing(backends, tmp_path):
+    path = tmp_path / "na_tokens.csv"
+    path.write_text("x,y,cat\n1.5,2,a\nNA,3,b\n2.5,null,a\nN/A,5,NA\n4.0,NaN,b\n3.5,1,None\n",
+                    encoding="utf-8")
+    base, alt = backends
+    expected = base.corr(str(path), ["x", "y"])
+    assert list(expected.columns) == ["x", "y"]
+    assert_frames_close(expected, alt.corr(str(path), ["x", "y"]))
+    assert_frames_close(base.describe(str(path), "x").to_frame(), alt.describe(str(path), "x").to_frame())
+    assert_frames_close(base.groupby_stats(str(path), "x", "cat"), alt.groupby_stats(str(path), "x", "cat"))
+    counts = alt.value_counts(str(path), "cat")
+    assert counts["missing"] == base.value_counts(str(path), "cat")["missing"] == 2
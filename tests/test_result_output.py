@@ -0,0 +1,96 @@
+"""结构化结果：分页、变量对排序和完整结果文件输出测试"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import function.结果输出 as output
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({"category": [f"c{i}" for i in range(5)], "count": np.arange(5, 0, -1),
+                         "share": [0.5, np.nan, 0.25, np.inf, 0.125]})
+
+
+def test_records_page_bounds(table):
+    page = output.records_page(table, offset=1, limit=2)
+    assert page["columns"] == ["category", "count", "share"]
+    assert page["records"] == [{"category": "c1", "count": 4, "share": None},
+                               {"category": "c2", "count": 3, "share": 0.25}]
+    assert (page["offset"], page["limit"], page["total_rows"]) == (1, 2, 5)
+    assert page["has_more"] and page["next_offset"] == 3
+    assert isinstance(page["records"][0]["count"], int)
+
+    assert len(output.records_page(table)["records"]) == 5
+    beyond = output.records_page(table, offset=10, limit=2)
+    assert beyond["records"] == [] and beyond["offset"] == 5
+    for kwargs in ({"offset": -1}, {"limit": -1}):
+        with pytest.raises(ValueError):
+            output.records_page(table, **kwargs)
+
+
+def test_page_limit_is_capped(monkeypatch, table):
+    monkeypatch.setattr(output, "MAX_PAGE_ROWS", 3)
+    page = output.records_page(table, limit=100)
+    assert page["limit"] == 3 and len(page["records"]) == 3
+
+
+def test_next_offset_at_end(table):
+    last = output.records_page(table, offset=3, limit=2)
+    assert len(last["records"]) == 2
+    assert not last["has_more"] and last["next_offset"] is None
+
+    matrix = pd.DataFrame(np.eye(3), index=list("abc"), columns=list("abc"))
+    page = output.matrix_page(matrix, offset=2, limit=5)
+    assert page["row_labels"] == ["c"] and page["values"] == [[0.0, 0.0, 1.0]]
+    assert not page["has_more"] and page["next_offset"] is None
+
+
+def test_matrix_page_rows_and_missing_values():
+    matrix = pd.DataFrame([[1.0, 0.123456, np.nan], [0.123456, 1.0, -0.5], [np.nan, -0.5, 1.0]],
+                          index=list("abc"), columns=list("abc"))
+    page = output.matrix_page(matrix, offset=0, limit=2)
+    assert page["columns"] == ["a", "b", "c"]
+    assert page["row_labels"] == ["a", "b"]
+    assert page["values"] == [[1.0, 0.1235, None], [0.1235, 1.0, -0.5]]
+    assert page["has_more"] and page["next_offset"] == 2
+
+
+def test_top_pairs_order_skips_nan_and_diagonal():
+    labels = list("abcd")
+    matrix = pd.DataFrame([[1.0, 0.2, -0.9, np.nan],
+                           [0.2, 1.0, 0.5, 0.1],
+                           [-0.9, 0.5, 1.0, np.nan],
+                           [np.nan, 0.1, np.nan, 1.0]], index=labels, columns=labels)
+    pairs = output.top_pairs(matrix, 3)
+    assert pairs == [{"x": "a", "y": "c", "value": -0.9},
+                     {"x": "b", "y": "c", "value": 0.5},
+                     {"x": "a", "y": "b", "value": 0.2}]
+    # 只有4个有限的非对角变量对，对角线的1.0不计入
+    assert len(output.top_pairs(matrix, 10)) == 4
+    assert output.top_pairs(matrix, 0) == []
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "npy"])
+def test_write_table_output_path(tmp_path, output_format):
+    if output.check_output_format(output_format, numeric_only=True):
+        pytest.skip("pyarrow未安装")
+    df = pd.DataFrame({"x": [1.0, 2.0], "y": [3.0, 4.0]}, index=["r1", "r2"])
+    path = output.write_table(df, str(tmp_path / "table"), output_format)
+    assert path == str((tmp_path / "table").resolve()) + f".{output_format}"
+    if output_format == "csv":
+        assert pd.read_csv(path, encoding="utf-8-sig").equals(df.reset_index(drop=True))
+    elif output_format == "parquet":
+        assert pd.read_parquet(path).equals(df.reset_index(drop=True))
+    else:
+        assert np.array_equal(np.load(path), df.to_numpy())
+
+
+def test_check_output_format():
+    assert output.check_output_format(None) is None
+    assert output.check_output_format("csv") is None
+    assert "npy" in output.check_output_format("npy")
+    assert output.check_output_format("npy", numeric_only=True) is None
+    assert "xlsx" in output.check_output_format("xlsx")
+    with pytest.raises(ValueError):
+        output.write_table(pd.DataFrame(), "unused", "xlsx")
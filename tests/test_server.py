@@ -0,0 +1,182 @@
+"""服务端：相同请求的合并、HTTP部署的DNS重绑定防护设置和多工作进程的资源划分测试"""
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from function.进度 import OperationCancelled, current_reporter
+
+server = pytest.importorskip("server")
+
+
+def test_transport_security_for_specific_host():
+    settings = server._transport_security("10.0.0.5", ["charts.example.com"])
+    assert settings.enable_dns_rebinding_protection
+    for host in ("127.0.0.1:*", "localhost:*", "[::1]:*", "10.0.0.5", "10.0.0.5:*", "charts.example.com"):
+        assert host in settings.allowed_hosts
+    assert "https://charts.example.com" in settings.allowed_origins
+    assert socket.gethostname() not in settings.allowed_hosts
+
+
+def test_transport_security_for_wildcard_host():
+    settings = server._transport_security("0.0.0.0", [])
+    assert f"{socket.gethostname()}:*" in settings.allowed_hosts
+    assert "0.0.0.0" not in settings.allowed_hosts
+
+
+@pytest.fixture
+def http_env(monkeypatch):
+    # 先登记再删除，测试结束时main()写入的环境变量被还原
+    for name in ("CHART_HTTP_HOST", "CHART_ALLOWED_HOSTS", "CHART_MEMORY_BUDGET_MB", "CHART_RENDER_WORKERS",
+                 "CHART_STATS_WORKERS"):
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+    calls = []
+    uvicorn = pytest.importorskip("uvicorn")
+    monkeypatch.setattr(uvicorn, "run", lambda *args, **kwargs: calls.append(kwargs))
+    return calls
+
+
+def test_main_splits_budget_and_render_workers(http_env, monkeypatch):
+    monkeypatch.setattr(server, "RENDER_WORKERS", 8)
+    monkeypatch.setattr(server, "STATS_WORKERS", 6)
+    budget = server.get_admission_controller().budget_mb
+    server.main(["--transport", "streamable-http", "--host", "0.0.0.0", "--workers", "4",
+                 "--allowed-host", "a.example.com", "--allowed-host", "b.example.com"])
+    assert http_env[0]["workers"] == 4
+    assert server.os.environ["CHART_RENDER_WORKERS"] == "2"
+    assert server.os.environ["CHART_STATS_WORKERS"] == "1"
+    assert float(server.os.environ["CHART_MEMORY_BUDGET_MB"]) == pytest.approx(budget / 4)
+    assert server.os.environ["CHART_ALLOWED_HOSTS"] == "a.example.com,b.example.com"
+
+
+def test_main_keeps_explicit_render_workers(http_env, monkeypatch):
+    monkeypatch.setenv("CHART_RENDER_WORKERS", "3")
+    server.main(["--transport", "streamable-http", "--workers", "4"])
+    assert server.os.environ["CHART_RENDER_WORKERS"] == "3"
+
+
+def test_multi_file_tools_accept_source_column(tmp_path, monkeypatch):
+    import pandas as pd
+
+    import function.散点图 as scatter
+    from function.渲染进程池 import RenderPool
+
+    tools = {tool.name: tool for tool in asyncio.run(server.mcp.list_tools())}
+    for name in ("create_advanced_scatter_plot", "create_pairplot"):
+        assert "source_column" in tools[name].inputSchema["properties"]
+
+    for day in (1, 2):
+        pd.DataFrame({"x": [1.0, 2.0, 3.0], "y": [day, day * 2.0, day * 3.0]}).to_csv(
+            tmp_path / f"day_{day}.csv", index=False)
+    monkeypatch.setattr(scatter, "get_render_pool", lambda: RenderPool(workers=0))
+    result = asyncio.run(server.create_advanced_scatter_plot(
+        str(tmp_path / "day_*.csv"), "x", "y", hue_column="file", source_column="file",
+        save_dir=str(tmp_path / "charts")))
+    assert result["success"], result
+    assert set(result["group_statistics"]) == {"day_1.csv", "day_2.csv"}
+
+
+_calls = []
+_release = threading.Event()
+_stopped = threading.Event()
+
+
+def _analysis(csv_path, value, save_dir="./charts"):
+    """测试用分析函数：记录调用，等待_release或请求被取消"""
+    _calls.append(value)
+    try:
+        while not _release.wait(0.01):
+            current_reporter().checkpoint()
+    except OperationCancelled:
+        _stopped.set()
+        raise
+    return {"success": True, "value": value, "rows": [1, 2, 3]}
+
+
+@pytest.fixture
+def data_csv(tmp_path):
+    _calls.clear()
+    _release.clear()
+    _stopped.clear()
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n3,4\n", encoding="utf-8")
+    yield str(path)
+    _release.set()
+    assert not server._inflight
+
+
+async def _started(count=1):
+    while len(_calls) < count:
+        await asyncio.sleep(0.01)
+
+
+def test_identical_concurrent_requests_compute_once(data_csv):
+    async def scenario():
+        first = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await _started()
+        second = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await asyncio.sleep(0.05)
+        _release.set()
+        return await first, await second
+
+    first, second = asyncio.run(scenario())
+    assert _calls == [1]
+    assert first["value"] == second["value"] == 1
+    # 合并的请求得到结果的副本
+    assert first["rows"] is not second["rows"]
+
+
+def test_different_kwargs_or_changed_file_not_coalesced(data_csv):
+    async def scenario():
+        tasks = [asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))]
+        await _started(1)
+        tasks.append(asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=2)))
+        await _started(2)
+        # 文件内容变化后指纹不同，即使参数相同也重新计算
+        with open(data_csv, "a", encoding="utf-8") as f:
+            f.write("5,6\n")
+        tasks.append(asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1)))
+        await _started(3)
+        _release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert sorted(_calls) == [1, 1, 2]
+    assert [r["value"] for r in results] == [1, 2, 1]
+
+
+def test_cancelled_owner_still_delivers_to_waiter(data_csv):
+    async def scenario():
+        owner = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await _started()
+        waiter = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await asyncio.sleep(0.05)
+        owner.cancel()
+        await asyncio.sleep(0.1)
+        assert not _stopped.is_set()
+        _release.set()
+        return await waiter
+
+    assert asyncio.run(scenario())["value"] == 1
+    assert _calls == [1]
+
+
+def test_cancelling_last_waiter_cancels_work(data_csv):
+    async def scenario():
+        owner = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await _started()
+        waiter = asyncio.ensure_future(server._dispatch(_analysis, csv_path=data_csv, value=1))
+        await asyncio.sleep(0.05)
+        owner.cancel()
+        waiter.cancel()
+        await asyncio.gather(owner, waiter, return_exceptions=True)
+        for _ in range(100):
+            if _stopped.is_set():
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert _stopped.is_set()
+    assert _calls == [1]
@@ -0,0 +1,183 @@
+"""共享内存数据在渲染进程任务之间的引用计数测试"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from function.共享内存 import SharedFrame, attach_frame
+from function.渲染进程池 import RenderPool
+
+
+def _attach_sum(descriptor, delay, fail):
+    # 渲染进程中执行：等待一段时间后挂载共享数据求和
+    time.sleep(delay)
+    if fail:
+        raise ValueError("任务失败")
+    with attach_frame(descriptor) as df:
+        return float(df["a"].sum())
+
+
+def _wait_released(frame, timeout=30):
+    deadline = time.monotonic() + timeout
+    while frame._refcount > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return frame._refcount == 0
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = RenderPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"a": [1.0, 2.0, 3.0]})
+
+
+def test_frame_outlives_creator_until_tasks_finish(pool, df):
+    with SharedFrame(df) as frame:
+        failing = pool.submit(_attach_sum, (frame.descriptor, 0, True), frame=frame)
+        queued = pool.submit(_attach_sum, (frame.descriptor, 0.2, False), frame=frame)
+    with pytest.raises(ValueError):
+        failing.get(60)
+    # 创建者已释放，排队的任务仍能挂载共享数据
+    assert queued.get(60) == 6.0
+    assert _wait_released(frame)
+    assert frame._blocks == []
+
+
+def test_run_many_failure_keeps_queued_task_reference(pool, df):
+    with SharedFrame(df) as frame:
+        descriptor = frame.descriptor
+        with pytest.raises(ValueError):
+            pool.run_many(_attach_sum, [(descriptor, 0, True), (descriptor, 0.5, False)], frame=frame)
+    assert frame._refcount == 1
+    assert _wait_released(frame)
+
+
+def test_timeout_releases_references(df):
+    pool = RenderPool(workers=1)
+    try:
+        with SharedFrame(df) as frame:
+            descriptor = frame.descriptor
+            with pytest.raises(TimeoutError):
+                pool.run_many(_attach_sum, [(descriptor, 5, False)] * 2, timeout=0.5, frame=frame)
+        # 第二个任务随后在重启的子进程中同样超时，两个引用都被释放
+        assert _wait_released(frame)
+    finally:
+        pool.shutdown()
+
+
+def _noop():
+    return None
+
+
+def test_timeout_on_warmed_pool_does_not_hang():
+    pool = RenderPool(workers=1)
+    errors = []
+
+    def run():
+        try:
+            pool.run_many(time.sleep, [(30,)], timeout=0.5)
+        except TimeoutError as e:
+            errors.append(e)
+
+    # 等待子进程启动并完成一个任务，超时发生在任务执行期间
+    pool.run_many(_noop, [()])
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(20)
+    # 超时处理卡住时不再关闭进程池（关闭同样会卡住），直接判定失败
+    assert not thread.is_alive() and len(errors) == 1
+    try:
+        assert pool.run_many(_noop, [()], timeout=20) == [None]
+    finally:
+        pool.shutdown()
+
+
+def _sleep_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _run_in_thread(func, *args, **kwargs):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = func(*args, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_timeout_only_kills_its_own_worker():
+    pool = RenderPool(workers=2)
+    try:
+        pool.run_many(_noop, [()] * 2)
+        slow, slow_outcome = _run_in_thread(pool.run_many, time.sleep, [(30,)], timeout=0.5)
+        time.sleep(0.1)
+        started = time.monotonic()
+        healthy, healthy_outcome = _run_in_thread(pool.run_many, _sleep_return, [(2,)], timeout=6)
+        slow.join(20)
+        healthy.join(20)
+        assert isinstance(slow_outcome["error"], TimeoutError)
+        assert healthy_outcome["result"] == [2]
+        assert time.monotonic() - started < 5
+    finally:
+        pool.shutdown()
+
+
+def test_timeout_starts_when_task_starts():
+    pool = RenderPool(workers=1)
+    try:
+        pool.run_many(_noop, [()])
+        # 第二个任务排队等待约1秒，执行1秒，总耗时超过超时时间但执行时间没有
+        assert pool.run_many(_sleep_return, [(1,), (1,)], timeout=1.8) == [1, 1]
+    finally:
+        pool.shutdown()
+
+
+def test_cancel_drops_tasks_not_yet_started(df):
+    from function.进度 import OperationCancelled, ProgressReporter, use_reporter
+
+    pool = RenderPool(workers=1)
+    reporter = ProgressReporter()
+    try:
+        pool.run_many(_noop, [()])
+        with SharedFrame(df) as frame:
+            descriptor = frame.descriptor
+            threading.Timer(0.3, reporter.cancel).start()
+            with use_reporter(reporter), pytest.raises(OperationCancelled):
+                pool.run_many(_attach_sum, [(descriptor, 1, False)] * 5, frame=frame)
+            # 只有正在执行的任务还持有引用
+            assert frame._refcount == 2
+        assert _wait_released(frame)
+    finally:
+        pool.shutdown()
+
+
+def test_parallel_kendall_uses_stats_pool(monkeypatch):
+    import numpy as np
+
+    import function.查询后端 as query_backend
+    import function.渲染进程池 as render_pool
+
+    stats_pool = RenderPool(workers=2, timeout=60, initializer=render_pool._init_stats_worker)
+    monkeypatch.setattr(query_backend, "get_stats_pool", lambda: stats_pool)
+    monkeypatch.setattr(render_pool, "_render_pool", None)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(500, 4)), columns=list("abcd"))
+    try:
+        result = query_backend._parallel_kendall(df)
+    finally:
+        stats_pool.shutdown()
+    pd.testing.assert_frame_equal(result, df.corr(method="kendall"))
+    # 渲染进程池未被占用
+    assert render_pool._render_pool is None
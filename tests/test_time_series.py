@@ -0,0 +1,123 @@
+"""时间序列金字塔的查询和缓存占用测试"""
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import function.时间序列 as time_series
+from function.准入控制 import get_admission_controller
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    n = 50000
+    df = pd.DataFrame({
+        "ts": pd.date_range("2026-01-01", periods=n, freq="s"),
+        "temp": np.sin(np.arange(n) / 500.0),
+        "sales": np.arange(n, dtype=float),
+    })
+    path = tmp_path / "series.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(time_series, "_cache", OrderedDict())
+    monkeypatch.setattr(time_series, "_cache_bytes", 0)
+    yield
+    get_admission_controller().set_resident("pyramid_cache", 0.0)
+
+
+def test_query_limits_points_to_width(csv_path):
+    pyramid = time_series.get_pyramid(csv_path, "ts", ["temp"])
+    result = pyramid.query(width_px=400)
+    assert result["points"] <= 400
+    assert result["rows_in_window"] == 50000
+    assert result["stats"]["temp"]["max"] == pytest.approx(1.0, abs=1e-4)
+    raw = pyramid.query(start="2026-01-01 00:00:00", end="2026-01-01 00:01:39", width_px=400)
+    assert raw["resolution"] == "原始数据" and raw["points"] == 100
+
+
+def test_cache_bounded_by_bytes_and_counted_in_budget(csv_path, monkeypatch):
+    first = time_series.get_pyramid(csv_path, "ts", ["temp"])
+    assert time_series.get_pyramid(csv_path, "ts", ["temp"]) is first
+    status = time_series.pyramid_cache_status()
+    assert status["entries"] == 1
+    assert status["size_mb"] == pytest.approx(first.nbytes / 2 ** 20, abs=0.01)
+    assert get_admission_controller().status()["resident_mb"] == pytest.approx(status["size_mb"], abs=0.01)
+
+    # 上限只够容纳一个金字塔：加入第二个时淘汰最久未使用的
+    monkeypatch.setattr(time_series, "PYRAMID_CACHE_MB", first.nbytes * 1.5 / 2 ** 20)
+    second = time_series.get_pyramid(csv_path, "ts", ["sales"])
+    assert time_series.pyramid_cache_status()["entries"] == 1
+    assert time_series.get_pyramid(csv_path, "ts", ["sales"]) is second
+    assert time_series.get_pyramid(csv_path, "ts", ["temp"]) is not first
+
+
+def test_pyramid_larger_than_limit_not_cached(csv_path, monkeypatch):
+    monkeypatch.setattr(time_series, "PYRAMID_CACHE_MB", 0.01)
+    time_series.get_pyramid(csv_path, "ts", ["temp"])
+    assert time_series.pyramid_cache_status()["entries"] == 0
+    assert get_admission_controller().status()["resident_mb"] == 0
+
+
+def test_cache_reclaimed_for_admission(csv_path):
+    time_series.get_pyramid(csv_path, "ts", ["temp"])
+    time_series.get_pyramid(csv_path, "ts", ["sales"])
+    size_mb = time_series.pyramid_cache_status()["size_mb"]
+    # 准入控制器请求释放少量内存：只淘汰最久未使用的一个
+    time_series._reclaim(0.001)
+    assert time_series.pyramid_cache_status()["entries"] == 1
+    time_series._reclaim(size_mb)
+    assert time_series.pyramid_cache_status()["entries"] == 0
+    assert get_admission_controller().status()["resident_mb"] == 0
+
+
+def _disk_files(cache_dir):
+    return sorted(os.listdir(os.path.join(cache_dir, "pyramid")))
+
+
+def _drop_memory_cache():
+    time_series._cache.clear()
+    time_series._cache_bytes = 0
+
+
+def test_disk_cache_drops_outdated_fingerprints(csv_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setattr(time_series, "CACHE_DIR", cache_dir)
+    time_series.get_pyramid(csv_path, "ts", ["temp"])
+    time_series.get_pyramid(csv_path, "ts", ["sales"])
+    old_files = _disk_files(cache_dir)
+    assert len(old_files) == 2
+
+    # 数据文件被修改：同一数据源的旧缓存文件被新文件替换，其它列的缓存不受影响
+    df = pd.read_csv(csv_path).iloc[:1000]
+    df.to_csv(csv_path, index=False)
+    _drop_memory_cache()
+    assert time_series.get_pyramid(csv_path, "ts", ["temp"]).num_rows == 1000
+    files = _disk_files(cache_dir)
+    assert len(files) == 2 and len(set(files) & set(old_files)) == 1
+
+
+def test_disk_cache_bounded_by_bytes_lru(csv_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(time_series, "CACHE_DIR", str(tmp_path / "cache"))
+    fingerprint = time_series.file_fingerprint(csv_path)
+    paths = {name: time_series._disk_cache_path(fingerprint, "ts", columns)
+             for name, columns in (("temp", ["temp"]), ("sales", ["sales"]), ("both", ["temp", "sales"]))}
+    time_series.get_pyramid(csv_path, "ts", ["temp"])
+    # 上限可容纳两个单列文件加一个双列文件的一半
+    monkeypatch.setattr(time_series, "DISK_CACHE_MB", 3 * os.path.getsize(paths["temp"]) / 2 ** 20)
+    time.sleep(0.05)
+    time_series.get_pyramid(csv_path, "ts", ["sales"])
+    time.sleep(0.05)
+    # 从磁盘读取temp后它成为最近使用的文件，加入双列文件时淘汰sales
+    _drop_memory_cache()
+    time_series.get_pyramid(csv_path, "ts", ["temp"])
+    time.sleep(0.05)
+    time_series.get_pyramid(csv_path, "ts", ["temp", "sales"])
+    assert os.path.exists(paths["temp"]) and os.path.exists(paths["both"])
+    assert not os.path.exists(paths["sales"])